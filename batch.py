@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from crawler import GitHubCrawler, _DONE
+
+logger = logging.getLogger(__name__)
+
+
+def load_queries(path):
+    """
+    Load search queries from a JSONL file, one JSON object with 'keywords' and 'type' per line.
+
+    Parameters:
+    - path (str): The path of the JSONL file.
+
+    Returns:
+    - queries (list): A list of query dictionaries.
+
+    Raises:
+    - ValueError: If a line is not valid JSON.
+    """
+    queries = []
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                queries.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} of '{path}' is not valid JSON: {e}") from e
+    return queries
+
+
+def query_id(query):
+    """
+    Get the identifier results of a query are tagged with: its 'id', or its keywords joined by '+'.
+
+    Parameters:
+    - query (dict): A query dictionary.
+
+    Returns:
+    - query_id (str): The identifier of the query.
+    """
+    return str(query.get("id") or "+".join(query.get("keywords", [])))
+
+
+class BatchCrawler(GitHubCrawler):
+    """
+    Runs many search queries concurrently through one session, response cache, rate limiter and proxy pool.
+
+    The search pages of up to `query_concurrency` queries are flipped at the same time and all of their hits
+    feed the same pool of enrichment workers. Repositories found by several queries are fetched only once:
+    the details of the last `repo_info_cache_size` repositories are kept by URL, whether or not their pages
+    are kept for request deduplication, and every query gets its own result sharing them.
+
+    Every result carries a 'query' key with the identifier of the query that found it.
+    """
+    def __init__(self, data, queries):
+        super().__init__(data)
+        self.queries = queries
+        self.query_concurrency = max(1, data.get("query_concurrency", 4))
+        self.repo_info_cache_size = data.get("repo_info_cache_size", 10000)
+        self.repo_infos = OrderedDict()
+
+    async def get_repo_info(self, repo_url):
+        """
+        Get information about a repository, reusing the details of repositories found by another query.
+
+        Parameters:
+        - repo_url (str): The URL of the repository.
+
+        Returns:
+        - repo_info (dict): Information about the repository, or None if it could not be fetched.
+        """
+        future = self.repo_infos.get(repo_url)
+        if future is not None:
+            self.repo_infos.move_to_end(repo_url)
+            self.metrics.deduplicated.inc(reason="repo_info")
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(super().get_repo_info(repo_url))
+        self.repo_infos[repo_url] = future
+        while len(self.repo_infos) > self.repo_info_cache_size:
+            self.repo_infos.popitem(last=False)
+        repo_info = await asyncio.shield(future)
+        if repo_info is None and self.repo_infos.get(repo_url) is future:
+            # Failures are not shared with later queries, they fetch the repository again
+            del self.repo_infos[repo_url]
+        return repo_info
+
+    async def produce_query_results(self, query, queue, semaphore):
+        """
+        Flip through the search pages of one query and feed its hits into the work queue.
+
+        Parameters:
+        - query (dict): The query, with 'keywords' and 'type'.
+        - queue (asyncio.Queue): The queue the enrichment workers read from.
+        - semaphore (asyncio.Semaphore): Limits how many queries are paginated at the same time.
+        """
+        keywords = query.get("keywords", [])
+        search_type = query.get("type", self.search_type)
+        key = self.query_key(await self.construct_github_search_params(keywords, search_type))
+        async with semaphore:
+            logger.info(f"Running query {query_id(query)}")
+            async for result in self.iter_search_results(keywords=keywords, search_type=search_type):
+                result["query"] = query_id(query)
+                await queue.put((key, search_type, result))
+
+    async def produce_search_results(self, queue):
+        """
+        Feed the hits of all queries into the bounded work queue, paginating up to `query_concurrency`
+        queries at the same time.
+
+        Parameters:
+        - queue (asyncio.Queue): The queue the enrichment workers read from, fed with
+          (query key, search type, hit) tuples.
+        """
+        semaphore = asyncio.Semaphore(self.query_concurrency)
+        try:
+            outcomes = await asyncio.gather(*(self.produce_query_results(query, queue, semaphore)
+                                              for query in self.queries), return_exceptions=True)
+            for query, outcome in zip(self.queries, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Query {query_id(query)} failed: {outcome}")
+        finally:
+            for _ in range(self.concurrency):
+                await queue.put(_DONE)
+
+    async def close(self):
+        """
+        Release everything the batch holds, dropping the repository details shared between queries.
+        """
+        for future in self.repo_infos.values():
+            future.cancel()
+        self.repo_infos.clear()
+        await super().close()
@@ -0,0 +1,144 @@
+"""
+End-to-end throughput benchmark of GitHubCrawler.run() against the local mock GitHub server.
+
+Every scenario runs in a fresh process, so that its peak RSS is its own, while the mock server runs in
+the benchmark process. For each combination of result count and concurrency it reports search pages per
+second, repositories per second, p50/p99 request latency and peak RSS.
+
+Usage:
+    python -m benchmarks.bench_crawler [--results 100 1000] [--concurrency 1 10 50] [--latency 0.02]
+                                       [--rate-limit-rate 0.0] [--json bench.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.mock_github import MockGitHubServer
+from crawler import GitHubCrawler
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class TimedCrawler(GitHubCrawler):
+    """
+    A crawler recording the latency of every request it sends.
+    """
+    def __init__(self, data):
+        super().__init__(data)
+        self.latencies = []
+        self.search_pages = 0
+
+    async def fetch_page(self, url, params=None, proxy=None, timeout=None):
+        start = time.perf_counter()
+        try:
+            return await super().fetch_page(url, params=params, proxy=proxy, timeout=timeout)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            if url == "/search":
+                self.search_pages += 1
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_scenario(config):
+    """
+    Runs one crawl and measures it. Meant to run in its own process.
+
+    Args:
+        config (dict): The crawler configuration.
+
+    Returns:
+        dict: The measurements of the crawl.
+    """
+    crawler = TimedCrawler(config)
+    start = time.perf_counter()
+    results = asyncio.run(crawler.run())
+    elapsed = time.perf_counter() - start
+    return {
+        "results": len(results),
+        "seconds": elapsed,
+        "pages_per_second": crawler.search_pages / elapsed,
+        "repos_per_second": len(results) / elapsed,
+        "p50_latency_ms": percentile(crawler.latencies, 0.50) * 1000,
+        "p99_latency_ms": percentile(crawler.latencies, 0.99) * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+    }
+
+
+class ServerThread:
+    """
+    Runs a MockGitHubServer on its own event loop in a background thread.
+    """
+    def __init__(self, server):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self.server
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def run(results_counts, concurrencies, latency, rate_limit_rate, extra_config=None):
+    """
+    Runs every scenario and prints a table of the measurements.
+
+    Returns:
+        list: One dictionary of measurements per scenario.
+    """
+    report = []
+    print(f"{'results':>8}{'concurrency':>13}{'pages/s':>10}{'repos/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>9}")
+    for repositories in results_counts:
+        for concurrency in concurrencies:
+            server = MockGitHubServer(repositories=repositories, latency=latency, rate_limit_rate=rate_limit_rate,
+                                      retry_after=0)
+            # A new process per scenario, so that the peak RSS of one does not carry over to the next
+            with ServerThread(server), \
+                    ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                config = {"base_url": server.url, "keywords": ["benchmark"], "type": "repositories",
+                          "concurrency": concurrency, **(extra_config or {})}
+                measurements = pool.submit(run_scenario, config).result()
+            measurements.update({"repositories": repositories, "concurrency": concurrency})
+            report.append(measurements)
+            rss = measurements["peak_rss_mb"]
+            print(f"{repositories:>8}{concurrency:>13}{measurements['pages_per_second']:>10.1f}"
+                  f"{measurements['repos_per_second']:>10.1f}{measurements['p50_latency_ms']:>9.1f}"
+                  f"{measurements['p99_latency_ms']:>9.1f}{rss if rss is None else round(rss, 1):>9}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GitHub crawler end-to-end benchmark")
+    parser.add_argument("--results", type=int, nargs="+", default=[100, 1000], help="Search hits per scenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Enrichment workers")
+    parser.add_argument("--latency", type=float, default=0.02, help="Server latency per request in seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--parallel-pages", action="store_true", help="Fetch search pages concurrently")
+    parser.add_argument("--stream-repo-pages", action="store_true", help="Stop reading repository pages early")
+    parser.add_argument("--parser", default="auto", help="Parser engine: auto, selectolax, lxml or bs4")
+    parser.add_argument("--json", help="Write the measurements to this file, to compare runs")
+    args = parser.parse_args()
+
+    report = run(args.results, args.concurrency, args.latency, args.rate_limit_rate,
+                 {"parallel_pages": args.parallel_pages, "parser": args.parser,
+                  "stream_repo_pages": args.stream_repo_pages})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,44 @@
+"""
+Micro-benchmark of the search and repository page parsers.
+
+Compares the original BeautifulSoup path, which builds one DOM for the results and another one for the
+pagination, with the single-pass parse of every installed engine.
+
+Usage:
+    python -m benchmarks.bench_parsers [--results 10] [--repeat 200]
+"""
+import argparse
+import timeit
+from benchmarks.mock_github import make_repo_page, make_search_page
+from parsers.engines import ENGINES
+from parsers.github import GitHubParser
+
+def legacy_search_page(html):
+    return GitHubParser.parse_search_results(html, "repositories"), GitHubParser.parse_pagination(html)
+
+
+def run(results, repeat):
+    search_html = make_search_page([f"/owner{i}/repo{i}" for i in range(results)], page=1, page_count=100)
+    repo_html = make_repo_page()
+    candidates = [("bs4 two-pass (legacy)", legacy_search_page, GitHubParser.parse_repo_info)]
+    for name, (parser, module) in ENGINES.items():
+        if module:
+            candidates.append((f"{name} single-pass",
+                               lambda html, parser=parser: parser.parse_search_page(html, "repositories"),
+                               parser.parse_repo_info))
+
+    baseline = None
+    print(f"{'parser':<24}{'search page/s':>16}{'repo page/s':>16}{'speedup':>10}")
+    for name, parse_search, parse_repo in candidates:
+        search_rate = repeat / timeit.timeit(lambda: parse_search(search_html), number=repeat)
+        repo_rate = repeat / timeit.timeit(lambda: parse_repo(repo_html), number=repeat)
+        baseline = baseline or search_rate
+        print(f"{name:<24}{search_rate:>16.1f}{repo_rate:>16.1f}{search_rate / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GitHub parser micro-benchmark")
+    parser.add_argument("--results", type=int, default=10, help="Number of hits on the search page")
+    parser.add_argument("--repeat", type=int, default=200, help="Number of parses per measurement")
+    args = parser.parse_args()
+    run(args.results, args.repeat)
@@ -0,0 +1,261 @@
+"""
+A local stand-in for GitHub web search, used by the end-to-end tests and benchmarks.
+
+It serves generated search and repository pages with the markup the parsers look for, and can inject
+latency, 429 responses and failing proxies. The server also answers requests sent to it as an HTTP proxy,
+so `proxy_url` can be put in the crawler's proxy list, next to the always refusing `dead_proxy_url`.
+
+Usage:
+    async with MockGitHubServer(repositories=200, latency=0.05) as server:
+        crawler = GitHubCrawler({"base_url": server.url, "keywords": ["python"], "type": "repositories"})
+        results = await crawler.run()
+"""
+import asyncio
+import datetime
+import math
+import random
+import socket
+from aiohttp import web
+
+# Roughly what GitHub wraps around every search hit and every page
+NOISE = "".join(f'<div class="Box-row d-flex"><span class="color-fg-muted" title="{i}">{"lorem ipsum " * 8}</span></div>'
+                for i in range(40))
+
+
+LANGUAGES = ["Python", "JavaScript", "Go", "Rust", "C"]
+
+
+def repo_attributes(index):
+    """
+    The creation date, star count and language of a generated repository, spread over ten years.
+
+    Args:
+        index (int): The number of the repository.
+
+    Returns:
+        dict: The 'created' date, the 'stars' and the 'language' of the repository.
+    """
+    return {"created": datetime.date(2015, 1, 1) + datetime.timedelta(days=index * 37 % 3650),
+            "stars": index * 7919 % 1000, "language": LANGUAGES[index % len(LANGUAGES)]}
+
+
+def matches_qualifier(attributes, qualifier):
+    """
+    Tells whether a repository matches one search term. Terms other than the `created:`, `stars:` and
+    `language:` qualifiers match every repository.
+
+    Args:
+        attributes (dict): The attributes of the repository, as given by `repo_attributes`.
+        qualifier (str): The search term, for example 'created:2020-01-01..2020-06-30', 'stars:>=100'
+            or '-language:Go'.
+
+    Returns:
+        bool: Whether the repository matches.
+    """
+    negated = qualifier.startswith("-")
+    name, _, value = qualifier.lstrip("-").partition(":")
+    if name == "language":
+        matched = attributes["language"].lower() == value.lower()
+    elif name in ("created", "stars"):
+        parse = datetime.date.fromisoformat if name == "created" else int
+        if value.startswith(">="):
+            matched = attributes[name] >= parse(value[2:])
+        else:
+            low, high = value.split("..")
+            matched = parse(low) <= attributes[name] <= parse(high)
+    else:
+        return True
+    return matched != negated
+
+
+def make_search_page(urls, page=1, page_count=1):
+    """
+    Builds a search page with the markup the parsers look for.
+
+    Args:
+        urls (list): The relative URLs of the hits on the page.
+        page (int): The number of the current page.
+        page_count (int): The number of the last page.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    hits = "".join(
+        f'<div class="Box-sc-g0xbh4-0"><div class="search-title"><a href="/login?return_to={url.replace("/", "%2F")}">'
+        f'Sign in</a><a href="{url}"><span>{url[1:]}</span></a></div>'
+        f'<p class="description">{"A repository description. " * 4}</p>{NOISE[:800]}</div>'
+        for url in urls)
+    pages = "".join(f'<a href="/search?p={p}">{p}</a>' for p in range(max(1, page - 2), min(page_count, page + 3)))
+    next_link = f'<a rel="next" href="/search?p={page + 1}">Next</a>' if page < page_count else ""
+    return (f'<html><head><title>Search</title></head><body>{NOISE}'
+            f'<div data-testid="results-list">{hits}</div>'
+            f'<nav aria-label="Pagination"><em class="current">{page}</em>{pages}'
+            f'<span class="gap">…</span><a href="/search?p={page_count}">{page_count}</a>{next_link}</nav>'
+            f'{NOISE}</body></html>')
+
+
+def make_repo_page(owner="owner", languages=6):
+    """
+    Builds a repository page with an author and a language bar.
+
+    Args:
+        owner (str): The owner of the repository.
+        languages (int): The number of languages in the language bar.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    progress = "".join(f'<span class="Progress-item color-bg-success-emphasis" aria-label="Lang{i} {100 / languages:.1f}%"'
+                       f' style="width: 10%"></span>' for i in range(languages))
+    return (f'<html><body>{NOISE * 5}<span class="author flex-self-stretch"><a href="/{owner}">{owner}</a></span>'
+            f'{NOISE * 5}<span class="Progress mb-2">{progress}</span>{NOISE * 5}</body></html>')
+
+
+class MockGitHubServer:
+    """
+    Serves `repositories` generated repositories as GitHub search results, `per_page` hits per page.
+
+    Every repository has a creation date, a star count and a language, so queries can be narrowed with
+    `created:`, `stars:` and `language:` qualifiers. Like GitHub, the server paginates at most `result_cap`
+    hits of a query.
+
+    Attributes:
+        repositories (int): The number of search hits for a query without qualifiers.
+        per_page (int): The number of hits per search page.
+        result_cap (int): The number of hits after which pagination stops, or None for no cap.
+        latency (float): Seconds every response is delayed by.
+        jitter (float): Up to this many seconds are added to the latency at random.
+        rate_limit_rate (float): The share of requests answered with a 429.
+        retry_after (int): The Retry-After value of the 429 responses, or None to leave the header out.
+        proxy_failure_rate (float): The share of requests answered with a 502, as a failing proxy would.
+        compress (bool): Whether pages are gzip-compressed and sent chunked, as GitHub sends them.
+        stats (dict): Counters of the search, repo, rate_limited and failed responses served.
+        url (str): The base URL of the server once started.
+        proxy_url (str): The proxy address of the server once started.
+        dead_proxy_url (str): A proxy address that refuses every connection.
+    """
+    def __init__(self, repositories=100, per_page=10, latency=0.0, jitter=0.0, rate_limit_rate=0.0, retry_after=1,
+                 proxy_failure_rate=0.0, seed=0, result_cap=None, compress=False):
+        self.repositories = repositories
+        self.per_page = per_page
+        self.result_cap = result_cap
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.proxy_failure_rate = proxy_failure_rate
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.stats = {"search": 0, "repo": 0, "rate_limited": 0, "failed": 0}
+        self.runner = None
+        self.url = None
+        self.proxy_url = None
+        self.dead_proxy_url = None
+
+    async def start(self):
+        """
+        Starts the server on a free local port.
+
+        Returns:
+            str: The base URL of the server.
+        """
+        app = web.Application()
+        app.router.add_get("/search", self.search)
+        app.router.add_get("/{owner}/{repo}", self.repository)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = self.proxy_url = f"http://127.0.0.1:{port}"
+
+        # Binding without listening reserves a port that refuses connections
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.dead_proxy_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        return self.url
+
+    async def stop(self):
+        """
+        Stops the server.
+        """
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    @property
+    def page_count(self):
+        return max(1, math.ceil(self.repositories / self.per_page))
+
+    def matching(self, query):
+        """
+        Lists the repositories a search query finds, up to the result cap.
+
+        Args:
+            query (str): The search query, terms separated by '+' or spaces.
+
+        Returns:
+            list: The numbers of the matching repositories.
+        """
+        qualifiers = [term for term in query.replace("+", " ").split() if ":" in term]
+        indexes = range(self.repositories)
+        if qualifiers:
+            indexes = [i for i in indexes
+                       if all(matches_qualifier(repo_attributes(i), qualifier) for qualifier in qualifiers)]
+        return indexes[:self.result_cap] if self.result_cap is not None else indexes
+
+    async def respond(self):
+        """
+        Delays the response and decides whether a failure is injected.
+
+        Returns:
+            web.Response or None: The injected failure, or None to serve the page.
+        """
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.proxy_failure_rate:
+            self.stats["failed"] += 1
+            return web.Response(status=502, text="Bad Gateway")
+        if self.random.random() < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+            return web.Response(status=429, text="Too Many Requests", headers=headers)
+        return None
+
+    async def search(self, request):
+        failure = await self.respond()
+        if failure is not None:
+            return failure
+
+        page = int(request.query.get("p", 1))
+        indexes = self.matching(request.query.get("q", ""))
+        page_count = max(1, math.ceil(len(indexes) / self.per_page))
+        if page > page_count:
+            return web.Response(status=404, text="Not Found")
+        self.stats["search"] += 1
+        first = (page - 1) * self.per_page
+        urls = [f"/owner{i}/repo{i}" for i in indexes[first:first + self.per_page]]
+        return self.page(make_search_page(urls, page, page_count))
+
+    async def repository(self, request):
+        failure = await self.respond()
+        if failure is not None:
+            return failure
+
+        self.stats["repo"] += 1
+        return self.page(make_repo_page(request.match_info["owner"]))
+
+    def page(self, html):
+        response = web.Response(text=html, content_type="text/html")
+        if self.compress:
+            response.enable_compression()
+            response.enable_chunked_encoding()
+        return response
@@ -1,60 +1,472 @@
 import aiohttp
-import json
 import asyncio
+import codecs
 import logging
-from parsers.github import GitHubParser
-from misc.utils import ProxyManager
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from parsers.engines import get_parser
+from parsers.executor import ParseExecutor
+from parsers.stream import RepoPageScanner
+from misc.cache import ResponseCache
+from misc.checkpoint import CheckpointStore
+from misc.dedup import RequestDeduplicator, normalize_url
+from misc.metrics import CrawlMetrics, get_exporters, proxy_label
+from misc.repo_index import RepoIndex
+from misc.utils import ProxiesExhausted, ProxyManager, RateLimiter, parse_retry_after
 from generic.basic_crawler import Crawler
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a stream on the pipeline queues
+_DONE = object()
+
 class GitHubCrawler(Crawler):
     def __init__(self, data):
         self.keywords = data.get("keywords", [])
         self.proxies = data.get("proxies", [])
         self.search_type = data.get("type", "")
-        self.proxy_manager = ProxyManager(self.proxies)
-        self.parser = GitHubParser()
-        self.current_proxy = None
-        self.GITHUB_BASE_URL = "https://github.com"
+        self.proxy_manager = ProxyManager(self.proxies, max_usage=data.get("proxy_max_usage"),
+                                          cooldown=data.get("proxy_cooldown", 60),
+                                          max_failures=data.get("proxy_max_failures", 3))
+        self.proxy_health_interval = data.get("proxy_health_interval")
+        self.proxy_retries = data.get("proxy_retries", max(3, len(self.proxies)))
+        self.parser = get_parser(data.get("parser", "auto"))
+        self.parse_executor = ParseExecutor(data.get("parse_workers", 0), data.get("parse_executor", "process"))
+        self.GITHUB_BASE_URL = data.get("base_url", "https://github.com")
         self.session = None  # Initialize session variable
+        self.session_headers = None
+        self.proxy_sessions = {}
+        self.proxy_pools = data.get("proxy_pools", True)
+        self.connector_options = {
+            "limit": data.get("connection_limit", 100),
+            "limit_per_host": data.get("connection_limit_per_host", 0),
+            "ttl_dns_cache": data.get("dns_cache_ttl", 300),
+            "keepalive_timeout": data.get("keepalive_timeout", 30),
+        }
+        self.concurrency = max(1, data.get("concurrency", 10))
+        self.queue_size = data.get("queue_size", 100)
+        self.rate_limiter = RateLimiter(data.get("rate_limit"), adaptive=data.get("adaptive_rate_limit", False),
+                                        min_rate=data.get("min_rate_limit", 0.2), max_rate=data.get("max_rate_limit"),
+                                        max_backoff=data.get("max_backoff", 60),
+                                        max_retry_after=data.get("max_retry_after", 300))
+        self.parallel_pages = data.get("parallel_pages", False)
+        self.page_concurrency = max(1, data.get("page_concurrency", 5))
+        self.cache = None
+        self.cache_thread = None
+        if data.get("cache_dir"):
+            self.cache = ResponseCache(data["cache_dir"], ttl=data.get("cache_ttl", 86400),
+                                       max_size=data.get("cache_max_size"), offline=data.get("offline", False))
+        self.checkpoint = CheckpointStore(data["checkpoint"]) if data.get("checkpoint") else None
+        self.resume = data.get("resume", False)
+        self.repo_index = None
+        if data.get("repo_index"):
+            self.repo_index = RepoIndex(data["repo_index"], ttl=data.get("repo_index_ttl", 7 * 86400))
+        self.incremental = data.get("incremental", False)
+        self.stream_repo_pages = data.get("stream_repo_pages", False)
+        self.deduplicator = None
+        if data.get("dedupe_requests", True):
+            self.deduplicator = RequestDeduplicator(data.get("dedupe_cache_size", 32 * 1024 * 1024))
+        self.metrics = CrawlMetrics()
+        self.metrics_exporters = get_exporters(self.metrics, data)
 
     async def create_session(self, custom_headers=None):
         """
         Create a new aiohttp session if one does not exist or if the current session is closed.
+
+        The session lives for the whole crawl, so its keep-alive connections are reused by the search
+        and the detail fetches alike.
         """
         if custom_headers is None:
             custom_headers = {
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
             }
+        self.session_headers = custom_headers
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(base_url=self.GITHUB_BASE_URL, headers=custom_headers)
+            self.session = self.new_session("direct")
+
+    def new_session(self, pool):
+        """
+        Create an aiohttp session with its own tuned connection pool: bounded in total and per host,
+        with cached DNS lookups and keep-alive connections. Connections opened and reused by the pool
+        are counted in the metrics.
+
+        Parameters:
+        - pool (str): The name of the pool in the metrics, 'direct' or the proxy.
+
+        Returns:
+        - session (aiohttp.ClientSession): The new session.
+        """
+        async def on_connection_create(session, context, params):
+            self.metrics.connections.inc(pool=pool, result="new")
+
+        async def on_connection_reuse(session, context, params):
+            self.metrics.connections.inc(pool=pool, result="reused")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create)
+        trace_config.on_connection_reuseconn.append(on_connection_reuse)
+        return aiohttp.ClientSession(base_url=self.GITHUB_BASE_URL, headers=self.session_headers,
+                                     connector=aiohttp.TCPConnector(**self.connector_options),
+                                     trace_configs=[trace_config])
+
+    def get_session(self, proxy=None):
+        """
+        Get the session a request is sent with. With `proxy_pools` enabled every proxy has a session and
+        a connection pool of its own, so a slow or busy proxy cannot use up the connections of the others.
+
+        Parameters:
+        - proxy (str): The proxy the request goes through, if any.
+
+        Returns:
+        - session (aiohttp.ClientSession): The session.
+        """
+        if proxy is None or not self.proxy_pools:
+            return self.session
+        session = self.proxy_sessions.get(proxy)
+        if session is None or session.closed:
+            session = self.proxy_sessions[proxy] = self.new_session(proxy_label(proxy))
+        return session
 
     async def close_session(self):
         """
-        Close the aiohttp session if it exists and is open.
+        Close the aiohttp sessions if they exist and are open.
+        """
+        for session in [self.session, *self.proxy_sessions.values()]:
+            if session and not session.closed:
+                await session.close()
+        self.proxy_sessions = {}
+
+    async def close(self):
+        """
+        Release everything the crawl holds: the aiohttp sessions, the parse workers, the cache thread, the proxy
+        health checks, the metrics exporters and the checkpoint and repository index databases. The databases
+        are opened again if the crawler runs again.
         """
-        if self.session and not self.session.closed:
-            await self.session.close()
+        await self.close_session()
+        self.parse_executor.shutdown()
+        if self.cache_thread:
+            self.cache_thread.shutdown()
+            self.cache_thread = None
+        self.proxy_manager.stop_health_checks()
+        for exporter in self.metrics_exporters:
+            await exporter.stop()
+        if self.checkpoint:
+            self.checkpoint.close()
+        if self.repo_index:
+            self.repo_index.close()
 
-    async def construct_github_search_params(self):
+    async def construct_github_search_params(self, keywords=None, search_type=None):
         """
         Construct the GitHub search URL and parameters.
 
+        Parameters:
+        - keywords (list): The keywords to search for, defaults to the configured ones.
+        - search_type (str): The type of search, defaults to the configured one.
+
         Returns:
         - params (dict): Parameters for the GitHub search.
         """
         await self.create_session()
 
-        query = "+".join(self.keywords)
+        query = "+".join(self.keywords if keywords is None else keywords)
         params = {
             "q": query,
-            "type": self.search_type
+            "type": self.search_type if search_type is None else search_type
         }
 
-        self.current_proxy = self.proxy_manager.get_next_proxy()  # This can return None if no proxies are left
         return params
 
+    @staticmethod
+    def query_key(params):
+        """
+        Get the key identifying a search query in the checkpoint store.
+
+        Parameters:
+        - params (dict): Parameters for the GitHub search.
+
+        Returns:
+        - key (str): The query and the search type.
+        """
+        return f"{params['q']}|{params['type']}"
+
+    def get_limiter_key(self, url, proxy=None):
+        """
+        Get the rate limiter key of a request: its proxy, or its host when sent directly, and its endpoint
+        class, since GitHub throttles search pages much harder than repository pages.
+
+        Parameters:
+        - url (str): An absolute or session-relative URL.
+        - proxy (str): The proxy the request goes through, if any.
+
+        Returns:
+        - key (tuple): The exit point and the endpoint class, 'search' or 'repo'.
+        """
+        return proxy or self.get_host(url), self.get_page_type(url)
+
+    @staticmethod
+    def get_page_type(url):
+        """
+        Get the kind of page a URL points to.
+
+        Parameters:
+        - url (str): An absolute or session-relative URL.
+
+        Returns:
+        - page_type (str): 'search' for search pages, 'repo' otherwise.
+        """
+        return "search" if urlsplit(url).path.startswith("/search") else "repo"
+
+    def get_host(self, url):
+        """
+        Get the host a request URL is sent to; relative URLs resolve against GitHub.
+
+        Parameters:
+        - url (str): An absolute or session-relative URL.
+
+        Returns:
+        - host (str): The network location of the URL.
+        """
+        return urlsplit(url).netloc or urlsplit(self.GITHUB_BASE_URL).netloc
+
+    async def run_cache(self, method, *args):
+        """
+        Run a method of the response cache on the cache thread, so its file I/O does not block the event loop.
+        The calls are made one at a time, in order.
+
+        Parameters:
+        - method (callable): The method of the cache.
+        - *args: Its arguments.
+
+        Returns:
+        - The return value of the method.
+        """
+        if self.cache_thread is None:
+            self.cache_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        return await asyncio.get_running_loop().run_in_executor(self.cache_thread, method, *args)
+
+    async def fetch_page(self, url, params=None, proxy=None, timeout=None):
+        """
+        Fetch an HTML page through the response cache, if one is configured.
+
+        Fresh cache entries are returned without a request, stale ones are revalidated with conditional
+        headers and reused on a 304. In offline mode a cache miss is answered with a 504 status.
+        The outcome and latency of every request are reported to the rate limiter and the proxy manager.
+
+        Parameters:
+        - url (str): The URL of the page.
+        - params (dict): Query parameters, if any.
+        - proxy (str): The proxy to send the request through, if any.
+        - timeout (float): The request timeout in seconds, if any.
+
+        Returns:
+        - status (int): The HTTP status code, 200 for pages served from the cache.
+        - html (str): The HTML content of the page, or None if the status is not 200.
+        """
+        cached = await self.run_cache(self.cache.get, url, params) if self.cache else None
+        if cached and self.cache.is_fresh(cached):
+            self.metrics.cache.inc(result="hit")
+            return 200, cached.body
+        if self.cache:
+            self.metrics.cache.inc(result="stale" if cached else "miss")
+        if self.cache and self.cache.offline:
+            logger.warning(f"{url} is not cached, skipping it in offline mode")
+            return 504, None
+
+        options = {"params": params, "proxy": proxy}
+        if cached:
+            options["headers"] = self.cache.conditional_headers(cached)
+        if timeout is not None:
+            options["timeout"] = timeout
+
+        limiter_key = self.get_limiter_key(url, proxy)
+        await self.rate_limiter.acquire(limiter_key)
+        start = time.monotonic()
+        try:
+            async with self.get_session(proxy).get(url, **options) as response:
+                latency = time.monotonic() - start
+                self.metrics.request_seconds.observe(latency, page_type=limiter_key[1], proxy=proxy_label(proxy))
+                self.report_outcome(limiter_key, proxy, response, latency)
+                return await self.read_response(url, params, response, cached)
+        except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError, asyncio.TimeoutError) as e:
+            self.metrics.responses.inc(page_type=limiter_key[1], status=type(e).__name__)
+            if proxy:
+                self.proxy_manager.report_failure(proxy)
+            raise
+
+    def report_outcome(self, limiter_key, proxy, response, latency):
+        """
+        Report the outcome of a request to the rate limiter and the proxy manager. A 429 backs the limiter
+        key off and puts the proxy on cooldown, for the Retry-After delay (at most `max_retry_after`) when the
+        response has one and for the configured `proxy_cooldown` otherwise.
+
+        Parameters:
+        - limiter_key (tuple): The rate limiter key of the request.
+        - proxy (str): The proxy the request went through, if any.
+        - response (aiohttp.ClientResponse): The response.
+        - latency (float): The time until the response headers arrived, in seconds.
+        """
+        self.metrics.responses.inc(page_type=limiter_key[1], status=response.status)
+        if response.status == 429:
+            self.metrics.rate_limited.inc(page_type=limiter_key[1], proxy=proxy_label(proxy))
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                retry_after = min(retry_after, self.rate_limiter.max_retry_after)
+            delay = self.rate_limiter.report_rate_limited(limiter_key, retry_after)
+            logger.info(f"Backing off {limiter_key} for {delay:.1f}s")
+            if proxy:
+                self.proxy_manager.report_failure(proxy, rate_limited=True, retry_after=retry_after)
+        else:
+            self.rate_limiter.report_success(limiter_key)
+            if proxy:
+                self.proxy_manager.report_success(proxy, latency)
+
+    async def read_response(self, url, params, response, cached):
+        """
+        Read a page response, serving the cached body on a 304 and storing fresh bodies in the cache.
+
+        Parameters:
+        - url (str): The URL of the page.
+        - params (dict): Query parameters, if any.
+        - response (aiohttp.ClientResponse): The response.
+        - cached (CachedResponse): The stored response the request was conditional on, if any.
+
+        Returns:
+        - status (int): The HTTP status code, 200 for revalidated pages.
+        - html (str): The HTML content of the page, or None if the status is not 200.
+        """
+        if response.status == 304 and cached:
+            self.metrics.cache.inc(result="revalidated")
+            await self.run_cache(self.cache.touch, url, params)
+            return 200, cached.body
+        if response.status != 200:
+            return response.status, None
+
+        page_type = self.get_page_type(url)
+        if self.stream_repo_pages and page_type == "repo":
+            html, size = await self.read_repo_page(response)
+        else:
+            html = await response.text()
+            size = response.content.total_bytes
+        self.metrics.downloaded_bytes.inc(size, page_type=page_type)
+        if self.cache:
+            await self.run_cache(self.cache.set, url, params, html, response.headers)
+        return 200, html
+
+    async def read_repo_page(self, response, chunk_size=16384, drain_limit=65536):
+        """
+        Read a repository page in chunks and stop as soon as its author and language bar are complete.
+
+        The rest of the body is never decoded nor parsed. Up to `drain_limit` more bytes of it are read and
+        dropped: if the body ends within them the connection is reused, otherwise it is closed instead of
+        downloading the rest of the page. The remainder is read rather than computed from Content-Length,
+        which is missing from chunked responses and counts compressed bytes.
+
+        Parameters:
+        - response (aiohttp.ClientResponse): The response of the repository page.
+        - chunk_size (int): How many bytes are read at a time.
+        - drain_limit (int): The largest unread remainder drained to keep the connection alive.
+
+        Returns:
+        - html (str): The HTML of the page up to the end of the language bar, or all of it if the
+          sections were not found.
+        - size (int): The number of body bytes read, as for fully read pages.
+        """
+        scanner = RepoPageScanner()
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        async for chunk in response.content.iter_chunked(chunk_size):
+            if scanner.feed(decoder.decode(chunk)):
+                left = drain_limit
+                while chunk:
+                    chunk = await response.content.read(min(chunk_size, left + 1))
+                    left -= len(chunk)
+                    if left < 0:
+                        response.close()
+                        break
+                break
+        else:
+            scanner.feed(decoder.decode(b"", final=True))
+        return scanner.html(), response.content.total_bytes
+
+    async def fetch_with_proxy(self, url, params=None, timeout=None):
+        """
+        Fetch a page on a proxy leased for this request alone, unless the same page is already being fetched
+        or was fetched recently.
+
+        Requests are deduplicated by their normalized URL: a request for a page that is in flight waits for
+        it, and a page fetched recently is served again, without using a proxy or the rate limiter.
+
+        Parameters:
+        - url (str): The URL of the page.
+        - params (dict): Query parameters, if any.
+        - timeout (float): The request timeout in seconds, if any.
+
+        Returns:
+        - status (int): The HTTP status code of the last attempt.
+        - html (str): The HTML content of the page, or None if the status is not 200.
+
+        Raises:
+        - ProxiesExhausted: If all proxies are dead or used up.
+        """
+        if self.deduplicator is None:
+            return await self.fetch_with_retries(url, params, timeout)
+        key = normalize_url(url, params, self.GITHUB_BASE_URL)
+        response, outcome = await self.deduplicator.fetch(key, lambda: self.fetch_with_retries(url, params, timeout))
+        if outcome != "fetched":
+            self.metrics.deduplicated.inc(reason=outcome)
+        return response
+
+    async def fetch_with_retries(self, url, params=None, timeout=None):
+        """
+        Fetch a page on a proxy leased for this request alone.
+
+        After a 429 or a proxy connection error the request is retried up to `proxy_retries` times on a
+        proxy it has not failed on yet, without affecting any other request in flight. Without configured
+        proxies the page is fetched directly and a 429 is retried once the rate limiter's backoff is over.
+
+        Parameters:
+        - url (str): The URL of the page.
+        - params (dict): Query parameters, if any.
+        - timeout (float): The request timeout in seconds, if any.
+
+        Returns:
+        - status (int): The HTTP status code of the last attempt.
+        - html (str): The HTML content of the page, or None if the status is not 200.
+
+        Raises:
+        - ProxiesExhausted: If all proxies are dead or used up.
+        """
+        use_proxies = bool(self.proxy_manager.stats)
+        failed = set()
+        status = None
+        for _ in range(self.proxy_retries + 1):
+            proxy = None
+            if use_proxies:
+                proxy = await self.proxy_manager.acquire(exclude=failed)
+                if proxy is None:
+                    raise ProxiesExhausted("There are no more available proxies.")
+            try:
+                status, html = await self.fetch_page(url, params=params, proxy=proxy, timeout=timeout)
+            except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError) as e:
+                logger.warning(f"Failed to connect to proxy server {proxy}: {e}")
+                self.metrics.retries.inc(reason="proxy_error")
+                failed.add(proxy)
+                continue
+            finally:
+                if proxy:
+                    self.proxy_manager.release(proxy)
+
+            if status != 429:
+                return status, html
+            self.metrics.retries.inc(reason="rate_limited")
+            if proxy:
+                logger.warning(f"Rate limit exceeded on {proxy}. Switching proxy...")
+                failed.add(proxy)
+            else:
+                logger.warning(f"Rate limit exceeded for {url}. Retrying after backoff...")
+
+        return status, None
+
     async def fetch_search_page(self, search_url, params):
         """
         Fetch a GitHub search page.
@@ -65,63 +477,199 @@ class GitHubCrawler(Crawler):
 
         Returns:
         - HTML content of the search page.
+
+        Raises:
+        - ProxiesExhausted: If all proxies are dead or used up, so the crawl stops instead of ending early.
         """
-        proxy = self.current_proxy
+        start = time.monotonic()
         try:
-            async with self.session.get(search_url, params=params, proxy=proxy, timeout=10) as response:
-                if response.status == 200:
-                    return await response.text()
-                elif response.status == 429:
-                    logger.warning("Rate limit exceeded. Switching proxy...")
-                    self.current_proxy = self.proxy_manager.get_next_proxy()
-                    if self.current_proxy:
-                        return await self.fetch_search_page(search_url, params)
-                    else:
-                        raise ValueError("There are no more available proxies.")
-                else:
-                    logger.warning(f"Failed to fetch search results from {response.url}. Status code: {response.status}")
-                    return None
-        except (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError) as e:
-            logger.warning(f"Failed to connect to proxy server {proxy}: {e}")
-            self.current_proxy = self.proxy_manager.get_next_proxy()
-            if self.current_proxy:
-                return await self.fetch_search_page(search_url, params)
+            status, html = await self.fetch_with_proxy(search_url, params=params, timeout=10)
+            if status == 200:
+                return html
+            else:
+                logger.warning(f"Failed to fetch search results from {search_url} with {params}. Status code: {status}")
+                return None
+        except ProxiesExhausted:
+            raise
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             return None
+        finally:
+            self.metrics.stage_seconds.observe(time.monotonic() - start, stage="search_page")
 
-    async def get_search_result(self, search_url="/search"):
+    async def parse_search_page(self, html, page, search_type=None):
         """
-        Get the search results from GitHub.
+        Parse one search page, building its DOM only once. Runs on the parse executor when one is configured.
 
         Parameters:
-        - search_url (str): The URL of the search page.
+        - html (str): The HTML content of the search page.
+        - page (int): The number of the page, used for logging.
+        - search_type (str): The type of search, defaults to the configured one.
 
         Returns:
-        - all_results (list): A list of search result URLs.
+        - search_page (SearchPage): The search results, the next page URL and the number of the last page.
         """
-        params = await self.construct_github_search_params()
-        all_results = []
+        search_type = self.search_type if search_type is None else search_type
+        start = time.monotonic()
+        search_page = await self.parse_executor.run(self.parser.parse_search_page, html, search_type)
+        self.metrics.parse_seconds.observe(time.monotonic() - start, page_type="search")
+        logger.info(f"Page {page}, parsed {len(search_page.results)} entries")
+        return search_page
 
-        logger.info("Getting search results and flipping through the pages...")
+    async def get_search_page(self, search_url, params):
+        """
+        Fetch and parse one search page.
+
+        Parameters:
+        - search_url (str): The search URL.
+        - params (dict): Parameters for the search, with the page number in 'p' after the first page.
+
+        Returns:
+        - search_page (SearchPage): The parsed page, or None if it could not be fetched.
+        """
+        html = await self.fetch_search_page(search_url, params)
+        if not html:
+            return None
+        return await self.parse_search_page(html, params.get('p', 1), params["type"])
+
+    async def iter_page_results(self, params, page, search_page, last):
+        """
+        Yield the hits of a parsed search page, then record the page in the checkpoint store.
+
+        Parameters:
+        - params (dict): Parameters for the GitHub search.
+        - page (int): The number of the page.
+        - search_page (SearchPage): The parsed page.
+        - last (bool): Whether this is the last page of the query.
+
+        Yields:
+        - result (dict): A search result holding the relative URL of the hit.
+        """
+        # Copy the hits first, the workers complete the yielded dictionaries in place
+        hits = [dict(result) for result in search_page.results]
+        for result in search_page.results:
+            yield result
+        if self.checkpoint:
+            self.checkpoint.record_page(self.query_key(params), page, hits, last)
+
+    async def iter_remaining_pages(self, search_url, params, page_count):
+        """
+        Fetch search pages 2 to `page_count` concurrently and yield their hits in page order.
+
+        At most `page_concurrency` pages are requested at the same time. As with sequential paging,
+        the iteration stops at the first page that cannot be fetched.
+
+        Parameters:
+        - search_url (str): The search URL.
+        - params (dict): Parameters of the first search page.
+        - page_count (int): The number of the last search page.
+
+        Yields:
+        - result (dict): A search result holding the relative URL of the hit.
+        """
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch_page(page):
+            async with semaphore:
+                return await self.fetch_search_page(search_url, {**params, 'p': page})
+
+        pages = range(2, page_count + 1)
+        tasks = [asyncio.create_task(fetch_page(page)) for page in pages]
         try:
-            while True:
-                html = await self.fetch_search_page(search_url, params)
+            for page, task in zip(pages, tasks):
+                html = await task
                 if not html:
+                    logger.info(f"Last page was {page - 1}")
                     break
+                search_page = await self.parse_search_page(html, page, params["type"])
+                async for result in self.iter_page_results(params, page, search_page, page == page_count):
+                    yield result
+            else:
+                logger.info(f"Last page was {page_count}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-                short_repo_location = self.parser.parse_search_results(html, self.search_type)
-                all_results.extend(short_repo_location)
-                logger.info(f"Page {params.get('p', 1)}, parsed {len(short_repo_location)} entries")
+    async def iter_search_results(self, search_url="/search", keywords=None, search_type=None):
+        """
+        Flip through the GitHub search pages and yield every hit as soon as its page is parsed.
 
-                next_page_url = self.parser.parse_pagination(html)
-                if next_page_url:
-                    params['p'] = params.get('p', 1) + 1
-                else:
-                    logger.info(f"Last page was {params.get('p', 1)}")
+        With `parallel_pages` enabled, the last page number is read from the pagination of the first
+        page and the remaining pages are fetched concurrently. When the page count cannot be read,
+        the pages are walked one after another by following the next-page link.
+
+        With a checkpoint store, every page is recorded once its hits are yielded. When resuming, the hits
+        recorded by the interrupted crawl are yielded first and pagination continues after the last recorded
+        page; otherwise the query starts over.
+
+        The caller is responsible for closing the session once the iteration is over.
+
+        Parameters:
+        - search_url (str): The URL of the search page.
+        - keywords (list): The keywords to search for, defaults to the configured ones.
+        - search_type (str): The type of search, defaults to the configured one.
+
+        Yields:
+        - result (dict): A search result holding the relative URL of the hit.
+        """
+        params = await self.construct_github_search_params(keywords, search_type)
+
+        if self.checkpoint and self.resume:
+            last_page, done = self.checkpoint.get_progress(self.query_key(params))
+            for result in self.checkpoint.get_hits(self.query_key(params)):
+                yield result
+            if done:
+                logger.info(f"Pagination of {params['q']} already finished at page {last_page}")
+                return
+            if last_page:
+                logger.info(f"Resuming {params['q']} at page {last_page + 1}")
+                params['p'] = last_page + 1
+        elif self.checkpoint:
+            self.checkpoint.reset(self.query_key(params))
+
+        logger.info("Getting search results and flipping through the pages...")
+        while True:
+            search_page = await self.get_search_page(search_url, params)
+            if search_page is None:
+                break
+
+            async for result in self.iter_page_results(params, params.get('p', 1), search_page,
+                                                       not search_page.next_page):
+                yield result
+
+            if self.parallel_pages and 'p' not in params:
+                page_count = search_page.page_count
+                if page_count and page_count > 1:
+                    logger.info(f"Fetching {page_count - 1} remaining pages concurrently")
+                    async for result in self.iter_remaining_pages(search_url, params, page_count):
+                        yield result
                     break
+                if page_count is None:
+                    logger.info("Page count unavailable, walking the pages sequentially")
+
+            if search_page.next_page:
+                params['p'] = params.get('p', 1) + 1
+            else:
+                logger.info(f"Last page was {params.get('p', 1)}")
+                break
+
+    async def get_search_result(self, search_url="/search"):
+        """
+        Get the search results from GitHub.
+
+        Parameters:
+        - search_url (str): The URL of the search page.
+
+        Returns:
+        - all_results (list): A list of search result URLs.
+        """
+        all_results = []
+        try:
+            async for result in self.iter_search_results(search_url):
+                all_results.append(result)
         finally:
-            await self.close_session()
+            await self.close()
 
         return all_results
 
@@ -135,46 +683,221 @@ class GitHubCrawler(Crawler):
         Returns:
         - repo_info (dict): Information about the repository.
         """
+        start = time.monotonic()
         try:
-            async with self.session.get(repo_url, proxy=self.current_proxy) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    return self.parser.parse_repo_info(html)
-                else:
-                    logger.warning(f"Failed to fetch repository info for URL: {repo_url}. Status code: {response.status}")
-                    return None
+            status, html = await self.fetch_with_proxy(repo_url)
+            if status == 200:
+                parse_start = time.monotonic()
+                repo_info = await self.parse_executor.run(self.parser.parse_repo_info, html)
+                self.metrics.parse_seconds.observe(time.monotonic() - parse_start, page_type="repo")
+                return repo_info
+            else:
+                logger.warning(f"Failed to fetch repository info for URL: {repo_url}. Status code: {status}")
+                return None
         except Exception as e:
             logger.error(f"Unexpected error while fetching repo info: {e}")
             return None
+        finally:
+            self.metrics.stage_seconds.observe(time.monotonic() - start, stage="repo_info")
 
-    async def run(self):
+    async def get_indexed_repo_info(self, repo_url):
         """
-        Run the GitHub crawler to fetch search results and repository information.
+        Get information about a repository, reusing its details from the repository index while they are fresh.
+        Fetched details are recorded in the index and compared with the ones recorded by earlier crawls.
+
+        Parameters:
+        - repo_url (str): The URL of the repository.
+
+        Returns:
+        - repo_info (dict): Information about the repository, or None if it could not be fetched.
+        - change (str): 'new', 'changed' or 'unchanged' compared to the index, 'unchanged' for details
+          served from the index and 'new' when there is no index.
+        """
+        if self.repo_index is None:
+            return await self.get_repo_info(repo_url), "new"
+
+        entry = self.repo_index.get(repo_url)
+        if entry and self.repo_index.is_fresh(entry):
+            self.repo_index.touch(repo_url)
+            self.metrics.index_lookups.inc(result="fresh")
+            return entry["repo_info"], "unchanged"
+
+        repo_info = await self.get_repo_info(repo_url)
+        if not repo_info:
+            return None, None
+        change = self.repo_index.record(repo_url, repo_info)
+        self.metrics.index_lookups.inc(result=change)
+        return repo_info, change
+
+    async def produce_search_results(self, queue):
+        """
+        Feed search hits into the bounded work queue while the search pages are still being fetched.
+
+        Puts one end-of-stream marker per worker once pagination is over, even if it failed.
+
+        Parameters:
+        - queue (asyncio.Queue): The queue the enrichment workers read from, fed with
+          (query key, search type, hit) tuples.
+        """
+        key = self.query_key(await self.construct_github_search_params())
+        try:
+            async for result in self.iter_search_results():
+                await queue.put((key, self.search_type, result))
+                self.metrics.queue_depth.set(queue.qsize(), queue="work")
+        finally:
+            for _ in range(self.concurrency):
+                await queue.put(_DONE)
+
+    async def complete_search_result(self, key, search_type, result):
+        """
+        Complete a search hit, fetching the repository details when the search type is 'repositories'.
+        Hits completed by an earlier, interrupted crawl are taken from the checkpoint store instead, and
+        new results are recorded there. In incremental mode results are tagged with their 'change'.
+
+        Parameters:
+        - key (str): The query key of the hit.
+        - search_type (str): The type of search that found the hit.
+        - result (dict): The hit, holding its relative URL. It is completed in place.
+
+        Returns:
+        - result (dict): The completed result, or None if the repository details could not be fetched.
+        """
+        url = result["url"]
+        stored = self.checkpoint.get_result(key, url) if self.checkpoint else None
+        if stored:
+            return {**stored, **result, "url": stored["url"]}
+
+        if search_type.lower() == "repositories":
+            repo_info, change = await self.get_indexed_repo_info(url)
+            if not repo_info:
+                return None
+            if self.incremental:
+                result["change"] = change
+            result["extra"] = repo_info
+        result["url"] = self.GITHUB_BASE_URL + url
+        if self.checkpoint:
+            self.checkpoint.add_result(key, url, result)
+        return result
+
+    def in_output(self, result):
+        """
+        Whether a completed result is written out: in incremental mode unchanged repositories are not.
+
+        Parameters:
+        - result (dict): A completed result.
 
         Returns:
-        - final_results (list): A list of dictionaries containing search results and repository information.
+        - in_output (bool): Whether the result belongs in the output.
+        """
+        return not self.incremental or result.get("change") != "unchanged"
+
+    async def enrich_search_results(self, queue, results):
+        """
+        Worker taking search hits off the queue, completing them and passing on the ones that belong
+        in the output.
+
+        Parameters:
+        - queue (asyncio.Queue): The queue of (query key, search type, hit) tuples to process.
+        - results (asyncio.Queue): The queue finished results are put on.
+        """
+        try:
+            while True:
+                item = await queue.get()
+                self.metrics.queue_depth.set(queue.qsize(), queue="work")
+                if item is _DONE:
+                    break
+
+                result = await self.complete_search_result(*item)
+                if result and self.in_output(result):
+                    await results.put(result)
+        finally:
+            await results.put(_DONE)
+
+    async def stream(self):
+        """
+        Run the crawl as a pipeline and yield every result as soon as it is complete.
+
+        Search pages are flipped by a single producer while up to `concurrency` workers fetch
+        repository details from a bounded queue, so detail fetches start before pagination is over.
+        Results come out in completion order, not in search order.
+
+        Yields:
+        - result (dict): A search result with its absolute URL and, for repositories, the 'extra' details.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        results = asyncio.Queue(maxsize=self.queue_size)
+        producer = None
+        workers = []
+
+        try:
+            await self.create_session()
+            if self.proxy_health_interval:
+                self.proxy_manager.start_health_checks(self.proxy_health_interval)
+            for exporter in self.metrics_exporters:
+                await exporter.start()
+            producer = asyncio.create_task(self.produce_search_results(queue))
+            workers = [asyncio.create_task(self.enrich_search_results(queue, results))
+                       for _ in range(self.concurrency)]
+
+            running = len(workers)
+            while running:
+                result = await results.get()
+                self.metrics.queue_depth.set(results.qsize(), queue="results")
+                if result is _DONE:
+                    running -= 1
+                else:
+                    yield result
+            # Surface a pagination failure such as running out of proxies
+            await producer
+        finally:
+            tasks = [task for task in [producer, *workers] if task is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.close()
+
+    async def export(self, sink):
+        """
+        Run the GitHub crawler and write every result to a sink as soon as it is complete.
+
+        Results are not kept after they are written, so memory use does not grow with the number of results.
+
+        Parameters:
+        - sink (ResultSink): The destination of the results.
+
+        Returns:
+        - count (int): The number of results written.
         """
         logger.info("Running GitHub Crawler...")
 
-        search_results = await self.get_search_result()
-        final_results = []
+        count = 0
+        async for result in self.stream():
+            sink.write(result)
+            count += 1
 
-        await self.create_session()
-        if self.search_type.lower() == "repositories":
-            tasks = [self.get_repo_info(result["url"]) for result in search_results]
-            repo_infos = await asyncio.gather(*tasks)
-
-            for result, repo_info in zip(search_results, repo_infos):
-                if repo_info:
-                    result["url"] = self.GITHUB_BASE_URL + result["url"]
-                    result["extra"] = repo_info
-                    final_results.append(result)
-        else:
-            for result in search_results:
-                result["url"] = self.GITHUB_BASE_URL + result["url"]
-                final_results.append(result)
+        logger.info(f"No more tasks. Finished with {count} results")
+        logger.info(f"Crawl metrics: {self.metrics.summary()}")
+        return count
 
-        logger.info(f'No more tasks. Finished with results {json.dumps(final_results, indent=4)}')
-        await self.close_session()
+    async def run(self, results=None):
+        """
+        Run the GitHub crawler to fetch search results and repository information.
+
+        Parameters:
+        - results (list): Where to collect the results, a new list by default. Large crawls can pass a
+          ResultTable, which holds them in a fraction of the memory.
+
+        Returns:
+        - final_results (list): A list of dictionaries containing search results and repository information,
+          or the given container.
+        """
+        logger.info("Running GitHub Crawler...")
+
+        final_results = [] if results is None else results
+        async for result in self.stream():
+            final_results.append(result)
+
+        logger.info(f"No more tasks. Finished with {len(final_results)} results")
+        logger.info(f"Crawl metrics: {self.metrics.summary()}")
 
         return final_results
@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from batch import query_id
+from crawler import GitHubCrawler
+from misc.logging_config import setup_logger
+from misc.work_queue import SqliteWorkQueue, ThreadedWorkQueue
+
+logger = logging.getLogger(__name__)
+
+
+def search_job_key(params, page):
+    """
+    Get the deduplication key of a search page job.
+
+    Parameters:
+    - params (dict): Parameters for the GitHub search.
+    - page (int): The number of the page.
+
+    Returns:
+    - key (str): The key of the job.
+    """
+    return f"search|{GitHubCrawler.query_key(params)}|{page}"
+
+
+class Coordinator:
+    """
+    Seeds a shared work queue with the first search page of every query and collects the results the
+    workers complete, until no job is left.
+
+    The coordinator sends no requests itself: the workers, possibly on other machines with their own
+    proxies, lease the search page and repository jobs from the queue. While streaming, the queue is read
+    on a thread of its own, so the event loop is not blocked while the workers hold the database lock.
+
+    Attributes:
+        work_queue (WorkQueue): The queue shared with the workers.
+        queries (list): The queries, each with 'keywords' and 'type'.
+        poll_interval (float): How many seconds to wait before looking for new results again.
+        workers_alive (callable): Tells whether any worker is still running, when the coordinator
+          started them itself. Without live workers, waiting for the unfinished jobs is given up on.
+    """
+    def __init__(self, work_queue, queries, poll_interval=0.5, workers_alive=None):
+        self.work_queue = work_queue
+        self.queries = queries
+        self.poll_interval = poll_interval
+        self.workers_alive = workers_alive
+        self.queue = ThreadedWorkQueue(work_queue)
+
+    def seed(self):
+        """
+        Add a job for the first search page of every query, in one transaction. Queries seeded before are
+        left alone.
+        """
+        jobs = []
+        for query in self.queries:
+            params = {"q": "+".join(query.get("keywords", [])), "type": query.get("type", "")}
+            payload = {"keywords": query.get("keywords", []), "type": params["type"], "query": query_id(query),
+                       "page": 1}
+            jobs.append(("search", search_job_key(params, 1), payload))
+        self.work_queue.put_many(jobs)
+
+    async def stream(self):
+        """
+        Seed the queue and yield every result as soon as a worker completes it.
+
+        Yields:
+        - result (dict): A completed search result.
+
+        Raises:
+        - RuntimeError: If all the workers started by the coordinator exited before the jobs were done.
+        """
+        await self.queue.run(self.seed)
+        after = 0
+        try:
+            while True:
+                # Read the count first: every job finished before it has its result stored already
+                finished = await self.queue.unfinished() == 0
+                rows = await self.queue.results(after)
+                for after, result in rows:
+                    if result is not None:
+                        yield result
+                if finished and not rows:
+                    break
+                if not rows:
+                    if self.workers_alive and not self.workers_alive():
+                        raise RuntimeError(f"All workers exited with {await self.queue.unfinished()} jobs unfinished")
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            self.queue.shutdown()
+
+    async def export(self, sink):
+        """
+        Collect the results of the distributed crawl and write them to a sink.
+
+        Parameters:
+        - sink (ResultSink): The destination of the results.
+
+        Returns:
+        - count (int): The number of results written.
+        """
+        logger.info("Waiting for workers...")
+        count = 0
+        async for result in self.stream():
+            sink.write(result)
+            count += 1
+        logger.info(f"No more jobs. Finished with {count} results")
+        return count
+
+
+class DistributedWorker(GitHubCrawler):
+    """
+    Drains a shared work queue with its own session, rate limiter and proxies.
+
+    A search page job enqueues a job for each of its hits, then the remaining pages: all of them at once
+    when the page count is known, otherwise the next one. A hit job completes the hit like the local
+    pipeline does, fetching the repository details for repository searches. Jobs that fail are handed out
+    again, possibly to another worker, until the queue gives up on them.
+
+    Up to `concurrency` jobs run at the same time. The worker stops once the queue has had no unfinished
+    job for `worker_idle_timeout` seconds. The queue is called on a thread of its own, so waiting for a
+    database locked by another process does not stall the requests in flight, and the jobs a search page
+    adds are written in one transaction.
+    """
+    def __init__(self, data, work_queue, worker_id=None):
+        super().__init__(data)
+        self.work_queue = work_queue
+        self.queue = ThreadedWorkQueue(work_queue)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = data.get("poll_interval", 0.5)
+        self.idle_timeout = data.get("worker_idle_timeout", 10)
+        self.jobs_done = 0
+
+    async def run_search_job(self, payload):
+        """
+        Fetch one search page and enqueue its hits and the pages after it.
+
+        Parameters:
+        - payload (dict): The query keywords, type and identifier and the page number.
+
+        Returns:
+        - result (dict): Always None, search pages have no result of their own.
+
+        Raises:
+        - RuntimeError: If the page could not be fetched.
+        """
+        page = payload["page"]
+        params = await self.construct_github_search_params(payload["keywords"], payload["type"])
+        page_params = {**params, "p": page} if page > 1 else params
+        html = await self.fetch_search_page("/search", page_params)
+        if not html:
+            raise RuntimeError(f"Search page {page} of {params['q']} could not be fetched")
+
+        search_page = await self.parse_search_page(html, page, params["type"])
+        key = self.query_key(params)
+        jobs = [("hit", f"hit|{key}|{hit['url']}",
+                 {"key": key, "type": params["type"], "query": payload["query"], "hit": hit})
+                for hit in search_page.results]
+
+        if page == 1 and search_page.page_count:
+            next_pages = range(2, search_page.page_count + 1)
+        else:
+            next_pages = [page + 1] if search_page.next_page else []
+        jobs += [("search", search_job_key(params, next_page), {**payload, "page": next_page})
+                 for next_page in next_pages]
+        await self.queue.put_many(jobs)
+        return None
+
+    async def run_hit_job(self, payload):
+        """
+        Complete one search hit.
+
+        Parameters:
+        - payload (dict): The query key, type and identifier and the hit.
+
+        Returns:
+        - result (dict): The completed result, or None if it does not belong in the output.
+
+        Raises:
+        - RuntimeError: If the repository details could not be fetched.
+        """
+        result = await self.complete_search_result(payload["key"], payload["type"], dict(payload["hit"]))
+        if result is None:
+            raise RuntimeError(f"Repository {payload['hit']['url']} could not be fetched")
+        result["query"] = payload["query"]
+        return result if self.in_output(result) else None
+
+    async def run_job(self, job):
+        """
+        Run a leased job and report its outcome to the queue.
+
+        Parameters:
+        - job (Job): The leased job.
+        """
+        runner = self.run_search_job if job.kind == "search" else self.run_hit_job
+        try:
+            result = await runner(job.payload)
+        except Exception as e:
+            logger.warning(f"Job {job.key} failed on attempt {job.attempts + 1}: {e}")
+            await self.queue.fail(job, self.worker_id)
+            return
+        if await self.queue.complete(job, self.worker_id, result):
+            self.jobs_done += 1
+        else:
+            logger.warning(f"Lease of job {job.key} expired before it completed")
+
+    async def drain(self):
+        """
+        Lease and run jobs one at a time until the queue has been idle for `worker_idle_timeout` seconds.
+        """
+        idle_since = None
+        while True:
+            jobs = await self.queue.lease(self.worker_id)
+            if jobs:
+                idle_since = None
+                await self.run_job(jobs[0])
+                continue
+
+            if await self.queue.unfinished():
+                idle_since = None
+            elif idle_since is None:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= self.idle_timeout:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def work(self):
+        """
+        Drain the queue with up to `concurrency` jobs in flight.
+
+        Returns:
+        - jobs_done (int): The number of jobs this worker completed.
+        """
+        logger.info(f"Worker {self.worker_id} waiting for jobs...")
+        try:
+            await self.create_session()
+            if self.proxy_health_interval:
+                self.proxy_manager.start_health_checks(self.proxy_health_interval)
+            for exporter in self.metrics_exporters:
+                await exporter.start()
+            await asyncio.gather(*(self.drain() for _ in range(self.concurrency)))
+        finally:
+            await self.close()
+            self.queue.shutdown()
+        logger.info(f"Worker {self.worker_id} finished {self.jobs_done} jobs")
+        logger.info(f"Crawl metrics: {self.metrics.summary()}")
+        return self.jobs_done
+
+
+def worker_config(config, index, workers):
+    """
+    Get the configuration of one of the local worker processes: its share of the proxies, and metrics
+    exporters that do not collide with the ones of the other processes.
+
+    Parameters:
+    - config (dict): The crawler configuration.
+    - index (int): The number of the worker, from 0.
+    - workers (int): The number of worker processes.
+
+    Returns:
+    - config (dict): The configuration of the worker.
+    """
+    config = dict(config)
+    proxies = config.get("proxies", [])
+    if proxies:
+        # Every worker gets its own proxies, unless there are fewer proxies than workers
+        config["proxies"] = proxies[index::workers] or [proxies[index % len(proxies)]]
+    if config.get("metrics_port"):
+        config["metrics_port"] += index
+    if config.get("metrics_file"):
+        root, extension = os.path.splitext(config["metrics_file"])
+        config["metrics_file"] = f"{root}.{index}{extension}"
+    return config
+
+
+def run_worker_process(config, queue_path, worker_id, log_file=None):
+    """
+    Entry point of a local worker process: drains the work queue on an event loop of its own.
+
+    Parameters:
+    - config (dict): The configuration of the worker.
+    - queue_path (str): The path of the SQLite work queue.
+    - worker_id (str): The id of the worker.
+    - log_file (str): The file to log to, if any.
+    """
+    if log_file:
+        setup_logger(log_file)
+    work_queue = SqliteWorkQueue(queue_path, visibility_timeout=config.get("visibility_timeout", 60),
+                                 max_attempts=config.get("max_attempts", 3), retry_delay=config.get("retry_delay", 5))
+    try:
+        asyncio.run(DistributedWorker(config, work_queue, worker_id).work())
+    finally:
+        work_queue.close()
+
+
+async def export_with_workers(config, queries, workers, sink, log_file=None):
+    """
+    Run a crawl on `workers` processes, each with its own event loop, crawler and share of the proxies,
+    and merge their results into one sink.
+
+    The processes drain a work queue in a temporary SQLite file, or in the configured `work_queue`, so
+    search pages and repositories are spread over them as they are found, whichever query they belong to.
+
+    Parameters:
+    - config (dict): The crawler configuration.
+    - queries (list): The queries, each with 'keywords' and 'type'.
+    - workers (int): The number of worker processes.
+    - sink (ResultSink): The destination of the results.
+    - log_file (str): The file the workers log to, if any.
+
+    Returns:
+    - count (int): The number of results written.
+    """
+    # Local workers stop shortly after the queue is drained
+    config = {"worker_idle_timeout": 1, "poll_interval": 0.1, **config}
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = config.get("work_queue") or os.path.join(tmp, "queue.sqlite")
+        work_queue = SqliteWorkQueue(queue_path, visibility_timeout=config.get("visibility_timeout", 60),
+                                     max_attempts=config.get("max_attempts", 3),
+                                     retry_delay=config.get("retry_delay", 5))
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_worker_process,
+                                     args=(worker_config(config, i, workers), queue_path,
+                                           f"{socket.gethostname()}-{os.getpid()}-{i}", log_file))
+                     for i in range(workers)]
+        coordinator = Coordinator(work_queue, queries, config["poll_interval"],
+                                  workers_alive=lambda: any(process.is_alive() for process in processes))
+        # Queue the first pages before the workers start, so none of them finds the queue empty
+        coordinator.seed()
+        for process in processes:
+            process.start()
+        try:
+            return await coordinator.export(sink)
+        finally:
+            for process in processes:
+                await asyncio.get_running_loop().run_in_executor(None, process.join, config["worker_idle_timeout"] + 30)
+                if process.is_alive():
+                    process.terminate()
+            work_queue.close()
@@ -1,10 +1,16 @@
 import argparse
 import asyncio
 import json
+from batch import BatchCrawler, load_queries
 from crawler import GitHubCrawler
+from distributed import Coordinator, DistributedWorker, export_with_workers
 from misc.logging_config import setup_logger
+from misc.sinks import get_sink
+from misc.work_queue import SqliteWorkQueue
+from planner import PartitionedCrawler
 
-async def main(config_file):
+async def main(config_file, batch_file=None, output=None, resume=False, incremental=False, role=None, workers=1,
+               log_file=None):
     try:
         with open(config_file, 'r') as f:
             config = json.load(f)
@@ -15,13 +21,95 @@ async def main(config_file):
         print(f"Error: Unable to parse JSON in '{config_file}'.")
         return
 
-    github_crawler = GitHubCrawler(config)
-    await github_crawler.run()
+    if resume:
+        if not config.get("checkpoint"):
+            print("Error: --resume needs a 'checkpoint' file in the configuration.")
+            return
+        config["resume"] = True
+
+    if incremental:
+        if not config.get("repo_index"):
+            print("Error: --incremental needs a 'repo_index' file in the configuration.")
+            return
+        config["incremental"] = True
+
+    queries = config.get("queries")
+    if batch_file:
+        try:
+            queries = load_queries(batch_file)
+        except FileNotFoundError:
+            print(f"Error: Batch file '{batch_file}' not found.")
+            return
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+
+    if workers < 1:
+        print(f"Error: --workers must be at least 1, got {workers}.")
+        return
+
+    if workers > 1 and role:
+        print(f"Error: --workers cannot be combined with --{role}.")
+        return
+
+    if config.get("partition_queries") and (role or workers > 1):
+        print(f"Error: 'partition_queries' cannot be combined with --{role or 'workers'}.")
+        return
+
+    work_queue = None
+    if role:
+        if not config.get("work_queue"):
+            print(f"Error: --{role} needs a 'work_queue' file in the configuration.")
+            return
+        work_queue = SqliteWorkQueue(config["work_queue"], visibility_timeout=config.get("visibility_timeout", 60),
+                                     max_attempts=config.get("max_attempts", 3),
+                                     retry_delay=config.get("retry_delay", 5))
+
+    if role == "worker":
+        await DistributedWorker(config, work_queue).work()
+        work_queue.close()
+        return
+    if role == "coordinator" or workers > 1:
+        queries = queries or [{"keywords": config.get("keywords", []), "type": config.get("type", "")}]
+    github_crawler = None
+    if role == "coordinator":
+        github_crawler = Coordinator(work_queue, queries)
+    elif config.get("partition_queries"):
+        queries = queries or [{"keywords": config.get("keywords", []), "type": config.get("type", "")}]
+        try:
+            github_crawler = PartitionedCrawler(config, queries)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    elif workers == 1:
+        github_crawler = BatchCrawler(config, queries) if queries else GitHubCrawler(config)
+
+    try:
+        sink = get_sink(output or config.get("output", "-"), config.get("output_format"))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    with sink:
+        if github_crawler:
+            await github_crawler.export(sink)
+        else:
+            await export_with_workers(config, queries, workers, sink, log_file)
+    if work_queue:
+        work_queue.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='GitHub Crawler')
     parser.add_argument('--config', default='config.json', help='Path to the configuration file')
+    parser.add_argument('--batch', help='Path to a JSONL file with one query per line, run over one shared session')
+    parser.add_argument('--output', help="File the results are written to, '-' for stdout (default)")
+    parser.add_argument('--resume', action='store_true', help='Skip the work recorded in the checkpoint file by an earlier run')
+    parser.add_argument('--incremental', action='store_true', help='Only output repositories that are new or changed since the last run')
+    role = parser.add_mutually_exclusive_group()
+    role.add_argument('--coordinator', dest='role', action='store_const', const='coordinator', help="Queue the queries in the shared 'work_queue' and collect the results of the workers")
+    role.add_argument('--worker', dest='role', action='store_const', const='worker', help="Run the jobs of the shared 'work_queue' until it is drained")
+    parser.add_argument('--workers', type=int, default=1, help='Number of crawler processes, each with its own event loop and share of the proxies')
     args = parser.parse_args()
 
     logger = setup_logger()
-    asyncio.run(main(args.config))
+    asyncio.run(main(args.config, args.batch, args.output, args.resume, args.incremental, args.role, args.workers,
+                     'crawler.log'))
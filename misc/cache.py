@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag", "last_modified", "stored_at"])
+
+
+class ResponseCache:
+    """
+    An on-disk cache of HTML responses keyed by URL and query parameters.
+
+    Entries younger than `ttl` seconds are served without touching the network. Older entries are
+    revalidated with `If-None-Match`/`If-Modified-Since`, so an unchanged page only costs a 304. In
+    offline mode every stored entry is served regardless of its age, which replays an earlier crawl.
+    When the cache grows beyond `max_size` bytes the least recently used entries are evicted. The entries
+    are indexed in least recently used order with a running total of their size, so a write costs no more
+    on a large cache than on a small one.
+
+    Every method but `is_fresh` and `conditional_headers` does blocking file I/O and is not thread-safe:
+    async callers run them one at a time on a thread of their own.
+
+    Attributes:
+        directory (str): The directory holding one JSON file per entry.
+        ttl (float): How many seconds an entry is served without revalidation.
+        max_size (int): The maximum total size of the entries in bytes, or None for no limit.
+        offline (bool): Whether stored entries are always served and the network is never used.
+        index (OrderedDict): The size of every entry by key, least recently used first.
+        size (int): The total size of the entries in bytes.
+
+    Methods:
+        get(url, params): Returns the stored response for a request, or None.
+        is_fresh(entry): Whether an entry can be served without revalidation.
+        conditional_headers(entry): The revalidation headers for a stored response.
+        set(url, params, body, headers): Stores a response.
+        touch(url, params): Marks a stored response as revalidated.
+    """
+    def __init__(self, directory, ttl=86400, max_size=None, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        self.index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.size = sum(self.index.values())
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        Builds the key of a request from its URL and its parameters in sorted order.
+
+        Parameters:
+            url (str): The request URL.
+            params (dict): The query parameters, if any.
+
+        Returns:
+            str: A hex digest identifying the request.
+        """
+        canonical = json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items())])
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, url, params=None):
+        """
+        Returns the stored response for a request.
+
+        Parameters:
+            url (str): The request URL.
+            params (dict): The query parameters, if any.
+
+        Returns:
+            CachedResponse or None: The stored response, or None on a cache miss.
+        """
+        key = self.key(url, params)
+        if key not in self.index:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry for {url}: {e}")
+            self._remove(key)
+            return None
+
+        self._mark_used(key)
+        return CachedResponse(entry["body"], entry.get("etag"), entry.get("last_modified"), entry["stored_at"])
+
+    def is_fresh(self, entry):
+        """
+        Whether an entry can be served without revalidation.
+
+        Parameters:
+            entry (CachedResponse): A stored response.
+
+        Returns:
+            bool: True in offline mode or while the entry is younger than the TTL.
+        """
+        return self.offline or time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        """
+        The revalidation headers for a stored response.
+
+        Parameters:
+            entry (CachedResponse): A stored response.
+
+        Returns:
+            dict: `If-None-Match` and/or `If-Modified-Since` headers.
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def set(self, url, params, body, headers=None):
+        """
+        Stores a response, evicting the least recently used entries if the cache is over its size.
+
+        Parameters:
+            url (str): The request URL.
+            params (dict): The query parameters, if any.
+            body (str): The response body.
+            headers (Mapping): The response headers, used for their `ETag` and `Last-Modified` values.
+        """
+        headers = headers or {}
+        key = self.key(url, params)
+        entry = {
+            "url": url,
+            "params": params,
+            "body": body,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        self._write(key, entry)
+        self._evict()
+
+    def touch(self, url, params=None):
+        """
+        Marks a stored response as revalidated, restarting its TTL.
+
+        Parameters:
+            url (str): The request URL.
+            params (dict): The query parameters, if any.
+        """
+        key = self.key(url, params)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return
+        entry["stored_at"] = time.time()
+        self._write(key, entry)
+
+    def _write(self, key, entry):
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        self.size += size - self.index.pop(key, 0)
+        self.index[key] = size
+
+    def _mark_used(self, key):
+        now = time.time()
+        try:
+            # The access time survives restarts as the modification time the index is rebuilt from
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+        self.index.move_to_end(key)
+
+    def _remove(self, key):
+        self.size -= self.index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        while self.size > self.max_size and self.index:
+            self._remove(next(iter(self.index)))
@@ -0,0 +1,154 @@
+import json
+import sqlite3
+
+
+class CheckpointStore:
+    """
+    Records the progress of crawls in SQLite so that an interrupted crawl can be resumed.
+
+    For every search query the store keeps the last search page whose hits were queued, whether the
+    pagination reached the last page, the hits found so far and the results already completed.
+    Every change is committed right away, so the store survives a crash at any point.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        connection (sqlite3.Connection): The database connection, opened again on first use after `close`.
+
+    Methods:
+        get_progress(key): The last recorded page of a query and whether its pagination is finished.
+        get_hits(key): The hits recorded for a query, in search order.
+        record_page(key, page, hits, last): Records the hits of a search page.
+        get_result(key, url): The completed result for a hit, if any.
+        add_result(key, url, result): Records a completed result.
+        reset(key): Forgets everything recorded for a query.
+        close(): Closes the database until its next use.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._connection = self.connect()
+
+    def connect(self):
+        """
+        Opens the database, creating its tables if needed.
+
+        Returns:
+            sqlite3.Connection: The open database connection.
+        """
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                query TEXT PRIMARY KEY,
+                last_page INTEGER NOT NULL,
+                done INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS hits (
+                query TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                hit TEXT NOT NULL,
+                PRIMARY KEY (query, position)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                query TEXT NOT NULL,
+                url TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (query, url)
+            );
+        """)
+        connection.commit()
+        return connection
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self.connect()
+        return self._connection
+
+    def get_progress(self, key):
+        """
+        The last recorded page of a query and whether its pagination is finished.
+
+        Parameters:
+            key (str): The query key.
+
+        Returns:
+            tuple: The last recorded page number (0 if none) and whether the last page was reached.
+        """
+        row = self.connection.execute("SELECT last_page, done FROM pages WHERE query = ?", (key,)).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def get_hits(self, key):
+        """
+        The hits recorded for a query, in search order.
+
+        Parameters:
+            key (str): The query key.
+
+        Returns:
+            list: The recorded search hits.
+        """
+        rows = self.connection.execute("SELECT hit FROM hits WHERE query = ? ORDER BY position", (key,))
+        return [json.loads(hit) for hit, in rows]
+
+    def record_page(self, key, page, hits, last=False):
+        """
+        Records the hits of a search page once they are queued for enrichment.
+
+        Parameters:
+            key (str): The query key.
+            page (int): The number of the page.
+            hits (list): The search hits of the page.
+            last (bool): Whether this is the last page of the query.
+        """
+        with self.connection:
+            position = self.connection.execute("SELECT COUNT(*) FROM hits WHERE query = ?", (key,)).fetchone()[0]
+            self.connection.executemany("INSERT INTO hits (query, position, hit) VALUES (?, ?, ?)",
+                                        [(key, position + i, json.dumps(hit)) for i, hit in enumerate(hits)])
+            self.connection.execute("INSERT OR REPLACE INTO pages (query, last_page, done) VALUES (?, ?, ?)",
+                                    (key, page, int(last)))
+
+    def get_result(self, key, url):
+        """
+        The completed result for a hit, if any.
+
+        Parameters:
+            key (str): The query key.
+            url (str): The relative URL of the hit.
+
+        Returns:
+            dict or None: The recorded result.
+        """
+        row = self.connection.execute("SELECT result FROM results WHERE query = ? AND url = ?", (key, url)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add_result(self, key, url, result):
+        """
+        Records a completed result.
+
+        Parameters:
+            key (str): The query key.
+            url (str): The relative URL of the hit.
+            result (dict): The completed result.
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO results (query, url, result) VALUES (?, ?, ?)",
+                                    (key, url, json.dumps(result)))
+
+    def reset(self, key):
+        """
+        Forgets everything recorded for a query, so that it starts over.
+
+        Parameters:
+            key (str): The query key.
+        """
+        with self.connection:
+            for table in ("pages", "hits", "results"):
+                self.connection.execute(f"DELETE FROM {table} WHERE query = ?", (key,))
+
+    def close(self):
+        """
+        Closes the database. It is opened again the next time it is used.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,132 @@
+import asyncio
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url, params=None, base_url=None):
+    """
+    Normalize a request into a key that is the same for every spelling of the same page: relative URLs
+    are resolved against the base URL, the scheme and host are lowercased, default ports, fragments and
+    trailing slashes are dropped, and the query parameters are merged with `params` and sorted.
+
+    Parameters:
+        url (str): The URL of the page, absolute or relative.
+        params (dict): Query parameters, if any.
+        base_url (str): The URL relative URLs are resolved against.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(urljoin(base_url, url) if base_url else url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(key), str(value)) for key, value in (params or {}).items()]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ""))
+
+
+class RequestDeduplicator:
+    """
+    Makes sure the same page is requested only once at a time and not again shortly after.
+
+    Concurrent requests for the same key share one in-flight task, and the responses of the last requests
+    are kept in an LRU bounded by the total size of their bodies. A duplicate is answered from either
+    without reaching the rate limiter, the proxies or the network. Only 200 and 404 responses are kept:
+    rate limits, server errors and failed requests are tried again by the next request.
+
+    Attributes:
+        max_size (int): The maximum total length of the kept bodies, in characters.
+        size (int): The total length of the kept bodies.
+
+    Methods:
+        fetch(key, fetch): Returns the response for a key, fetching it only if it is neither in flight nor kept.
+        clear(): Forgets the kept responses.
+    """
+    KEPT_STATUSES = (200, 404)
+
+    def __init__(self, max_size=32 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self.responses = OrderedDict()
+        self.in_flight = {}
+
+    def get(self, key):
+        """
+        The kept response for a key, marked as recently used.
+
+        Parameters:
+            key (str): The normalized URL.
+
+        Returns:
+            tuple or None: The status and body, or None if the response is not kept.
+        """
+        response = self.responses.get(key)
+        if response is not None:
+            self.responses.move_to_end(key)
+        return response
+
+    def keep(self, key, response):
+        """
+        Keeps a response, evicting the least recently used ones beyond `max_size`.
+
+        Parameters:
+            key (str): The normalized URL.
+            response (tuple): The status and body.
+        """
+        status, body = response
+        length = len(body or "")
+        if status not in self.KEPT_STATUSES or length > self.max_size:
+            return
+        if key in self.responses:
+            self.size -= len(self.responses.pop(key)[1] or "")
+        self.responses[key] = response
+        self.size += length
+        while self.size > self.max_size:
+            _, (_, evicted) = self.responses.popitem(last=False)
+            self.size -= len(evicted or "")
+
+    async def fetch(self, key, fetch):
+        """
+        Returns the response for a key, fetching it only if it is neither in flight nor kept.
+
+        Parameters:
+            key (str): The normalized URL.
+            fetch (callable): Returns a coroutine fetching the page, as a (status, body) tuple.
+
+        Returns:
+            tuple: The status and body, and how the request was answered: 'fetched', 'coalesced' with a
+            request in flight or 'recent' from the kept responses.
+
+        Raises:
+            Exception: Whatever the shared fetch raised.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response, "recent"
+        task = self.in_flight.get(key)
+        if task is not None:
+            return await asyncio.shield(task), "coalesced"
+
+        task = asyncio.ensure_future(fetch())
+        self.in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), "fetched"
+
+    def _finish(self, key, task):
+        # Runs even if every caller was cancelled, which also keeps the outcome from being reported as unhandled
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.keep(key, task.result())
+
+    def clear(self):
+        """
+        Forgets the kept responses.
+        """
+        self.responses.clear()
+        self.size = 0
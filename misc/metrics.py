@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from urllib.parse import urlsplit
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+
+    def escape(value):
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in key) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def proxy_label(proxy):
+    """
+    The metric label of a proxy: its host and port, leaving out any credentials, or 'direct'.
+
+    Parameters:
+        proxy (str): The proxy URL, or None for direct requests.
+
+    Returns:
+        str: The label.
+    """
+    if not proxy:
+        return "direct"
+    parts = urlsplit(proxy)
+    return parts.netloc.rpartition("@")[2] or proxy
+
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+
+    Attributes:
+        name (str): The metric name.
+        help (str): The metric description.
+        values (dict): A dictionary mapping each label set to its value.
+    """
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def total(self):
+        return sum(self.values.values())
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, value
+
+    def snapshot(self):
+        return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """
+    A value per label set that can go up and down, such as a queue depth.
+    """
+    type = "gauge"
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    """
+    Counts observations, such as latencies, into cumulative buckets per label set.
+
+    Attributes:
+        name (str): The metric name.
+        help (str): The metric description.
+        buckets (tuple): The upper bounds of the buckets, ending with infinity.
+        values (dict): A dictionary mapping each label set to its bucket counts, sum and count.
+    """
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def get(self, **labels):
+        return self.values.get(_label_key(labels))
+
+    def total(self):
+        return sum(series["sum"] for series in self.values.values())
+
+    def count(self):
+        return sum(series["count"] for series in self.values.values())
+
+    def samples(self):
+        for key, series in self.values.items():
+            for bound, count in zip(self.buckets, series["buckets"]):
+                yield f"{self.name}_bucket", key + (("le", _format_number(bound)),), count
+            yield f"{self.name}_sum", key, series["sum"]
+            yield f"{self.name}_count", key, series["count"]
+
+    def snapshot(self):
+        return [{"labels": dict(key), "sum": series["sum"], "count": series["count"],
+                 "buckets": {_format_number(bound): count for bound, count in zip(self.buckets, series["buckets"])}}
+                for key, series in self.values.items()]
+
+
+class Metrics:
+    """
+    A registry of metrics that renders them in the Prometheus text format or as a JSON-ready snapshot.
+
+    Methods:
+        counter(name, help): Registers a counter.
+        gauge(name, help): Registers a gauge.
+        histogram(name, help, buckets): Registers a histogram.
+        render_prometheus(): The metrics in the Prometheus text exposition format.
+        snapshot(): The metrics as a dictionary.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help):
+        return self._register(Counter(name, help))
+
+    def gauge(self, name, help):
+        return self._register(Gauge(name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, buckets))
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {"timestamp": time.time(), **{name: metric.snapshot() for name, metric in self.metrics.items()}}
+
+
+class CrawlMetrics(Metrics):
+    """
+    The metrics recorded by GitHubCrawler, labelled by page type ('search' or 'repo') and proxy.
+    """
+    def __init__(self):
+        super().__init__()
+        self.request_seconds = self.histogram("crawler_request_seconds", "Latency of page requests")
+        self.responses = self.counter("crawler_responses_total", "Responses received, by status code")
+        self.downloaded_bytes = self.counter("crawler_downloaded_bytes_total", "Bytes of page bodies downloaded")
+        self.parse_seconds = self.histogram("crawler_parse_seconds", "Time spent parsing pages")
+        self.cache = self.counter("crawler_cache_total", "Response cache lookups, by result")
+        self.rate_limited = self.counter("crawler_rate_limited_total", "429 responses received")
+        self.retries = self.counter("crawler_retries_total", "Requests retried, by reason")
+        self.queue_depth = self.gauge("crawler_queue_depth", "Items waiting in the pipeline queues")
+        self.stage_seconds = self.histogram("crawler_stage_seconds", "Time per pipeline stage and item")
+        self.connections = self.counter("crawler_connections_total", "Connections opened and reused, by pool")
+        self.index_lookups = self.counter("crawler_repo_index_total", "Repository index lookups, by result")
+        self.deduplicated = self.counter("crawler_deduplicated_total",
+                                         "Duplicate requests answered without the network, by reason")
+
+    def summary(self):
+        """
+        A one-line overview telling whether the crawl was network-bound, parser-bound or throttled.
+
+        Returns:
+            str: The summary.
+        """
+        return (f"{self.request_seconds.count()} requests in {self.request_seconds.total():.1f}s, "
+                f"{self.parse_seconds.count()} parses in {self.parse_seconds.total():.1f}s, "
+                f"{self.downloaded_bytes.total() / 1e6:.1f} MB downloaded, "
+                f"{self.cache.get(result='hit') + self.cache.get(result='revalidated')} cache hits, "
+                f"{self.rate_limited.total()} rate limited, {self.retries.total()} retries, "
+                f"{self.deduplicated.total()} duplicates")
+
+
+class MetricsExporter:
+    """
+    Base class for the exporters publishing metrics while a crawl runs.
+
+    Methods:
+        start(): Starts publishing.
+        stop(): Stops publishing.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    async def start(self):
+        raise NotImplementedError("Implement me")
+
+    async def stop(self):
+        pass
+
+
+class PrometheusExporter(MetricsExporter):
+    """
+    Serves the metrics in the Prometheus text format on http://host:port/metrics.
+    """
+    def __init__(self, metrics, port=9100, host="127.0.0.1"):
+        super().__init__(metrics)
+        self.port = port
+        self.host = host
+        self.runner = None
+
+    async def handle(self, request):
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain")
+
+    async def start(self):
+        if self.runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+class JsonFileExporter(MetricsExporter):
+    """
+    Dumps a JSON snapshot of the metrics to a file every `interval` seconds, and once more when stopped.
+    """
+    def __init__(self, metrics, path, interval=10):
+        super().__init__(metrics)
+        self.path = path
+        self.interval = interval
+        self.task = None
+
+    def dump(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.metrics.snapshot(), f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    async def start(self):
+        async def loop():
+            while True:
+                await asyncio.sleep(self.interval)
+                self.dump()
+
+        if self.task is None:
+            self.task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.dump()
+
+
+def get_exporters(metrics, data):
+    """
+    Builds the exporters enabled in a crawler configuration.
+
+    Parameters:
+        metrics (Metrics): The metrics to export.
+        data (dict): The configuration, read for 'metrics_port', 'metrics_host', 'metrics_file' and 'metrics_interval'.
+
+    Returns:
+        list: The configured exporters.
+    """
+    exporters = []
+    if data.get("metrics_port"):
+        exporters.append(PrometheusExporter(metrics, data["metrics_port"], data.get("metrics_host", "127.0.0.1")))
+    if data.get("metrics_file"):
+        exporters.append(JsonFileExporter(metrics, data["metrics_file"], data.get("metrics_interval", 10)))
+    return exporters
@@ -0,0 +1,229 @@
+import sys
+from array import array
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+
+def intern_language_stats(language_stats):
+    """
+    Intern the language names of language statistics, so every repository shares one string per language.
+
+    Parameters:
+        language_stats (dict): The percentage of every language.
+
+    Returns:
+        dict: The same statistics with interned language names.
+    """
+    return {sys.intern(language): percentage for language, percentage in language_stats.items()}
+
+
+class ResultRecord:
+    """
+    A completed result in a compact form: slots instead of a dict per result and per repository, interned
+    language names and the percentages packed in an array.
+
+    Records are read like the result dicts they stand for (`record["url"]`, `record.get("extra")`,
+    `"change" in record`) and turned back into them with `to_dict()` for JSON.
+
+    Attributes:
+        url (str): The URL of the search hit.
+        query (str): The identifier of the query the hit belongs to, if any.
+        owner (str): The owner of the repository, if its details were fetched.
+        languages (tuple): The interned language names, or None without repository details.
+        percentages (array): The percentage of every language, in the same order.
+        change (str): Whether the repository is 'new', 'changed' or 'unchanged', in incremental crawls.
+    """
+    __slots__ = ("url", "query", "owner", "languages", "percentages", "change")
+
+    def __init__(self, url, query=None, owner=None, languages=None, percentages=None, change=None):
+        self.url = url
+        self.query = query
+        self.owner = owner
+        self.languages = languages
+        self.percentages = percentages
+        self.change = change
+
+    @classmethod
+    def from_dict(cls, result):
+        """
+        Pack a result dict.
+
+        Parameters:
+            result (dict): The result, with 'url' and optionally 'query', 'extra' and 'change'.
+
+        Returns:
+            ResultRecord: The record.
+        """
+        extra = result.get("extra")
+        if extra is None:
+            return cls(result["url"], result.get("query"), change=result.get("change"))
+        language_stats = extra.get("language_stats", {})
+        return cls(result["url"], result.get("query"), extra.get("owner"),
+                   tuple(sys.intern(language) for language in language_stats),
+                   array("d", language_stats.values()), result.get("change"))
+
+    @property
+    def extra(self):
+        """
+        The repository details, or None if they were not fetched.
+        """
+        if self.languages is None:
+            return None
+        return {"owner": self.owner, "language_stats": dict(zip(self.languages, self.percentages))}
+
+    def to_dict(self):
+        """
+        Unpack the record into the result dict it stands for.
+
+        Returns:
+            dict: The result.
+        """
+        result = {"url": self.url}
+        if self.query is not None:
+            result["query"] = self.query
+        if self.languages is not None:
+            result["extra"] = self.extra
+        if self.change is not None:
+            result["change"] = self.change
+        return result
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def __contains__(self, key):
+        return key == "url" or (key in ("query", "extra", "change") and getattr(self, key) is not None)
+
+    def __eq__(self, other):
+        if isinstance(other, (ResultRecord, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, ResultRecord) else other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ResultRecord({self.to_dict()!r})"
+
+
+class ResultTable:
+    """
+    Holds results in columns: the URLs, queries and owners in lists, and the language statistics of all
+    the results in two flat arrays, language ids into a dictionary of language names and percentages,
+    with an array of offsets marking where every result starts. A million repositories take a few tens
+    of megabytes instead of the gigabyte their dicts would.
+
+    Tables are appended to like a list, so a crawl can collect into one, and give back ResultRecords
+    when indexed or iterated.
+
+    Attributes:
+        languages (list): The language names, by language id.
+
+    Methods:
+        append(result): Adds a result dict or ResultRecord.
+        language_summary(): The number of repositories using every language and its mean percentage.
+        to_arrow(schema): The results as a pyarrow table, for Parquet.
+    """
+    def __init__(self):
+        self.urls = []
+        self.queries = []
+        self.owners = []
+        self.changes = []
+        # The languages of result i are at offsets[i]:offsets[i + 1] in the flat arrays
+        self.offsets = array("q", [0])
+        self.has_details = array("b")
+        self.language_ids = array("I")
+        self.percentages = array("d")
+        self.languages = []
+        self.language_index = {}
+
+    def append(self, result):
+        """
+        Adds a result.
+
+        Parameters:
+            result (dict or ResultRecord): The result.
+        """
+        extra = result.get("extra")
+        query, change = result.get("query"), result.get("change")
+        self.urls.append(result["url"])
+        self.queries.append(sys.intern(query) if query is not None else None)
+        self.changes.append(sys.intern(change) if change is not None else None)
+        self.owners.append(extra.get("owner") if extra is not None else None)
+        self.has_details.append(extra is not None)
+        if extra is not None:
+            for language, percentage in extra.get("language_stats", {}).items():
+                language_id = self.language_index.get(language)
+                if language_id is None:
+                    language_id = self.language_index[language] = len(self.languages)
+                    self.languages.append(sys.intern(language))
+                self.language_ids.append(language_id)
+                self.percentages.append(percentage)
+        self.offsets.append(len(self.language_ids))
+
+    def __len__(self):
+        return len(self.urls)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result index out of range")
+        if not self.has_details[index]:
+            return ResultRecord(self.urls[index], self.queries[index], change=self.changes[index])
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return ResultRecord(self.urls[index], self.queries[index], self.owners[index],
+                            tuple(self.languages[i] for i in self.language_ids[start:end]),
+                            self.percentages[start:end], self.changes[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def language_summary(self):
+        """
+        The number of repositories using every language and its mean percentage in them.
+
+        Returns:
+            dict: (repositories, mean percentage) tuples by language name, most used languages first.
+        """
+        counts = [0] * len(self.languages)
+        totals = [0.0] * len(self.languages)
+        for language_id, percentage in zip(self.language_ids, self.percentages):
+            counts[language_id] += 1
+            totals[language_id] += percentage
+        summary = {language: (counts[i], totals[i] / counts[i]) for i, language in enumerate(self.languages)}
+        return dict(sorted(summary.items(), key=lambda item: -item[1][0]))
+
+    def to_arrow(self, schema):
+        """
+        The results as a pyarrow table, with the language statistics built straight from the arrays.
+
+        Parameters:
+            schema (pyarrow.Schema): The schema, with 'url', 'query', 'owner', a 'language_stats' map and 'change'.
+
+        Returns:
+            pyarrow.Table: The table.
+
+        Raises:
+            ValueError: If pyarrow is not installed.
+        """
+        if pyarrow is None:
+            raise ValueError("Arrow tables require pyarrow, install it with 'pip install pyarrow'")
+        keys = pyarrow.array(self.languages, pyarrow.string()).take(pyarrow.array(self.language_ids, pyarrow.uint32()))
+        language_stats = pyarrow.MapArray.from_arrays(
+            pyarrow.array(self.offsets, pyarrow.int32()), keys,
+            pyarrow.array(self.percentages, pyarrow.float64()),
+            type=schema.field("language_stats").type,
+            mask=pyarrow.array([not has_details for has_details in self.has_details], pyarrow.bool_()))
+        return pyarrow.Table.from_arrays([
+            pyarrow.array(self.urls, pyarrow.string()),
+            pyarrow.array(self.queries, pyarrow.string()),
+            pyarrow.array(self.owners, pyarrow.string()),
+            language_stats,
+            pyarrow.array(self.changes, pyarrow.string()),
+        ], schema=schema)
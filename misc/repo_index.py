@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import time
+from misc.records import intern_language_stats
+
+
+class RepoIndex:
+    """
+    A persistent index of the repositories enriched by earlier crawls, kept in SQLite.
+
+    For every repository the index keeps when it was last seen in search results, when its details were
+    last fetched, its owner, its language statistics and a hash of its details. Repositories whose details
+    are younger than `ttl` seconds are served from the index instead of being fetched again, and the hash
+    tells whether a re-fetched repository changed since the previous crawl.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        ttl (float): How many seconds fetched details are reused before the repository is fetched again.
+        connection (sqlite3.Connection): The database connection, opened again on first use after `close`.
+
+    Methods:
+        get(url): The indexed entry of a repository, if any.
+        is_fresh(entry): Whether an entry can be reused without fetching the repository again.
+        touch(url): Marks a repository as seen in the search results.
+        record(url, repo_info): Stores freshly fetched details and tells whether they changed.
+        close(): Closes the database until its next use.
+    """
+    def __init__(self, path, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self._connection = self.connect()
+
+    def connect(self):
+        """
+        Opens the database, creating its tables if needed.
+
+        Returns:
+            sqlite3.Connection: The open database connection.
+        """
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS repos (
+                url TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                owner TEXT,
+                language_stats TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+        """)
+        connection.commit()
+        return connection
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self.connect()
+        return self._connection
+
+    @staticmethod
+    def content_hash(repo_info):
+        """
+        Hashes repository details independently of the order of their keys.
+
+        Parameters:
+            repo_info (dict): The repository details.
+
+        Returns:
+            str: A hex digest of the details.
+        """
+        return hashlib.sha256(json.dumps(repo_info, sort_keys=True).encode()).hexdigest()
+
+    def get(self, url):
+        """
+        The indexed entry of a repository.
+
+        Parameters:
+            url (str): The relative URL of the repository.
+
+        Returns:
+            dict or None: The entry with its 'repo_info', 'last_seen', 'fetched_at' and 'content_hash'.
+        """
+        row = self.connection.execute(
+            "SELECT last_seen, fetched_at, owner, language_stats, content_hash FROM repos WHERE url = ?",
+            (url,)).fetchone()
+        if row is None:
+            return None
+        last_seen, fetched_at, owner, language_stats, content_hash = row
+        return {
+            "repo_info": {"owner": owner, "language_stats": intern_language_stats(json.loads(language_stats))},
+            "last_seen": last_seen,
+            "fetched_at": fetched_at,
+            "content_hash": content_hash,
+        }
+
+    def is_fresh(self, entry):
+        """
+        Whether an entry can be reused without fetching the repository again.
+
+        Parameters:
+            entry (dict): An indexed entry.
+
+        Returns:
+            bool: True while the details are younger than the TTL.
+        """
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def touch(self, url):
+        """
+        Marks a repository as seen in the search results of the current crawl.
+
+        Parameters:
+            url (str): The relative URL of the repository.
+        """
+        with self.connection:
+            self.connection.execute("UPDATE repos SET last_seen = ? WHERE url = ?", (time.time(), url))
+
+    def record(self, url, repo_info):
+        """
+        Stores freshly fetched repository details.
+
+        Parameters:
+            url (str): The relative URL of the repository.
+            repo_info (dict): The repository details.
+
+        Returns:
+            str: 'new' if the repository was not indexed, 'changed' if its details differ from the indexed
+            ones and 'unchanged' otherwise.
+        """
+        content_hash = self.content_hash(repo_info)
+        row = self.connection.execute("SELECT content_hash FROM repos WHERE url = ?", (url,)).fetchone()
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO repos (url, last_seen, fetched_at, owner, language_stats, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, now, now, repo_info.get("owner"), json.dumps(repo_info.get("language_stats", {})),
+                 content_hash))
+        if row is None:
+            return "new"
+        return "unchanged" if row[0] == content_hash else "changed"
+
+    def close(self):
+        """
+        Closes the database. It is opened again the next time it is used.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,149 @@
+import json
+import logging
+import sys
+from misc.records import ResultTable
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink:
+    """
+    Base class for the destinations crawl results are written to, one result at a time.
+
+    Sinks are context managers, so they are closed even when the crawl fails.
+
+    Methods:
+        write(result): Writes one result.
+        close(): Flushes and releases the destination.
+    """
+    def write(self, result):
+        raise NotImplementedError("Implement me")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class JsonlSink(ResultSink):
+    """
+    Writes every result as one line of JSON, to a file or to stdout.
+
+    Attributes:
+        path (str): The output file, or '-' for stdout.
+        count (int): The number of results written so far.
+    """
+    def __init__(self, path="-"):
+        self.path = path
+        self.count = 0
+        self.file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, result):
+        """
+        Writes one result as a line of JSON and flushes it, so readers see results as they complete.
+
+        Parameters:
+            result (dict): The result.
+        """
+        self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        if self.file is not sys.stdout and not self.file.closed:
+            self.file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes results to a Parquet file in row groups of `batch_size` results, so only one batch is held in memory.
+
+    Requires pyarrow. Repository details are flattened into an `owner` column and a `language_stats` map column.
+    The `change` column holds the tag of incremental crawls, 'new' or 'changed', and is null otherwise.
+    The batch is buffered in a ResultTable and converted to Arrow straight from its arrays.
+
+    Attributes:
+        path (str): The output file.
+        batch_size (int): The number of results per row group.
+        count (int): The number of results written so far.
+    """
+    SCHEMA = pyarrow.schema([
+        ("url", pyarrow.string()),
+        ("query", pyarrow.string()),
+        ("owner", pyarrow.string()),
+        ("language_stats", pyarrow.map_(pyarrow.string(), pyarrow.float64())),
+        ("change", pyarrow.string()),
+    ]) if pyarrow else None
+
+    def __init__(self, path, batch_size=1000):
+        if pyarrow is None:
+            raise ValueError("Parquet output requires pyarrow, install it with 'pip install pyarrow'")
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self.batch = ResultTable()
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.SCHEMA)
+
+    def write(self, result):
+        """
+        Buffers one result, writing a row group once the batch is full.
+
+        Parameters:
+            result (dict): The result.
+        """
+        self.batch.append(result)
+        self.count += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered results as a row group.
+        """
+        if self.batch:
+            self.writer.write_table(self.batch.to_arrow(self.SCHEMA))
+            self.batch = ResultTable()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+SINKS = {
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+}
+
+
+def get_sink(output="-", output_format=None):
+    """
+    Opens the sink for an output destination.
+
+    Parameters:
+        output (str): The output file, or '-' for stdout.
+        output_format (str): 'jsonl' or 'parquet'. Guessed from the file extension when omitted.
+
+    Returns:
+        ResultSink: The opened sink.
+
+    Raises:
+        ValueError: If the format is unknown or cannot be written to stdout.
+    """
+    if output_format is None:
+        output_format = "parquet" if output.endswith(".parquet") else "jsonl"
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format '{output_format}'. Available formats: {', '.join(SINKS)}")
+    if output_format == "parquet" and output == "-":
+        raise ValueError("Parquet output needs a file, it cannot be written to stdout")
+    return SINKS[output_format](output)
@@ -1,65 +1,427 @@
-import itertools
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+import aiohttp
+
+class ProxiesExhausted(ValueError):
+    """
+    Raised when every proxy is dead or was already tried for a request.
+    """
+
+
+class ProxyStats:
+    """
+    Health record of a single proxy.
+
+    Attributes:
+        successes (int): The number of successful requests.
+        failures (int): The number of failed requests, rate limits included.
+        consecutive_failures (int): The number of failures since the last success.
+        latency (float): The exponentially weighted moving average of the request latency in seconds, or None.
+        cooldown_until (float): The monotonic time until which the proxy is not handed out.
+        last_used (int): The sequence number of the last time the proxy was handed out.
+        in_flight (int): The number of handed out leases that were not released yet.
+        dead (bool): Whether the proxy failed too often and waits for a health check to revive it.
+    """
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.cooldown_until = 0.0
+        self.last_used = 0
+        self.in_flight = 0
+        self.dead = False
+
+    @property
+    def success_rate(self):
+        # Laplace smoothing keeps a single early failure from ruling a proxy out
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
 
 class ProxyManager:
     """
     Manages a pool of proxies for use in web crawling.
 
-    This class keeps track of how many times each proxy has been used and cycles through them,
-    ensuring that no proxy is used more than a specified maximum number of times.
+    Every proxy carries a health record built from the outcome of its requests. The manager hands out the
+    healthy proxy with the best success rate per second of latency, trying proxies without measurements
+    first and breaking ties by picking the least recently used one, so equally good proxies are rotated.
+    The score is shared among the leases a proxy already has in flight, so concurrent requests fan out
+    over the whole pool instead of piling onto the fastest proxy.
+    A rate-limited proxy is put on a timed cooldown instead of being retired, and a proxy that keeps failing
+    is marked dead until a health check reaches it again.
+
+    Proxy selection never awaits, so it is safe to call from any number of coroutines on the same event loop.
 
     Attributes:
         proxies (list): A list of proxy addresses.
-        max_usage (int): The maximum number of times each proxy can be used.
-        usage_count (dict): A dictionary mapping each proxy to its current usage count.
-        proxy_pool (itertools.cycle): An iterator that cycles through the proxies.
+        max_usage (int): The maximum number of times each proxy can be handed out, or None for no limit.
+        cooldown (float): How many seconds a rate-limited proxy rests when the response has no Retry-After.
+        max_failures (int): The number of consecutive failures after which a proxy is considered dead.
+        usage_count (dict): A dictionary mapping each proxy URL to the number of times it was handed out.
+        stats (dict): A dictionary mapping each proxy URL to its `ProxyStats`.
 
     Methods:
-        get_next_proxy(): Retrieves the next available proxy from the pool. Returns None if all proxies have reached their usage limit.
+        get_next_proxy(exclude): Retrieves the best available proxy. Returns None if no proxy is available right now.
+        acquire(exclude): Leases the best available proxy, riding out cooldowns. Returns None if all proxies are gone.
+        release(proxy): Returns a lease taken with `acquire`.
+        report_success(proxy, latency): Records a successful request.
+        report_failure(proxy, rate_limited, retry_after): Records a failed request.
+        ping_proxy(proxy): Checks whether a proxy is reachable.
+        check_health(): Pings every proxy and updates its health record.
+        start_health_checks(interval): Runs `check_health` periodically in the background.
+        stop_health_checks(): Stops the background health checks.
     """
-    def __init__(self, proxies: list, max_usage=5):
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self, proxies: list, max_usage=None, cooldown=60, max_failures=3):
         self.proxies = proxies
         self.max_usage = max_usage
-        self.usage_count = {proxy: 0 for proxy in proxies}
-        self.proxy_pool = itertools.cycle(proxies)
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self.usage_count = {self.normalize(proxy): 0 for proxy in proxies}
+        self.stats = {self.normalize(proxy): ProxyStats() for proxy in proxies}
+        self.health_check_task = None
+        self.handouts = 0
 
-    def get_next_proxy(self):
+    @staticmethod
+    def normalize(proxy):
         """
-        Retrieves the next available proxy from the pool.
+        Prefixes a proxy address with 'http://' unless it already has a scheme.
 
-        (Considering) This method cycles through the proxies, pinging each one to check if it is active,
-        and returns the first active proxy that has not reached its usage limit.
-        If all proxies have reached their usage limit or are inactive, it raises an Exception.
+        Parameters:
+            proxy (str): The proxy address.
 
         Returns:
-            str: The next available active proxy address prefixed with 'http://', or None if all proxies have been exhausted or are inactive.
+            str: The proxy URL.
+        """
+        if not proxy.startswith("http://") and not proxy.startswith("https://"):
+            proxy = 'http://' + proxy
+        return proxy
 
-        Raises:
-            Exception: If all proxies have reached their usage limit or are inactive.
+    def _is_exhausted(self, proxy):
+        return self.stats[proxy].dead or (self.max_usage is not None and self.usage_count[proxy] >= self.max_usage)
+
+    def _score(self, proxy):
+        stats = self.stats[proxy]
+        if stats.latency is None:
+            return float("inf")
+        return stats.success_rate / max(stats.latency, 1e-3) / (1 + stats.in_flight)
+
+    def get_next_proxy(self, exclude=()):
         """
-        active_proxies = [proxy for proxy in self.proxies if self.usage_count[proxy] < self.max_usage]
-        if not active_proxies:
-            return None
+        Retrieves the best available proxy from the pool.
 
-        proxy = next(self.proxy_pool)
-        while self.usage_count[proxy] >= self.max_usage:
-            proxy = next(self.proxy_pool)
+        Proxies that are dead, cooling down or at their usage limit are skipped. Among the remaining ones the
+        proxy with the highest score wins, the least recently used one on a tie.
 
-        self.usage_count[proxy] += 1
-        if not proxy.startswith("http://") and not proxy.startswith("https://"):
-            proxy = 'http://' + proxy
+        Parameters:
+            exclude (Collection): Proxies to avoid, such as the ones a request already failed on. They are
+                only handed out when no other proxy is available.
+
+        Returns:
+            str: The proxy URL prefixed with 'http://', or None if no proxy is available right now.
+        """
+        now = time.monotonic()
+        available = [proxy for proxy in self.stats
+                     if not self._is_exhausted(proxy) and self.stats[proxy].cooldown_until <= now]
+        if not available:
+            return None
+        available = [proxy for proxy in available if proxy not in exclude] or available
 
+        proxy = max(available, key=lambda proxy: (self._score(proxy), -self.stats[proxy].last_used))
+        self.handouts += 1
+        self.stats[proxy].last_used = self.handouts
+        self.usage_count[proxy] += 1
         return proxy
 
-    def ping_proxy(self, proxy):
+    async def acquire(self, exclude=()):
+        """
+        Leases the best available proxy for one request, sleeping through cooldowns when every live proxy
+        is resting. Every lease must be returned with `release`.
+
+        Parameters:
+            exclude (Collection): Proxies to avoid unless no other proxy is available.
+
+        Returns:
+            str: The proxy URL, or None if every proxy is dead or at its usage limit.
+        """
+        while True:
+            proxy = self.get_next_proxy(exclude)
+            if proxy:
+                self.stats[proxy].in_flight += 1
+                return proxy
+
+            resting = [stats.cooldown_until for proxy, stats in self.stats.items() if not self._is_exhausted(proxy)]
+            if not resting:
+                return None
+            await asyncio.sleep(max(0.0, min(resting) - time.monotonic()))
+
+    def release(self, proxy):
+        """
+        Returns a lease taken with `acquire`.
+
+        Parameters:
+            proxy (str): The proxy URL.
+        """
+        stats = self.stats.get(proxy)
+        if stats is not None and stats.in_flight > 0:
+            stats.in_flight -= 1
+
+    def report_success(self, proxy, latency=None):
+        """
+        Records a successful request through a proxy.
+
+        Parameters:
+            proxy (str): The proxy URL.
+            latency (float): The request latency in seconds, if measured.
+        """
+        stats = self.stats.get(proxy)
+        if stats is None:
+            return
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        if latency is not None:
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.LATENCY_SMOOTHING * (latency - stats.latency)
+
+    def report_failure(self, proxy, rate_limited=False, retry_after=None):
+        """
+        Records a failed request through a proxy.
+
+        A rate-limited proxy rests for `retry_after` seconds, or for the configured cooldown. Any other
+        failure counts towards `max_failures`, after which the proxy is marked dead.
+
+        Parameters:
+            proxy (str): The proxy URL.
+            rate_limited (bool): Whether the failure was a 429 response.
+            retry_after (float): The delay requested by the server, if any.
+        """
+        stats = self.stats.get(proxy)
+        if stats is None:
+            return
+        stats.failures += 1
+        if rate_limited:
+            stats.cooldown_until = time.monotonic() + (retry_after if retry_after is not None else self.cooldown)
+            return
+
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.max_failures:
+            stats.dead = True
+
+    async def ping_proxy(self, proxy, url="https://github.com", timeout=5):
         """
         Pings a proxy to check if it is active.
 
         Parameters:
-            proxy (str): The proxy address to ping.
+            proxy (str): The proxy URL to ping.
+            url (str): The URL requested through the proxy.
+            timeout (float): How many seconds to wait for an answer.
 
         Returns:
-            bool: True if the proxy is active and reachable, False otherwise.
+            tuple: Whether the proxy is active and reachable, and the round trip time in seconds.
         """
-        # In future, if no another solution than ping proxy before usage example procedures in DB,
-        # it is better to ping proxy here
+        start = time.monotonic()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.head(url, proxy=proxy, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    return response.status < 500 and response.status != 407, time.monotonic() - start
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False, time.monotonic() - start
+
+    async def check_health(self):
+        """
+        Pings every proxy concurrently, updating its health record and reviving dead proxies that answer.
+        """
+        proxies = list(self.stats)
+        outcomes = await asyncio.gather(*(self.ping_proxy(proxy) for proxy in proxies))
+        for proxy, (alive, latency) in zip(proxies, outcomes):
+            if alive:
+                self.stats[proxy].dead = False
+                self.report_success(proxy, latency)
+            else:
+                self.report_failure(proxy)
+
+    def start_health_checks(self, interval=60):
+        """
+        Runs `check_health` every `interval` seconds in the background until `stop_health_checks` is called.
+
+        Parameters:
+            interval (float): The number of seconds between two health checks.
+        """
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                await self.check_health()
+
+        if self.health_check_task is None and self.stats:
+            self.health_check_task = asyncio.create_task(loop())
+
+    def stop_health_checks(self):
+        """
+        Stops the background health checks, if they are running.
+        """
+        if self.health_check_task is not None:
+            self.health_check_task.cancel()
+            self.health_check_task = None
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header, given either in seconds or as an HTTP date.
+
+    Parameters:
+        value (str): The header value, if any.
+
+    Returns:
+        float: The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter:
+    """
+    Spaces out requests per key, such as a host or a (proxy, endpoint class) pair, and backs off after 429s.
+
+    Every key gets its own schedule: callers reserve the next free slot for the key and sleep until that
+    slot comes up. After a 429 the key is blocked for the Retry-After delay, capped at `max_retry_after`,
+    or, without one, for a jittered exponential backoff that grows with every consecutive 429. The 429s of
+    requests that were already in flight land while the key is blocked: they belong to the same backoff
+    window and neither grow the backoff nor lower the rate again.
+
+    With `adaptive` enabled the rate of every key follows AIMD: it grows by `increase` requests per second
+    with every success and is multiplied by `decrease` once per backoff window, so it settles just under the rate
+    at which the server starts throttling. Without it, a falsy `rate` disables spacing, leaving only the
+    backoff after 429s.
+
+    Attributes:
+        rate (float): The requests per second per key, the starting rate when adaptive, or None for no limit.
+        adaptive (bool): Whether the rate of every key adapts to the 429s it receives.
+        min_rate (float): The lowest rate an adaptive key is lowered to.
+        max_rate (float): The highest rate an adaptive key is raised to, or None for no cap.
+        max_retry_after (float): The longest Retry-After delay honored, in seconds.
+        next_slot (dict): A dictionary mapping each key to the earliest time its next request may start.
+        rates (dict): A dictionary mapping each key to its current adaptive rate.
+        blocked_until (dict): A dictionary mapping each backed off key to the time it may be used again.
+        backoffs (dict): A dictionary mapping each key to its number of consecutive 429s.
+
+    Methods:
+        acquire(key): Waits until a request for the given key is allowed to start.
+        report_success(key): Records a successful request, raising an adaptive rate.
+        report_rate_limited(key, retry_after): Records a 429, backing the key off.
+    """
+    DEFAULT_ADAPTIVE_RATE = 5.0
+
+    def __init__(self, rate=None, adaptive=False, min_rate=0.2, max_rate=None, increase=0.1, decrease=0.5,
+                 backoff=1.0, max_backoff=60.0, max_retry_after=300.0):
+        self.rate = rate
+        self.adaptive = adaptive
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.next_slot = {}
+        self.rates = {}
+        self.blocked_until = {}
+        self.backoffs = {}
+
+    def current_rate(self, key):
+        """
+        The number of requests per second currently allowed for a key.
+
+        Parameters:
+            key (Hashable): The key.
+
+        Returns:
+            float: The rate, or None for no limit.
+        """
+        if self.adaptive:
+            return self.rates.get(key, self.rate or self.DEFAULT_ADAPTIVE_RATE)
+        return self.rate
+
+    async def _wait_until_unblocked(self, key):
+        while True:
+            delay = self.blocked_until.get(key, 0) - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def acquire(self, key):
+        """
+        Waits until a request for the given key is allowed to start.
+
+        Parameters:
+            key (Hashable): The key of the request, such as the host it is going to.
+        """
+        await self._wait_until_unblocked(key)
+        rate = self.current_rate(key)
+        if not rate:
+            return
+
+        now = time.monotonic()
+        slot = max(now, self.next_slot.get(key, now))
+        self.next_slot[key] = slot + 1.0 / rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+            # A 429 may have come in while waiting for the slot
+            await self._wait_until_unblocked(key)
+
+    def report_success(self, key):
+        """
+        Records a successful request, resetting the backoff and raising an adaptive rate additively.
+
+        Parameters:
+            key (Hashable): The key of the request.
+        """
+        self.backoffs.pop(key, None)
+        if self.adaptive:
+            rate = self.current_rate(key) + self.increase
+            self.rates[key] = min(rate, self.max_rate) if self.max_rate else rate
+
+    def report_rate_limited(self, key, retry_after=None):
+        """
+        Records a 429, blocking the key and lowering an adaptive rate multiplicatively, unless the key is
+        already backing off.
+
+        Parameters:
+            key (Hashable): The key of the request.
+            retry_after (float): The delay requested by the server in seconds, if any.
+
+        Returns:
+            float: The number of seconds the key is blocked for.
+        """
+        now = time.monotonic()
+        if retry_after is not None:
+            retry_after = min(retry_after, self.max_retry_after)
+        blocked_until = self.blocked_until.get(key, 0)
+        if blocked_until > now:
+            if retry_after is not None:
+                self.blocked_until[key] = max(blocked_until, now + retry_after)
+            return self.blocked_until[key] - now
+
+        attempt = self.backoffs.get(key, 0)
+        self.backoffs[key] = attempt + 1
+        if retry_after is None:
+            # Equal jitter keeps at least half of the exponential delay while spreading out the retries
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            retry_after = delay / 2 + random.uniform(0, delay / 2)
 
+        self.blocked_until[key] = now + retry_after
+        if self.adaptive:
+            self.rates[key] = max(self.min_rate, self.current_rate(key) * self.decrease)
+        return retry_after
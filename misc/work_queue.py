@@ -0,0 +1,284 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# A leased job: its id, kind ('search' or 'hit'), deduplication key, payload and number of previous attempts
+Job = namedtuple("Job", ["id", "kind", "key", "payload", "attempts"])
+
+
+class WorkQueue:
+    """
+    Base class for the queues the coordinator and the workers of a distributed crawl share.
+
+    Every job is leased to one worker at a time. A lease that is not completed within the visibility
+    timeout, because its worker died or hung, expires and the job is handed out again, unless it was
+    already leased `max_attempts` times: a job that crashes every worker it runs on is given up on.
+
+    Methods:
+        put(kind, key, payload): Adds a job unless one with the same key was added before.
+        put_many(jobs): Adds several jobs at once.
+        lease(worker, limit): Leases up to `limit` available jobs to a worker.
+        complete(job, worker, result): Marks a leased job as done, with its result.
+        fail(job, worker): Hands a leased job out again, or gives up on it after too many attempts.
+        results(after): The results of the completed jobs, in completion order.
+        unfinished(): The number of jobs that are neither done nor given up on.
+        close(): Releases the queue.
+    """
+    def put(self, kind, key, payload):
+        raise NotImplementedError("Implement me")
+
+    def put_many(self, jobs):
+        return sum(self.put(kind, key, payload) for kind, key, payload in jobs)
+
+    def lease(self, worker, limit=1):
+        raise NotImplementedError("Implement me")
+
+    def complete(self, job, worker, result=None):
+        raise NotImplementedError("Implement me")
+
+    def fail(self, job, worker):
+        raise NotImplementedError("Implement me")
+
+    def results(self, after=0):
+        raise NotImplementedError("Implement me")
+
+    def unfinished(self):
+        raise NotImplementedError("Implement me")
+
+    def close(self):
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    A work queue in a SQLite file, standing in for a message broker on one host or a shared volume.
+
+    Leases are taken in `BEGIN IMMEDIATE` transactions, so concurrent processes never lease the same job.
+    Completing or failing a job only succeeds for the worker holding its lease, so a worker whose lease
+    expired cannot overwrite the outcome of the worker that took the job over. A failed job is available
+    to the other workers right away, but to the worker it failed on only after `retry_delay` seconds.
+
+    Every call blocks while another process holds the write lock, for up to 30 seconds. Async code goes
+    through a `ThreadedWorkQueue`, so the connection may be used from a thread other than its creator's.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        visibility_timeout (float): How many seconds a lease lasts.
+        max_attempts (int): How many times a job is leased before it is given up on.
+        retry_delay (float): How many seconds a worker waits before retrying a job that failed on it.
+    """
+    def __init__(self, path, visibility_timeout=60, max_attempts=3, retry_delay=5):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                done_seq INTEGER,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+            CREATE INDEX IF NOT EXISTS jobs_done ON jobs (done_seq);
+        """)
+
+    def put(self, kind, key, payload):
+        """
+        Adds a job unless one with the same key was added before.
+
+        Parameters:
+            kind (str): The kind of job, 'search' for a search page or 'hit' for a search hit.
+            key (str): The deduplication key of the job.
+            payload (dict): What the worker needs to run the job.
+
+        Returns:
+            bool: Whether the job was added.
+        """
+        cursor = self.connection.execute("INSERT OR IGNORE INTO jobs (kind, key, payload) VALUES (?, ?, ?)",
+                                         (kind, key, json.dumps(payload)))
+        return cursor.rowcount == 1
+
+    def put_many(self, jobs):
+        """
+        Adds several jobs in one transaction, skipping the ones whose key was added before.
+
+        Parameters:
+            jobs (list): (kind, key, payload) tuples.
+
+        Returns:
+            int: The number of jobs added.
+        """
+        if not jobs:
+            return 0
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.connection.executemany("INSERT OR IGNORE INTO jobs (kind, key, payload) VALUES (?, ?, ?)",
+                                                 [(kind, key, json.dumps(payload)) for kind, key, payload in jobs])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def lease(self, worker, limit=1):
+        """
+        Leases up to `limit` pending jobs, or jobs whose lease expired, to a worker. Expired jobs that were
+        leased `max_attempts` times are given up on instead.
+
+        Parameters:
+            worker (str): The id of the worker.
+            limit (int): The maximum number of jobs to lease.
+
+        Returns:
+            list: The leased jobs.
+        """
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute("UPDATE jobs SET state = 'failed' "
+                                    "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                                    (now, self.max_attempts))
+            rows = self.connection.execute(
+                "SELECT id, kind, key, payload, attempts FROM jobs "
+                "WHERE (state = 'pending' AND (lease_until IS NULL OR lease_until < ? OR worker != ?)) "
+                "OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT ?",
+                (now, worker, now, limit)).fetchall()
+            self.connection.executemany(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.visibility_timeout, row[0]) for row in rows])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return [Job(id, kind, key, json.loads(payload), attempts) for id, kind, key, payload, attempts in rows]
+
+    def complete(self, job, worker, result=None):
+        """
+        Marks a leased job as done.
+
+        Parameters:
+            job (Job): The job.
+            worker (str): The id of the worker holding the lease.
+            result (dict): The result of the job, if it has one for the output.
+
+        Returns:
+            bool: False if the lease was lost to another worker in the meantime.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            seq = self.connection.execute("SELECT COALESCE(MAX(done_seq), 0) + 1 FROM jobs").fetchone()[0]
+            cursor = self.connection.execute(
+                "UPDATE jobs SET state = 'done', done_seq = ?, result = ? "
+                "WHERE id = ? AND state = 'leased' AND worker = ?",
+                (seq, None if result is None else json.dumps(result), job.id, worker))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def fail(self, job, worker):
+        """
+        Hands a leased job out again, preferably to another worker, or gives up on it once it was attempted
+        `max_attempts` times.
+
+        Parameters:
+            job (Job): The job.
+            worker (str): The id of the worker holding the lease.
+        """
+        state = "failed" if job.attempts + 1 >= self.max_attempts else "pending"
+        self.connection.execute("UPDATE jobs SET state = ?, lease_until = ? "
+                                "WHERE id = ? AND state = 'leased' AND worker = ?",
+                                (state, time.time() + self.retry_delay, job.id, worker))
+
+    def results(self, after=0):
+        """
+        The results of the jobs completed after a point, in completion order.
+
+        Parameters:
+            after (int): The completion sequence number of the last result already read.
+
+        Returns:
+            list: (sequence number, result) tuples.
+        """
+        rows = self.connection.execute(
+            "SELECT done_seq, result FROM jobs WHERE done_seq > ? ORDER BY done_seq", (after,)).fetchall()
+        return [(seq, json.loads(result) if result is not None else None) for seq, result in rows]
+
+    def unfinished(self):
+        """
+        The number of jobs that are neither done nor given up on.
+
+        Returns:
+            int: The number of pending and leased jobs.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+class ThreadedWorkQueue:
+    """
+    Runs the calls of a work queue on a thread of its own, so an event loop waiting for a database locked
+    by another process keeps serving its requests in flight. The calls are made one at a time, in order.
+
+    Attributes:
+        work_queue (WorkQueue): The queue the calls are made on.
+    """
+    def __init__(self, work_queue):
+        self.work_queue = work_queue
+        self.executor = None
+
+    async def run(self, function, *args):
+        """
+        Runs a blocking function on the queue thread.
+
+        Parameters:
+            function (callable): The function.
+            *args: Its arguments.
+
+        Returns:
+            The return value of the function.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="work-queue")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def put_many(self, jobs):
+        return await self.run(self.work_queue.put_many, jobs)
+
+    async def lease(self, worker, limit=1):
+        return await self.run(self.work_queue.lease, worker, limit)
+
+    async def complete(self, job, worker, result=None):
+        return await self.run(self.work_queue.complete, job, worker, result)
+
+    async def fail(self, job, worker):
+        return await self.run(self.work_queue.fail, job, worker)
+
+    async def results(self, after=0):
+        return await self.run(self.work_queue.results, after)
+
+    async def unfinished(self):
+        return await self.run(self.work_queue.unfinished)
+
+    def shutdown(self):
+        """
+        Stops the queue thread once the calls made so far are done. The queue itself is left open.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,318 @@
+import logging
+from parsers.github import (AVAILABLE_SEARCH_TYPES, GitHubParser, SearchPage, parse_language_label,
+                            parse_page_number)
+from parsers.templates import RepoPageRules, SearchPageRules
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - optional dependency
+    lxml_html = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+    except ImportError:
+        SelectolaxHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+
+def _has_class(name):
+    """XPath predicate matching elements whose class list contains `name`, like BeautifulSoup's class_ filter."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+class SinglePassParser:
+    """
+    Base class for the C-backed parser engines.
+
+    Engines only implement `parse_search_page` and `parse_repo_info`; the remaining methods of the
+    `GitHubParser` interface are answered from the single-pass result.
+    """
+    name = None
+
+    @classmethod
+    def parse_search_results(cls, html, search_type):
+        return cls.parse_search_page(html, search_type).results
+
+    @classmethod
+    def parse_pagination(cls, html):
+        return cls.parse_search_page(html, "").next_page
+
+    @classmethod
+    def parse_page_count(cls, html):
+        return cls.parse_search_page(html, "").page_count
+
+
+class LxmlParser(SinglePassParser):
+    """
+    Parses GitHub pages with lxml and XPath.
+
+    Methods:
+        parse_search_page(html, search_type):
+            Parses a search page once and returns its results, next page URL and page count together.
+
+        parse_repo_info(html):
+            Parses the HTML of a repository page to extract owner information and language statistics.
+    """
+    name = "lxml"
+
+    SEARCH_TITLES = f'.//div[{_has_class("search-title")}]'
+    RESULT_LINK = './/a[@href and not(starts-with(@href, "/login?return_to="))]/@href'
+
+    @staticmethod
+    def _document(html):
+        if not html or not html.strip():
+            return None
+        return lxml_html.document_fromstring(html)
+
+    @staticmethod
+    def parse_search_page(html, search_type):
+        """
+        Parses a search page into a single DOM and extracts everything the crawler needs from it.
+
+        Args:
+            html (str): The HTML content of the search results page.
+            search_type (str): The type of search results to parse ('repositories', 'issues', or 'wikis').
+
+        Returns:
+            SearchPage: The search results, the URL of the next page and the number of the last page.
+        """
+        document = LxmlParser._document(html)
+        if document is None:
+            return SearchPage([], None, None)
+
+        results = []
+        if search_type.lower() in AVAILABLE_SEARCH_TYPES:
+            # Only the first results list counts, as with BeautifulSoup's find()
+            result_lists = document.xpath('//div[@data-testid="results-list"]')
+            if result_lists:
+                for title in result_lists[0].xpath(LxmlParser.SEARCH_TITLES):
+                    links = title.xpath(LxmlParser.RESULT_LINK)
+                    if links:
+                        results.append({"url": str(links[0])})
+
+        next_page = None
+        page_count = None
+        paginations = document.xpath('//nav[@aria-label="Pagination"]')
+        if paginations:
+            pagination = paginations[0]
+            next_links = pagination.xpath('.//a[contains(concat(" ", normalize-space(@rel), " "), " next ")]/@href')
+            next_page = str(next_links[0]) if next_links else None
+
+            total_pages = pagination.xpath('.//*[@data-total-pages]/@data-total-pages')
+            if total_pages and total_pages[0].isdigit():
+                page_count = int(total_pages[0])
+            else:
+                page_numbers = [parse_page_number(item.text_content().strip())
+                                for item in pagination.xpath('.//a | .//em | .//span')]
+                page_numbers = [page for page in page_numbers if page is not None]
+                page_count = max(page_numbers) if page_numbers else None
+
+        return SearchPage(results, next_page, page_count)
+
+    @staticmethod
+    def parse_repo_info(html):
+        """
+        Parses the HTML of a repository page to extract owner information and language statistics.
+
+        Args:
+            html (str): The HTML content of the repository page.
+
+        Returns:
+            dict: A dictionary containing owner information and language statistics.
+
+        Raises:
+            ValueError: If the page has no owner.
+        """
+        document = LxmlParser._document(html)
+        authors = document.xpath(f'//span[{_has_class("author")}]') if document is not None else []
+        if not authors:
+            raise ValueError("Repository owner not found")
+
+        language_stats = {}
+        for aria_label in document.xpath(f'//span[{_has_class("Progress-item")}]/@aria-label'):
+            if aria_label:
+                language, percentage = parse_language_label(aria_label)
+                language_stats[language] = percentage
+
+        return {"owner": authors[0].text_content().strip(), "language_stats": language_stats}
+
+
+class SelectolaxParser(SinglePassParser):
+    """
+    Parses GitHub pages with selectolax (Lexbor) and CSS selectors.
+
+    Methods:
+        parse_search_page(html, search_type):
+            Parses a search page once and returns its results, next page URL and page count together.
+
+        parse_repo_info(html):
+            Parses the HTML of a repository page to extract owner information and language statistics.
+    """
+    name = "selectolax"
+
+    @staticmethod
+    def parse_search_page(html, search_type):
+        """
+        Parses a search page into a single DOM and extracts everything the crawler needs from it.
+
+        Args:
+            html (str): The HTML content of the search results page.
+            search_type (str): The type of search results to parse ('repositories', 'issues', or 'wikis').
+
+        Returns:
+            SearchPage: The search results, the URL of the next page and the number of the last page.
+        """
+        tree = SelectolaxHTMLParser(html or "")
+
+        results = []
+        if search_type.lower() in AVAILABLE_SEARCH_TYPES:
+            result_list = tree.css_first('div[data-testid="results-list"]')
+            if result_list:
+                for title in result_list.css('div.search-title'):
+                    for link in title.css('a[href]'):
+                        href = link.attributes.get('href')
+                        if href and not href.startswith('/login?return_to='):
+                            results.append({"url": href})
+                            break
+
+        next_page = None
+        page_count = None
+        pagination = tree.css_first('nav[aria-label="Pagination"]')
+        if pagination:
+            next_link = pagination.css_first('a[rel~="next"]')
+            next_page = next_link.attributes.get('href') if next_link else None
+
+            total_pages = pagination.css_first('[data-total-pages]')
+            if total_pages and (total_pages.attributes.get('data-total-pages') or "").isdigit():
+                page_count = int(total_pages.attributes['data-total-pages'])
+            else:
+                page_numbers = [parse_page_number(item.text().strip()) for item in pagination.css('a, em, span')]
+                page_numbers = [page for page in page_numbers if page is not None]
+                page_count = max(page_numbers) if page_numbers else None
+
+        return SearchPage(results, next_page, page_count)
+
+    @staticmethod
+    def parse_repo_info(html):
+        """
+        Parses the HTML of a repository page to extract owner information and language statistics.
+
+        Args:
+            html (str): The HTML content of the repository page.
+
+        Returns:
+            dict: A dictionary containing owner information and language statistics.
+
+        Raises:
+            ValueError: If the page has no owner.
+        """
+        tree = SelectolaxHTMLParser(html or "")
+        author = tree.css_first('span.author')
+        if author is None:
+            raise ValueError("Repository owner not found")
+
+        language_stats = {}
+        for item in tree.css('span.Progress-item'):
+            aria_label = item.attributes.get('aria-label')
+            if aria_label:
+                language, percentage = parse_language_label(aria_label)
+                language_stats[language] = percentage
+
+        return {"owner": author.text().strip(), "language_stats": language_stats}
+
+
+DOM_ENGINES = {
+    "selectolax": (SelectolaxParser, SelectolaxHTMLParser),
+    "lxml": (LxmlParser, lxml_html),
+    "bs4": (GitHubParser, True),
+}
+
+
+class TemplateParser(SinglePassParser):
+    """
+    Parses GitHub pages with precompiled extraction rules, falling back to the fastest installed DOM engine
+    for page layouts the rules were not checked against.
+
+    GitHub serves the same templates over and over, so once a layout fingerprint is known to be extracted
+    correctly by the rules, its pages are read with `str.find` and small regexes instead of a DOM. A new
+    fingerprint is logged as template drift and checked against the DOM engine first.
+
+    Methods:
+        parse_search_page(html, search_type):
+            Parses a search page once and returns its results, next page URL and page count together.
+
+        parse_repo_info(html):
+            Parses the HTML of a repository page to extract owner information and language statistics.
+    """
+    name = "template"
+    dom = next(parser for parser, module in DOM_ENGINES.values() if module)
+    search_rules = SearchPageRules()
+    repo_rules = RepoPageRules()
+
+    @classmethod
+    def parse_search_page(cls, html, search_type):
+        """
+        Parses a search page with the extraction rules, or with the DOM for an unchecked layout.
+
+        Args:
+            html (str): The HTML content of the search results page.
+            search_type (str): The type of search results to parse ('repositories', 'issues', or 'wikis').
+
+        Returns:
+            SearchPage: The search results, the URL of the next page and the number of the last page.
+        """
+        return cls.search_rules.parse(html, cls.dom.parse_search_page, search_type)
+
+    @classmethod
+    def parse_repo_info(cls, html):
+        """
+        Parses the HTML of a repository page with the extraction rules, or with the DOM for an unchecked layout.
+
+        Args:
+            html (str): The HTML content of the repository page.
+
+        Returns:
+            dict: A dictionary containing owner information and language statistics.
+
+        Raises:
+            ValueError: If the page has no owner.
+        """
+        return cls.repo_rules.parse(html, cls.dom.parse_repo_info)
+
+
+ENGINES = {"template": (TemplateParser, True), **DOM_ENGINES}
+
+
+def get_parser(engine="auto"):
+    """
+    Returns the parser for the requested engine.
+
+    With 'auto' the template engine is picked, which parses known page layouts without a DOM and the others
+    with the fastest installed DOM engine, in the order selectolax, lxml, BeautifulSoup.
+    An explicitly requested engine that is not installed falls back to BeautifulSoup with a warning.
+
+    Args:
+        engine (str): One of 'auto', 'template', 'selectolax', 'lxml' or 'bs4'.
+
+    Returns:
+        The parser class, exposing the `GitHubParser` interface.
+
+    Raises:
+        ValueError: If the engine name is unknown.
+    """
+    if engine in (None, "auto"):
+        for parser, module in ENGINES.values():
+            if module:
+                return parser
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown parser engine '{engine}'. Available engines: auto, {', '.join(ENGINES)}")
+
+    parser, module = ENGINES[engine]
+    if not module:
+        logger.warning(f"Parser engine '{engine}' is not installed, falling back to BeautifulSoup")
+        return GitHubParser
+    return parser
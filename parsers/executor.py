@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+
+class ParseExecutor:
+    """
+    Runs the HTML parsers off the event loop so that network I/O keeps flowing while pages are parsed.
+
+    With `workers` set to 0 the parsers run inline, exactly as before. Otherwise they are sent to a pool
+    that is started on first use: a process pool spreads parsing across cores, while a thread pool avoids
+    the pickling overhead and suits engines that release the GIL while parsing (such as lxml).
+
+    Attributes:
+        workers (int): The number of pool workers, or 0 to parse inline.
+        kind (str): The kind of pool, 'process' or 'thread'.
+        pool (concurrent.futures.Executor): The running pool, or None until the first parse.
+
+    Methods:
+        run(func, *args): Runs a parser function and returns its result.
+        shutdown(): Stops the pool, if one was started.
+    """
+    def __init__(self, workers=0, kind="process"):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown parse executor '{kind}'. Available executors: {', '.join(EXECUTOR_KINDS)}")
+        self.workers = workers
+        self.kind = kind
+        self.pool = None
+
+    async def run(self, func, *args):
+        """
+        Runs a parser function and returns its result.
+
+        Parameters:
+            func (callable): A picklable parser function, such as `GitHubParser.parse_repo_info`.
+            *args: The arguments of the function.
+
+        Returns:
+            The return value of the function.
+        """
+        if not self.workers:
+            return func(*args)
+
+        if self.pool is None:
+            logger.info(f"Starting {self.kind} pool with {self.workers} parse workers")
+            self.pool = EXECUTOR_KINDS[self.kind](max_workers=self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    def shutdown(self):
+        """
+        Stops the pool, if one was started. A later `run` starts a new one.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
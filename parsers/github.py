@@ -1,19 +1,86 @@
+import sys
+from collections import namedtuple
 from bs4 import BeautifulSoup
 
+AVAILABLE_SEARCH_TYPES = ["repositories", "issues", "wikis"]
+
+# Everything the crawler needs from one search page, extracted from a single DOM
+SearchPage = namedtuple("SearchPage", ["results", "next_page", "page_count"])
+
+
+def parse_language_label(aria_label):
+    """
+    Splits the aria-label of a language bar item into the language and its percentage.
+
+    The language name is interned, so the repositories of a crawl share one string per language.
+
+    Args:
+        aria_label (str): The label of the item, for example 'Python 50%'.
+
+    Returns:
+        tuple: The language name and its percentage as a float.
+    """
+    language, percentage = aria_label.split()
+    return sys.intern(language), float(percentage.replace('%', ''))
+
+
+def parse_page_number(text):
+    """
+    Reads a page number out of the text of a pagination item.
+
+    Args:
+        text (str): The stripped text of the item.
+
+    Returns:
+        int or None: The page number, or None if the item is not a page link.
+    """
+    return int(text) if text.isdigit() else None
+
+
 class GitHubParser:
     """
     A utility class for parsing HTML responses from GitHub.
 
+    This is the BeautifulSoup backend; faster engines with the same interface live in `parsers.engines`.
+
     Methods:
+        parse_search_page(html, search_type):
+            Parses a search page once and returns its results, next page URL and page count together.
+
         parse_search_results(html, search_type):
             Parses the search results HTML to extract repository, issue, or wiki URLs.
-        
+
         parse_pagination(html):
             Parses the HTML to extract the URL of the next page, if available.
-        
+
+        parse_page_count(html):
+            Parses the pagination of a search page to extract the number of the last page, if available.
+
         parse_repo_info(html):
             Parses the HTML of a repository page to extract owner information and language statistics.
     """
+    name = "bs4"
+
+    @staticmethod
+    def parse_search_page(html, search_type):
+        """
+        Parses a search page into a single DOM and extracts everything the crawler needs from it.
+
+        Args:
+            html (str): The HTML content of the search results page.
+            search_type (str): The type of search results to parse ('repositories', 'issues', or 'wikis').
+
+        Returns:
+            SearchPage: The search results, the URL of the next page and the number of the last page.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        pagination = soup.find('nav', {'aria-label': 'Pagination'})
+        return SearchPage(
+            GitHubParser._search_results_from_soup(soup, search_type),
+            GitHubParser._next_page_from_pagination(pagination),
+            GitHubParser._page_count_from_pagination(pagination),
+        )
+
     @staticmethod
     def parse_search_results(html, search_type):
         """
@@ -26,20 +93,8 @@ class GitHubParser:
         Returns:
             list: A list of dictionaries containing the URLs of the search results.
         """
-        available_types = ["repositories", "issues", "wikis"]
         soup = BeautifulSoup(html, 'html.parser')
-        result_list_div = soup.find('div', {'data-testid': 'results-list'})
-        result_urls = []
-
-        if search_type.lower() in available_types:
-            if result_list_div:
-                repositories = result_list_div.find_all('div', {'class': 'search-title'})
-                for repo in repositories:
-                    link = repo.find('a', href=lambda href: href and not href.startswith('/login?return_to='))
-                    if link:
-                        result_urls.append({"url": link['href']})
-
-        return result_urls
+        return GitHubParser._search_results_from_soup(soup, search_type)
 
     @staticmethod
     def parse_pagination(html):
@@ -54,11 +109,22 @@ class GitHubParser:
         """
         soup = BeautifulSoup(html, 'html.parser')
         pagination = soup.find('nav', {'aria-label': 'Pagination'})
-        if pagination:
-            next_page = pagination.find('a', {'rel': 'next'})
-            if next_page:
-                return next_page['href']
-        return None
+        return GitHubParser._next_page_from_pagination(pagination)
+
+    @staticmethod
+    def parse_page_count(html):
+        """
+        Parses the pagination of a search page to extract the number of the last page, if available.
+
+        Args:
+            html (str): The HTML content of the page containing pagination.
+
+        Returns:
+            int or None: The number of the last search page, or None if it cannot be read.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        pagination = soup.find('nav', {'aria-label': 'Pagination'})
+        return GitHubParser._page_count_from_pagination(pagination)
 
     @staticmethod
     def parse_repo_info(html):
@@ -80,8 +146,43 @@ class GitHubParser:
         for item in progress_items:
             aria_label = item.get('aria-label')
             if aria_label:
-                language, percentage = aria_label.split()
-                percentage = float(percentage.replace('%', ''))
+                language, percentage = parse_language_label(aria_label)
                 language_stats[language] = percentage
 
         return {"owner": owner, "language_stats": language_stats}
+
+    @staticmethod
+    def _search_results_from_soup(soup, search_type):
+        result_list_div = soup.find('div', {'data-testid': 'results-list'})
+        result_urls = []
+
+        if search_type.lower() in AVAILABLE_SEARCH_TYPES:
+            if result_list_div:
+                repositories = result_list_div.find_all('div', {'class': 'search-title'})
+                for repo in repositories:
+                    link = repo.find('a', href=lambda href: href and not href.startswith('/login?return_to='))
+                    if link:
+                        result_urls.append({"url": link['href']})
+
+        return result_urls
+
+    @staticmethod
+    def _next_page_from_pagination(pagination):
+        if pagination:
+            next_page = pagination.find('a', {'rel': 'next'})
+            if next_page:
+                return next_page['href']
+        return None
+
+    @staticmethod
+    def _page_count_from_pagination(pagination):
+        if not pagination:
+            return None
+
+        total_pages = pagination.find(attrs={'data-total-pages': True})
+        if total_pages and total_pages['data-total-pages'].isdigit():
+            return int(total_pages['data-total-pages'])
+
+        page_numbers = [parse_page_number(item.get_text(strip=True)) for item in pagination.find_all(['a', 'em', 'span'])]
+        page_numbers = [page for page in page_numbers if page is not None]
+        return max(page_numbers) if page_numbers else None
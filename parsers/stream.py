@@ -0,0 +1,163 @@
+import re
+
+SPAN_TAG = re.compile(r'<(/?)span\b[^>]*>')
+
+# The characters that may surround a class name inside a class attribute
+CLASS_SEPARATORS = " \t\n\"'"
+
+
+class SectionScanner:
+    """
+    Finds where a span section, such as the author of a repository, starts and where it is closed.
+
+    The start tag is found by looking for the class name with `str.find` and checking the tag around
+    it, which is much cheaper than matching every tag of the page with a regular expression.
+
+    The scanner is given a window of the page, the text read so far minus a prefix it no longer needs,
+    and keeps every position relative to the start of the page.
+
+    Attributes:
+        class_name (str): A class of the span starting the section.
+        end (int or None): The position right after the closing tag, once the section is complete.
+    """
+    def __init__(self, class_name):
+        self.class_name = class_name
+        self.search_from = 0
+        self.depth = None
+        self.end = None
+
+    def find_start(self, text, offset=0):
+        """
+        Finds the end of the start tag of the section in the window read so far.
+
+        Args:
+            text (str): The window.
+            offset (int): The position of the window in the page.
+
+        Returns:
+            int or None: The position right after the start tag, or None if it was not read yet.
+        """
+        while True:
+            index = text.find(self.class_name, self.search_from - offset)
+            after = index + len(self.class_name)
+            if index < 0 or after >= len(text):
+                # Look again at a class name that may be cut by the end of the chunk
+                self.search_from = max(self.search_from, offset + len(text) - len(self.class_name))
+                return None
+            self.search_from = offset + after
+            if index == 0 or text[index - 1] not in CLASS_SEPARATORS or text[after] not in CLASS_SEPARATORS:
+                continue
+            tag_start = text.rfind("<", 0, index)
+            if (tag_start < 0 or not text.startswith("<span", tag_start) or text[tag_start + 5] not in " \t\n"
+                    or text.find(">", tag_start, index) >= 0 or text.rfind("class=", tag_start, index) < 0):
+                continue
+            tag_end = text.find(">", after)
+            if tag_end < 0:
+                self.search_from = offset + index
+                return None
+            return offset + tag_end + 1
+
+    def scan(self, text, offset=0):
+        """
+        Scans the window read so far, resuming where the previous scan stopped.
+
+        Args:
+            text (str): The window.
+            offset (int): The position of the window in the page.
+
+        Returns:
+            bool: True once the section is complete.
+        """
+        if self.end is not None:
+            return True
+        if self.depth is None:
+            start = self.find_start(text, offset)
+            if start is None:
+                return False
+            self.depth = 1
+            self.search_from = start
+
+        for match in SPAN_TAG.finditer(text, self.search_from - offset):
+            self.search_from = offset + match.end()
+            self.depth += -1 if match.group(1) else 1
+            if self.depth == 0:
+                self.end = offset + match.end()
+                return True
+        return False
+
+    def needed_from(self, text, offset=0):
+        """
+        The first position of the page the next scans need: the last tag started before the resume
+        position while the start tag is looked for, the resume position itself afterwards.
+
+        Args:
+            text (str): The window.
+            offset (int): The position of the window in the page.
+
+        Returns:
+            int: The position.
+        """
+        if self.depth is None:
+            tag_start = text.rfind("<", 0, self.search_from - offset)
+            if tag_start >= 0:
+                return offset + tag_start
+        return self.search_from
+
+
+class RepoPageScanner:
+    """
+    Scans the HTML of a repository page chunk by chunk and tells when the author and the language bar
+    are complete, so the rest of the page, often hundreds of KB, does not have to be read.
+
+    Only the tags delimiting the two sections are looked at, so the scan costs far less than parsing.
+    The chunks are kept in a list and the sections are scanned in a window that drops the text they are
+    done with, so every chunk is scanned about once. The HTML read up to the end of both sections is
+    then parsed with `parse_repo_info` as usual. A page without an author or a language bar is read to
+    the end.
+
+    Attributes:
+        done (bool): Whether both sections are complete.
+
+    Methods:
+        feed(text): Adds the next decoded chunk of the page.
+        html(): The HTML needed to extract the repository information.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.window = ""
+        self.window_start = 0
+        self.sections = [SectionScanner("author"), SectionScanner("Progress")]
+        self.done = False
+
+    def feed(self, text):
+        """
+        Adds the next decoded chunk of the page and scans it.
+
+        Args:
+            text (str): The chunk.
+
+        Returns:
+            bool: True once both sections are complete.
+        """
+        self.chunks.append(text)
+        self.window += text
+        self.done = all([section.scan(self.window, self.window_start) for section in self.sections])
+        if not self.done:
+            needed = min(section.needed_from(self.window, self.window_start)
+                         for section in self.sections if section.end is None)
+            self.window = self.window[needed - self.window_start:]
+            self.window_start = needed
+        return self.done
+
+    def html(self):
+        """
+        The HTML needed to extract the repository information: up to the end of the last section once
+        both are complete, or everything read otherwise.
+
+        Returns:
+            str: The HTML.
+        """
+        text = "".join(self.chunks)
+        if self.done:
+            return text[:max(section.end for section in self.sections)]
+        return text
@@ -0,0 +1,387 @@
+import html as html_entities
+import logging
+import re
+from collections import namedtuple
+from parsers.github import AVAILABLE_SEARCH_TYPES, SearchPage, parse_language_label
+
+logger = logging.getLogger(__name__)
+
+TAG_NAME = re.compile(r'<([a-zA-Z][\w-]*)')
+ATTRIBUTE = re.compile(r'''([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+MARKUP = re.compile(r'<[^>]*>')
+PAGE_NUMBER = re.compile(r'<(?:a|em|span)\b[^>]*>\s*(\d+)\s*<')
+
+# An opening tag parsed out of a page: its offsets, its lowercase name and its unescaped attributes
+Tag = namedtuple("Tag", ["start", "end", "name", "attributes"])
+
+
+def parse_tag(html, start, end):
+    """
+    Parses the opening tag at html[start:end] without building a DOM.
+
+    Args:
+        html (str): The page.
+        start (int): The offset of the '<' of the tag.
+        end (int): The offset right after its '>'.
+
+    Returns:
+        Tag or None: The tag, or None if the text is not an opening tag.
+    """
+    name = TAG_NAME.match(html, start, end)
+    if name is None:
+        return None
+    attributes = {}
+    for attribute, double_quoted, single_quoted, unquoted in ATTRIBUTE.findall(html, name.end(), end - 1):
+        value = double_quoted or single_quoted or unquoted
+        attributes.setdefault(attribute.lower(), html_entities.unescape(value) if "&" in value else value)
+    return Tag(start, end, name.group(1).lower(), attributes)
+
+
+class Selector:
+    """
+    A selector compiled once into a literal every selected tag contains and a regex matching the opening
+    tags it selects, optionally capturing the value of one of their attributes. Pages are scanned for the
+    literal with `str.find` and the regex is only tried at the tags containing it.
+
+    Supports `tag.class`, `tag[attribute]`, `tag[attribute=value]` and `tag[attribute~=word]`; the tag name
+    may be left out to match any tag. Only double-quoted attribute values are matched; pages quoting them
+    otherwise fail the check against the DOM and are parsed with it.
+
+    Attributes:
+        selector (str): The selector.
+        capture (str): The attribute whose value is captured, if any.
+        marker (str): The literal every selected tag contains.
+        regex (re.Pattern): The compiled regex.
+    """
+    SYNTAX = re.compile(r'^([a-z][\w-]*)?(?:\.([\w-]+)|\[([\w-]+)(?:(~?=)"?([^"\]]*)"?)?\])$')
+
+    def __init__(self, selector, capture=None):
+        match = self.SYNTAX.match(selector)
+        if match is None:
+            raise ValueError(f"Unsupported selector '{selector}'")
+        tag, class_name, attribute, operator, value = match.groups()
+        self.selector = selector
+        self.capture = capture
+        self.marker = class_name or value or attribute
+
+        if class_name:
+            condition = self._word_condition("class", class_name)
+        elif operator == "~=":
+            condition = self._word_condition(attribute, value)
+        elif operator == "=":
+            condition = rf'(?=[^>]*?\s{attribute}\s*=\s*"{re.escape(value)}")'
+        else:
+            condition = rf'(?=[^>]*?\s{attribute}(?:\s*=|[\s/>]))'
+        captured = rf'(?=[^>]*?\s{capture}\s*=\s*"([^"]*)")' if capture else ""
+        tag_name = re.escape(tag) if tag else r'[a-zA-Z][\w-]*'
+        self.regex = re.compile(rf'<{tag_name}\b{condition}{captured}[^>]*>')
+
+    @staticmethod
+    def _word_condition(attribute, word):
+        return rf'(?=[^>]*?\s{attribute}\s*=\s*"(?:[^"]*\s)?{re.escape(word)}(?:\s[^"]*)?")'
+
+    def find(self, html, start=0, end=None):
+        """
+        Finds the tags matching the selector between two offsets, in document order.
+
+        Args:
+            html (str): The page.
+            start (int): The offset to start looking at.
+            end (int): The offset to stop looking at, the end of the page by default.
+
+        Yields:
+            re.Match: The match of a tag, with the captured value as its first group.
+        """
+        end = len(html) if end is None else end
+        position = start
+        while True:
+            found = html.find(self.marker, position, end)
+            if found < 0:
+                return
+            tag_start = html.rfind("<", start, found)
+            match = self.regex.match(html, tag_start, end) if tag_start >= 0 else None
+            # The marker has to be inside the matched tag, not in the text after it
+            if match and match.end() > found:
+                yield match
+                position = match.end()
+            else:
+                position = found + len(self.marker)
+
+    def first(self, html, start=0, end=None):
+        """
+        The first tag matching the selector between two offsets.
+
+        Args:
+            html (str): The page.
+            start (int): The offset to start looking at.
+            end (int): The offset to stop looking at, the end of the page by default.
+
+        Returns:
+            re.Match or None: The match of the tag, or None if no tag matches.
+        """
+        return next(self.find(html, start, end), None)
+
+
+def attribute_value(match):
+    """
+    The unescaped attribute value captured by a selector.
+
+    Args:
+        match (re.Match): The match of the tag.
+
+    Returns:
+        str: The value.
+    """
+    value = match.group(1)
+    return html_entities.unescape(value) if "&" in value else value
+
+
+def inner_text(html, start, tag_name):
+    """
+    The text of an element up to its first closing tag of the same name, with the markup removed.
+
+    Args:
+        html (str): The page.
+        start (int): The offset right after the opening tag of the element.
+        tag_name (str): The name of the element.
+
+    Returns:
+        str: The stripped, unescaped text.
+    """
+    end = html.find(f"</{tag_name}", start)
+    return html_entities.unescape(MARKUP.sub("", html[start:end if end >= 0 else len(html)])).strip()
+
+
+class TemplateRules:
+    """
+    Base class for the extraction rules of one kind of page, with the cache of the layouts they were
+    checked against.
+
+    The fingerprint of a page is the shape (tag name and attribute names) of the first element every
+    structural selector matches. Pages with a fingerprint that was checked before are extracted with the
+    rules alone. A new fingerprint means the template changed: the page is parsed with the DOM, the rules
+    are checked against the DOM result, and pages of that layout take the fast path only if they agree.
+    Every `verify_every`-th page of a checked layout is checked again. Pages missing a required anchor, such
+    as empty results or error pages, are always parsed with the DOM: their fingerprint is shared by pages the
+    rules cannot read at all, such as pages quoting attributes differently.
+
+    Attributes:
+        name (str): The kind of page, used for logging.
+        structure (list): The selectors whose matches make up the fingerprint.
+        required (list): The structural selectors a page must match for its layout to be cached.
+        layouts (dict): Whether the rules match, by fingerprint.
+        verify_every (int): How often pages of a checked layout are checked again.
+    """
+    name = None
+    structure = []
+    required = []
+
+    def __init__(self, verify_every=1000):
+        self.layouts = {}
+        self.pages = {}
+        self.verify_every = verify_every
+
+    def fingerprint(self, html):
+        """
+        The layout fingerprint of a page.
+
+        Args:
+            html (str): The page.
+
+        Returns:
+            tuple: The fingerprint, the shape of the first match of every structural selector or None where
+            there is none, and the matches themselves, for the extraction to start from.
+        """
+        shapes, anchors = [], []
+        for selector in self.structure:
+            match = selector.first(html)
+            tag = parse_tag(html, match.start(), match.end()) if match else None
+            shapes.append((tag.name, tuple(sorted(tag.attributes))) if tag else None)
+            anchors.append(match)
+        return tuple(shapes), anchors
+
+    def has_required(self, anchors):
+        """
+        Whether a page matches every required structural selector.
+
+        Args:
+            anchors (list): The first match of every structural selector, as returned by `fingerprint`.
+
+        Returns:
+            bool: Whether none of the required anchors is missing.
+        """
+        return all(anchor for selector, anchor in zip(self.structure, anchors) if selector in self.required)
+
+    def extract(self, html, anchors, *args):
+        raise NotImplementedError("Implement me")
+
+    def parse(self, html, dom_parse, *args):
+        """
+        Parses a page with the rules when its layout is known to match them, with the DOM otherwise.
+
+        A page missing a required anchor is parsed with the DOM and its layout is not cached. Any other page
+        the DOM parser rejects is a layout of its own: it matches the rules if they reject it too, and later
+        pages of that layout are rejected without a DOM.
+
+        Args:
+            html (str): The page.
+            dom_parse (callable): The DOM parser of the same kind of page, called with the page and `args`.
+            *args: Further arguments of the parsers.
+
+        Returns:
+            The parsed page, as the DOM parser would return it.
+
+        Raises:
+            ValueError: If the page cannot be parsed.
+        """
+        html = html or ""
+        fingerprint, anchors = self.fingerprint(html)
+        if not self.has_required(anchors):
+            return self.dom_parse(dom_parse, html, *args)
+        matched = self.layouts.get(fingerprint)
+        if matched:
+            self.pages[fingerprint] = self.pages.get(fingerprint, 0) + 1
+            if self.pages[fingerprint] % self.verify_every:
+                return self.extract(html, anchors, *args)
+        elif matched is False:
+            return self.dom_parse(dom_parse, html, *args)
+
+        try:
+            expected, error = self.dom_parse(dom_parse, html, *args), None
+        except ValueError as e:
+            expected, error = None, e
+        if matched is None and self.layouts and error is None:
+            logger.warning(f"Template drift on {self.name} pages, new layout {fingerprint}: "
+                           f"checking the extraction rules against the DOM")
+        try:
+            still_matched = self.extract(html, anchors, *args) == expected and error is None
+        except ValueError:
+            still_matched = error is not None
+        except Exception:
+            still_matched = False
+        if still_matched != matched:
+            if not still_matched:
+                logger.warning(f"Extraction rules do not match the {self.name} page layout {fingerprint}, "
+                               f"parsing these pages with the DOM")
+            self.layouts[fingerprint] = still_matched
+        if error is not None:
+            raise error
+        return expected
+
+    def dom_parse(self, dom_parse, html, *args):
+        """
+        Parses a page with the DOM parser, turning any error it raises into a ValueError, since the DOM
+        engines do not all reject an unreadable page the same way.
+
+        Args:
+            dom_parse (callable): The DOM parser.
+            html (str): The page.
+            *args: Further arguments of the parser.
+
+        Returns:
+            The parsed page.
+
+        Raises:
+            ValueError: If the DOM parser failed.
+        """
+        try:
+            return dom_parse(html, *args)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Unreadable {self.name} page: {e!r}") from e
+
+
+class SearchPageRules(TemplateRules):
+    """
+    Extraction rules of search pages: the first non-login link of every search title in the results list,
+    and the next page and page count of the pagination.
+    """
+    name = "search"
+    RESULTS = Selector('div[data-testid="results-list"]')
+    TITLE = Selector('div.search-title')
+    LINK = Selector('a[href]', capture="href")
+    PAGINATION = Selector('nav[aria-label="Pagination"]')
+    NEXT = Selector('a[rel~=next]', capture="href")
+    TOTAL_PAGES = Selector('[data-total-pages]', capture="data-total-pages")
+    structure = [RESULTS, TITLE, PAGINATION]
+    required = [RESULTS]
+
+    def extract(self, html, anchors, search_type):
+        """
+        Extracts a search page with the rules.
+
+        Args:
+            html (str): The page.
+            anchors (list): The first results list, search title and pagination of the page.
+            search_type (str): The type of search results to parse.
+
+        Returns:
+            SearchPage: The search results, the URL of the next page and the number of the last page.
+        """
+        result_list, _, pagination = anchors
+        results = []
+        if result_list and search_type.lower() in AVAILABLE_SEARCH_TYPES:
+            list_end = pagination.start() if pagination and pagination.start() > result_list.end() else len(html)
+            for title in self.TITLE.find(html, result_list.end(), list_end):
+                title_end = html.find("</div>", title.end(), list_end)
+                for link in self.LINK.find(html, title.end(), title_end if title_end >= 0 else list_end):
+                    href = attribute_value(link)
+                    if href and not href.startswith('/login?return_to='):
+                        results.append({"url": href})
+                        break
+
+        next_page = None
+        page_count = None
+        if pagination:
+            nav_end = html.find("</nav>", pagination.end())
+            nav_end = nav_end if nav_end >= 0 else len(html)
+            next_link = self.NEXT.first(html, pagination.end(), nav_end)
+            next_page = attribute_value(next_link) if next_link else None
+
+            total_pages = self.TOTAL_PAGES.first(html, pagination.start(), nav_end)
+            if total_pages and total_pages.group(1).isdigit():
+                page_count = int(total_pages.group(1))
+            else:
+                page_numbers = [int(number) for number in PAGE_NUMBER.findall(html, pagination.end(), nav_end)]
+                page_count = max(page_numbers) if page_numbers else None
+
+        return SearchPage(results, next_page, page_count)
+
+
+class RepoPageRules(TemplateRules):
+    """
+    Extraction rules of repository pages: the text of the author and the labels of the language bar.
+    """
+    name = "repository"
+    AUTHOR = Selector('span.author')
+    LANGUAGE = Selector('span.Progress-item', capture="aria-label")
+    structure = [AUTHOR, LANGUAGE]
+    required = [AUTHOR]
+
+    def extract(self, html, anchors):
+        """
+        Extracts a repository page with the rules.
+
+        Args:
+            html (str): The page.
+            anchors (list): The first author and language bar item of the page.
+
+        Returns:
+            dict: A dictionary containing owner information and language statistics.
+
+        Raises:
+            ValueError: If the page has no owner.
+        """
+        author, first_language = anchors
+        if author is None:
+            raise ValueError("Repository owner not found")
+
+        language_stats = {}
+        for item in self.LANGUAGE.find(html, first_language.start()) if first_language else []:
+            aria_label = attribute_value(item)
+            if aria_label:
+                language, percentage = parse_language_label(aria_label)
+                language_stats[language] = percentage
+
+        return {"owner": inner_text(html, author.end(), "span"), "language_stats": language_stats}
@@ -0,0 +1,335 @@
+import asyncio
+import datetime
+import logging
+from batch import BatchCrawler, query_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGES = ["JavaScript", "Python", "Java", "TypeScript", "C#", "C++", "PHP", "Go", "Ruby", "C", "Shell",
+                     "Rust"]
+
+
+class CreatedDimension:
+    """
+    Splits a search by creation date, halving the date range until a slice covers a single day.
+
+    Attributes:
+        root (tuple): The first and last creation dates of the whole search.
+    """
+    def __init__(self, since=datetime.date(2008, 1, 1), until=None):
+        self.root = (since, until or datetime.date.today())
+
+    def split(self, bounds):
+        """
+        Halve a date range.
+
+        Parameters:
+        - bounds (tuple): The first and last dates of the slice.
+
+        Returns:
+        - parts (list): The two halves, or None if the slice covers a single day.
+        """
+        start, end = bounds
+        if start >= end:
+            return None
+        middle = start + (end - start) // 2
+        return [(start, middle), (middle + datetime.timedelta(days=1), end)]
+
+    def qualifiers(self, bounds):
+        if bounds == self.root:
+            return []
+        return [f"created:{bounds[0].isoformat()}..{bounds[1].isoformat()}"]
+
+
+class StarsDimension:
+    """
+    Splits a search by star count: the repositories with more than `max_stars` stars in one slice, the
+    others halved until a slice covers a single star count.
+
+    Attributes:
+        root (tuple): The star range of the whole search, with no upper bound.
+    """
+    def __init__(self, max_stars=100000):
+        self.max_stars = max_stars
+        self.root = (0, None)
+
+    def split(self, bounds):
+        """
+        Split a star range.
+
+        Parameters:
+        - bounds (tuple): The lowest and highest star counts of the slice, the highest None for no bound.
+
+        Returns:
+        - parts (list): The parts of the range, or None if it cannot be split further.
+        """
+        low, high = bounds
+        if high is None:
+            return [(low, self.max_stars), (self.max_stars + 1, None)] if low <= self.max_stars else None
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        return [(low, middle), (middle + 1, high)]
+
+    def qualifiers(self, bounds):
+        if bounds == self.root:
+            return []
+        low, high = bounds
+        return [f"stars:>={low}" if high is None else f"stars:{low}..{high}"]
+
+
+class LanguageDimension:
+    """
+    Splits a search into one slice per listed language, plus one slice for all the other languages.
+
+    Attributes:
+        root (tuple): The whole search, no language included or excluded.
+    """
+    def __init__(self, languages=None):
+        self.languages = list(languages or DEFAULT_LANGUAGES)
+        self.root = (None, None)
+
+    def split(self, bounds):
+        """
+        Split the whole search by language.
+
+        Parameters:
+        - bounds (tuple): ('language', name) for a single language, ('others', names) for the languages
+          not listed, or the root.
+
+        Returns:
+        - parts (list): The language slices, or None if the slice is already restricted.
+        """
+        if bounds != self.root:
+            return None
+        return [("language", language) for language in self.languages] + [("others", tuple(self.languages))]
+
+    def qualifiers(self, bounds):
+        kind, value = bounds
+        if kind == "language":
+            return [f"language:{value}"]
+        if kind == "others":
+            return [f"-language:{language}" for language in value]
+        return []
+
+
+DIMENSIONS = {
+    "created": lambda data: CreatedDimension(datetime.date.fromisoformat(data.get("partition_created_since", "2008-01-01"))),
+    "stars": lambda data: StarsDimension(data.get("partition_max_stars", 100000)),
+    "language": lambda data: LanguageDimension(data.get("partition_languages")),
+}
+
+
+def get_dimensions(data):
+    """
+    Get the dimensions queries are split along, from the `partition_by` setting.
+
+    Parameters:
+    - data (dict): The crawler configuration.
+
+    Returns:
+    - dimensions (list): The dimensions, in the configured order.
+
+    Raises:
+    - ValueError: If a dimension name is unknown.
+    """
+    names = data.get("partition_by", ["created"])
+    for name in names:
+        if name not in DIMENSIONS:
+            raise ValueError(f"Unknown partition dimension '{name}'. Available dimensions: {', '.join(DIMENSIONS)}")
+    return [DIMENSIONS[name](data) for name in names]
+
+
+class QueryPlanner:
+    """
+    Splits a search query into disjoint slices that each fit under the result cap of GitHub search, which
+    stops paginating after `max_search_pages` pages.
+
+    The planner fetches the first page of the query. While a slice reaches the cap, it is split along the
+    first of its dimensions that can still be split, and the parts are probed, at most `concurrency` at a
+    time. The size of a slice whose probe keeps failing is unknown: it is split as well, until
+    `max_probe_failures` probes of the query have failed, then crawled as is, so a lasting failure does not
+    split the query down to its smallest slices. A slice that reaches the cap but cannot be split any
+    further is crawled anyway, and its truncation is logged.
+
+    The first pages of the slices that fit are kept in `first_pages`, so crawling a slice does not fetch its
+    first page again.
+
+    Attributes:
+        crawler (GitHubCrawler): The crawler the probes are sent with.
+        dimensions (list): The dimensions to split along, in order.
+        max_search_pages (int): The number of pages after which GitHub stops paginating.
+        concurrency (int): The number of probes sent at the same time.
+        retries (int): How many times a failed probe is sent again.
+        max_probe_failures (int): How many failed probes of a query lead to a split before failed slices are
+          crawled as is.
+        first_pages (dict): The parsed first pages of the planned slices, by query key.
+    """
+    def __init__(self, crawler, dimensions, max_search_pages=100, concurrency=5, retries=2, max_probe_failures=10):
+        self.crawler = crawler
+        self.dimensions = dimensions
+        self.max_search_pages = max_search_pages
+        self.concurrency = concurrency
+        self.retries = retries
+        self.max_probe_failures = max_probe_failures
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.first_pages = {}
+
+    def slice_query(self, query, bounds):
+        """
+        Get the query of a slice: the original keywords plus the qualifiers of the slice.
+
+        Parameters:
+        - query (dict): The original query, with 'keywords' and 'type'.
+        - bounds (tuple): The bounds of the slice along every dimension.
+
+        Returns:
+        - slice_query (dict): The query of the slice, with the identifier of the original query.
+        """
+        qualifiers = [qualifier for dimension, bound in zip(self.dimensions, bounds)
+                      for qualifier in dimension.qualifiers(bound)]
+        return {**query, "id": query_id(query), "keywords": list(query.get("keywords", [])) + qualifiers}
+
+    def split(self, bounds):
+        """
+        Split a slice along the first dimension that can still be split.
+
+        Parameters:
+        - bounds (tuple): The bounds of the slice along every dimension.
+
+        Returns:
+        - parts (list): The bounds of the parts, or None if no dimension can be split.
+        """
+        for index, dimension in enumerate(self.dimensions):
+            parts = dimension.split(bounds[index])
+            if parts:
+                return [bounds[:index] + (part,) + bounds[index + 1:] for part in parts]
+        return None
+
+    async def probe(self, query):
+        """
+        Fetch and parse the first page of a query, sending it again up to `retries` times if it fails.
+
+        Parameters:
+        - query (dict): The query, with 'keywords' and 'type'.
+
+        Returns:
+        - key (str): The query key of the page.
+        - search_page (SearchPage): The first page, or None if it could not be fetched.
+        """
+        params = await self.crawler.construct_github_search_params(query.get("keywords", []), query.get("type"))
+        async with self.semaphore:
+            for attempt in range(1, self.retries + 2):
+                search_page = await self.crawler.get_search_page("/search", params)
+                if search_page is not None:
+                    return self.crawler.query_key(params), search_page
+                logger.warning(f"Probe of slice {params['q']} failed, attempt {attempt} of {self.retries + 1}")
+        return self.crawler.query_key(params), None
+
+    def is_capped(self, search_page):
+        """
+        Tell whether a query reaches the result cap, from the pagination of its first page.
+
+        Parameters:
+        - search_page (SearchPage): The first page of the query.
+
+        Returns:
+        - capped (bool): Whether the query has `max_search_pages` pages.
+        """
+        return bool(search_page.page_count) and search_page.page_count >= self.max_search_pages
+
+    async def plan(self, query):
+        """
+        Yield the slices of a query as soon as they are known to fit under the cap, probing the slices of
+        one refinement level concurrently.
+
+        Parameters:
+        - query (dict): The query, with 'keywords' and 'type'.
+
+        Yields:
+        - query (dict): The query of a slice.
+        """
+        level = [tuple(dimension.root for dimension in self.dimensions)]
+        slices = failures = 0
+        while level:
+            probes = await asyncio.gather(*(self.probe(self.slice_query(query, bounds)) for bounds in level))
+            next_level = []
+            for bounds, (key, first_page) in zip(level, probes):
+                name = " ".join(self.slice_query(query, bounds)["keywords"])
+                if first_page is None:
+                    failures += 1
+                    split = failures <= self.max_probe_failures
+                else:
+                    split = self.is_capped(first_page)
+                parts = self.split(bounds) if split else None
+                if parts:
+                    if first_page is None:
+                        logger.warning(f"Slice {name} could not be probed, splitting it")
+                    next_level.extend(parts)
+                    continue
+                if first_page is None:
+                    logger.warning(f"Slice {name} could not be probed, crawling it as is")
+                elif split:
+                    logger.warning(f"Slice {name} cannot be split further, its results are truncated")
+                else:
+                    self.first_pages[key] = first_page
+                slices += 1
+                yield self.slice_query(query, bounds)
+            level = next_level
+        logger.info(f"Query {query_id(query)} planned in {slices} slices")
+
+
+class PartitionedCrawler(BatchCrawler):
+    """
+    Crawls queries broader than the result cap of GitHub search by splitting each of them into slices
+    narrowed with `created:`, `stars:` or `language:` qualifiers, then crawling the slices concurrently
+    like the queries of a batch.
+
+    The dimensions are set with `partition_by`, `created` by default. Every result is tagged with the
+    identifier of the original query.
+    """
+    def __init__(self, data, queries):
+        super().__init__(data, queries)
+        self.planner = QueryPlanner(self, get_dimensions(data), data.get("max_search_pages", 100),
+                                    data.get("probe_concurrency", 5), data.get("probe_retries", 2),
+                                    data.get("max_probe_failures", 10))
+
+    async def get_search_page(self, search_url, params):
+        """
+        Get one search page, serving the first page of a slice from its probe.
+
+        Parameters:
+        - search_url (str): The search URL.
+        - params (dict): Parameters for the search, with the page number in 'p' after the first page.
+
+        Returns:
+        - search_page (SearchPage): The parsed page, or None if it could not be fetched.
+        """
+        if 'p' not in params:
+            search_page = self.planner.first_pages.pop(self.query_key(params), None)
+            if search_page is not None:
+                return search_page
+        return await super().get_search_page(search_url, params)
+
+    async def produce_query_results(self, query, queue, semaphore):
+        """
+        Plan the slices of one query and feed the hits of every slice into the work queue, starting each
+        slice as soon as it is planned.
+
+        Parameters:
+        - query (dict): The query, with 'keywords' and 'type'.
+        - queue (asyncio.Queue): The queue the enrichment workers read from.
+        - semaphore (asyncio.Semaphore): Limits how many slices are paginated at the same time.
+        """
+        slices, tasks = [], []
+        try:
+            async for slice_query in self.planner.plan(query):
+                slices.append(slice_query)
+                tasks.append(asyncio.create_task(super().produce_query_results(slice_query, queue, semaphore)))
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for slice_query, outcome in zip(slices, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Slice {' '.join(slice_query['keywords'])} failed: {outcome}")
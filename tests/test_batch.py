@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from batch import BatchCrawler, load_queries, query_id
+
+
+def search_page(*urls):
+    return ('<div data-testid="results-list">'
+            + ''.join(f'<div class="search-title"><a href="{url}">{url}</a></div>' for url in urls) + '</div>')
+
+
+class TestLoadQueries(unittest.TestCase):
+    def test_load_queries(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('{"keywords": ["python"], "type": "repositories"}\n\n{"id": "js", "keywords": ["js"]}\n')
+        try:
+            queries = load_queries(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual([query_id(query) for query in queries], ["python", "js"])
+
+    def test_invalid_line(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('{"keywords": ["python"]}\nnot json\n')
+        try:
+            with self.assertRaises(ValueError):
+                load_queries(f.name)
+        finally:
+            os.remove(f.name)
+
+
+class TestBatchCrawler(unittest.IsolatedAsyncioTestCase):
+    async def test_queries_share_repository_fetches(self):
+        crawler = BatchCrawler({"type": "repositories", "concurrency": 3}, [
+            {"keywords": ["python", "jwt"]},
+            {"keywords": ["django"]},
+            {"keywords": ["docs"], "type": "wikis"},
+        ])
+        pages = {
+            "python+jwt": search_page("/a/shared", "/a/one"),
+            "django": search_page("/a/shared", "/b/two"),
+            "docs": search_page("/c/wiki"),
+        }
+        fetched = []
+
+        async def fetch_search_page(search_url, params):
+            return pages[params["q"]]
+
+        async def fetch_with_retries(url, params=None, timeout=None):
+            fetched.append(url)
+            return 200, f'<span class="author">{url.split("/")[1]}</span>'
+
+        with patch.object(crawler, 'fetch_search_page', side_effect=fetch_search_page), \
+                patch.object(crawler, 'fetch_with_retries', side_effect=fetch_with_retries):
+            results = await crawler.run()
+
+        self.assertEqual(sorted(fetched), ["/a/one", "/a/shared", "/b/two"])
+        self.assertEqual(sorted((result["query"], result["url"]) for result in results), [
+            ("django", "https://github.com/a/shared"),
+            ("django", "https://github.com/b/two"),
+            ("docs", "https://github.com/c/wiki"),
+            ("python+jwt", "https://github.com/a/one"),
+            ("python+jwt", "https://github.com/a/shared"),
+        ])
+        self.assertTrue(all("extra" in result for result in results if result["query"] != "docs"))
+        self.assertFalse(any("extra" in result for result in results if result["query"] == "docs"))
+        self.assertEqual(crawler.metrics.deduplicated.total(), 1)
+        self.assertEqual(crawler.repo_infos, {})
+
+    async def test_shared_repositories_without_request_deduplication(self):
+        for config, fetches in (({}, 1), ({"repo_info_cache_size": 1}, 2)):
+            crawler = BatchCrawler({"type": "repositories", "concurrency": 1, "query_concurrency": 1,
+                                    "dedupe_requests": False, **config},
+                                   [{"keywords": ["python"]}, {"keywords": ["django"]}])
+            fetched = []
+
+            async def fetch_search_page(search_url, params):
+                return search_page("/a/shared", "/b/other")
+
+            async def fetch_with_retries(url, params=None, timeout=None):
+                fetched.append(url)
+                return 200, f'<span class="author">{url.split("/")[1]}</span>'
+
+            with patch.object(crawler, 'fetch_search_page', side_effect=fetch_search_page), \
+                    patch.object(crawler, 'fetch_with_retries', side_effect=fetch_with_retries):
+                results = await crawler.run()
+            self.assertEqual(len(results), 4)
+            self.assertEqual(fetched.count("/a/shared"), fetches, config)
+
+
+if __name__ == '__main__':
+    unittest.main()
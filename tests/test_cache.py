@@ -0,0 +1,136 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from crawler import GitHubCrawler
+from misc.cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp.name, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get("/search", {"q": "python"}))
+
+    def test_roundtrip_keyed_by_params(self):
+        self.cache.set("/search", {"q": "python", "p": 2}, "<html>2</html>", {"ETag": '"abc"'})
+        entry = self.cache.get("/search", {"p": 2, "q": "python"})
+        self.assertEqual(entry.body, "<html>2</html>")
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertIsNone(self.cache.get("/search", {"q": "python", "p": 3}))
+
+    def test_persists_across_instances(self):
+        self.cache.set("/owner/repo", None, "<html>repo</html>")
+        self.assertEqual(ResponseCache(self.tmp.name).get("/owner/repo").body, "<html>repo</html>")
+
+    def test_freshness_and_conditional_headers(self):
+        self.cache.set("/owner/repo", None, "body", {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        entry = self.cache.get("/owner/repo")
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertFalse(self.cache.is_fresh(entry._replace(stored_at=time.time() - 120)))
+        self.assertEqual(self.cache.conditional_headers(entry),
+                         {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    def test_offline_entries_never_expire(self):
+        cache = ResponseCache(self.tmp.name, ttl=0, offline=True)
+        cache.set("/owner/repo", None, "body")
+        self.assertTrue(cache.is_fresh(cache.get("/owner/repo")))
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = ResponseCache(self.tmp.name, max_size=700)
+        cache.set("/a", None, "a" * 200)
+        time.sleep(0.01)
+        cache.set("/b", None, "b" * 200)
+        time.sleep(0.01)
+        cache.get("/a")
+        cache.set("/c", None, "c" * 200)
+        self.assertIsNotNone(cache.get("/a"))
+        self.assertIsNone(cache.get("/b"))
+        self.assertIsNotNone(cache.get("/c"))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_eviction_order_survives_restarts(self):
+        cache = ResponseCache(self.tmp.name, max_size=700)
+        cache.set("/a", None, "a" * 200)
+        time.sleep(0.01)
+        cache.set("/b", None, "b" * 200)
+        time.sleep(0.01)
+        cache.get("/a")
+        reopened = ResponseCache(self.tmp.name, max_size=700)
+        self.assertEqual(reopened.size, sum(reopened.index.values()))
+        reopened.set("/c", None, "c" * 200)
+        self.assertIsNotNone(reopened.get("/a"))
+        self.assertIsNone(reopened.get("/b"))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+
+class FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.content = SimpleNamespace(total_bytes=len(body.encode()) if body else 0)
+
+    async def text(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class TestCrawlerCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories",
+                                      "cache_dir": self.tmp.name, "cache_ttl": 0})
+        await self.crawler.create_session()
+
+    async def asyncTearDown(self):
+        await self.crawler.close()
+        self.tmp.cleanup()
+
+    async def test_revalidates_with_etag(self):
+        with patch.object(self.crawler.session, 'get', return_value=FakeResponse(200, "v1", {"ETag": '"v1"'})):
+            self.assertEqual(await self.crawler.fetch_page("/owner/repo"), (200, "v1"))
+
+        with patch.object(self.crawler.session, 'get', return_value=FakeResponse(304)) as get:
+            self.assertEqual(await self.crawler.fetch_page("/owner/repo"), (200, "v1"))
+        self.assertEqual(get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+    async def test_cache_runs_off_the_event_loop(self):
+        threads = []
+        get = self.crawler.cache.get
+
+        def record_thread(url, params=None):
+            threads.append(threading.current_thread())
+            return get(url, params)
+
+        self.crawler.cache.set("/owner/repo", None, "cached")
+        self.crawler.cache.offline = True
+        with patch.object(self.crawler.cache, 'get', side_effect=record_thread):
+            self.assertEqual(await self.crawler.fetch_page("/owner/repo"), (200, "cached"))
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    async def test_offline_replay(self):
+        self.crawler.cache.set("/owner/repo", None, "cached")
+        self.crawler.cache.offline = True
+        with patch.object(self.crawler.session, 'get') as get:
+            self.assertEqual(await self.crawler.fetch_page("/owner/repo"), (200, "cached"))
+            self.assertEqual(await self.crawler.fetch_page("/owner/other"), (504, None))
+        get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
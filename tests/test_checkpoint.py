@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from crawler import GitHubCrawler
+from misc.checkpoint import CheckpointStore
+
+
+def search_page(page, urls, last=False):
+    hits = ''.join(f'<div class="search-title"><a href="{url}">{url}</a></div>' for url in urls)
+    nav = '' if last else f'<nav aria-label="Pagination"><a rel="next" href="/search?p={page + 1}">Next</a></nav>'
+    return f'<div data-testid="results-list">{hits}</div>{nav}'
+
+
+class TestCheckpointStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "checkpoint.db")
+        self.store = CheckpointStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_progress_and_hits(self):
+        self.assertEqual(self.store.get_progress("python|repositories"), (0, False))
+        self.store.record_page("python|repositories", 1, [{"url": "/a"}, {"url": "/b"}])
+        self.store.record_page("python|repositories", 2, [{"url": "/c"}], last=True)
+        self.assertEqual(self.store.get_progress("python|repositories"), (2, True))
+        self.assertEqual(self.store.get_hits("python|repositories"), [{"url": "/a"}, {"url": "/b"}, {"url": "/c"}])
+
+    def test_results_survive_reopening(self):
+        self.store.add_result("python|repositories", "/a", {"url": "https://github.com/a", "extra": {}})
+        self.store.close()
+        self.store = CheckpointStore(self.path)
+        self.assertEqual(self.store.get_result("python|repositories", "/a")["url"], "https://github.com/a")
+        self.assertIsNone(self.store.get_result("python|repositories", "/b"))
+
+    def test_reset(self):
+        self.store.record_page("python|repositories", 1, [{"url": "/a"}])
+        self.store.add_result("python|repositories", "/a", {"url": "https://github.com/a"})
+        self.store.record_page("jwt|repositories", 1, [{"url": "/b"}])
+        self.store.reset("python|repositories")
+        self.assertEqual(self.store.get_progress("python|repositories"), (0, False))
+        self.assertEqual(self.store.get_hits("python|repositories"), [])
+        self.assertIsNone(self.store.get_result("python|repositories", "/a"))
+        self.assertEqual(self.store.get_progress("jwt|repositories"), (1, False))
+
+
+class TestCrawlerResume(unittest.IsolatedAsyncioTestCase):
+    async def test_resume_skips_finished_work(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"keywords": ["python"], "type": "repositories", "checkpoint": os.path.join(tmp, "cp.db")}
+            pages = {1: search_page(1, ["/a/one", "/a/two"]), 2: search_page(2, ["/b/three"], last=True)}
+            requested_pages = []
+            fetched_repos = []
+            broken_repos = {"/a/two"}
+
+            async def failing_fetch_search_page(search_url, params):
+                page = params.get('p', 1)
+                requested_pages.append(page)
+                return pages[page] if page == 1 else None
+
+            async def fetch_search_page(search_url, params):
+                requested_pages.append(params.get('p', 1))
+                return pages[params.get('p', 1)]
+
+            async def get_repo_info(repo_url):
+                fetched_repos.append(repo_url)
+                if repo_url in broken_repos:
+                    return None
+                return {"owner": repo_url.split('/')[1], "language_stats": {}}
+
+            crawler = GitHubCrawler(config)
+            with patch.object(crawler, 'fetch_search_page', side_effect=failing_fetch_search_page), \
+                    patch.object(crawler, 'get_repo_info', side_effect=get_repo_info):
+                first = await crawler.run()
+            self.assertEqual([result["url"] for result in first], ["https://github.com/a/one"])
+
+            requested_pages.clear()
+            fetched_repos.clear()
+            broken_repos.clear()
+            crawler = GitHubCrawler({**config, "resume": True})
+            with patch.object(crawler, 'fetch_search_page', side_effect=fetch_search_page), \
+                    patch.object(crawler, 'get_repo_info', side_effect=get_repo_info):
+                second = await crawler.run()
+            self.assertIsNone(crawler.checkpoint._connection)
+            self.assertEqual(crawler.checkpoint.get_progress(crawler.query_key(
+                await crawler.construct_github_search_params())), (2, True))
+
+        self.assertEqual(requested_pages, [2])
+        self.assertEqual(sorted(fetched_repos), ["/a/two", "/b/three"])
+        self.assertEqual(sorted(result["url"] for result in second), [
+            "https://github.com/a/one", "https://github.com/a/two", "https://github.com/b/three"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,20 +1,29 @@
 import unittest
 import asyncio
-from unittest.mock import MagicMock, patch
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+from benchmarks.mock_github import MockGitHubServer
 from crawler import GitHubCrawler
+from misc.metrics import proxy_label
+from misc.utils import ProxiesExhausted
 
-class TestGitHubCrawler(unittest.TestCase):
-    def setUp(self):
+class TestGitHubCrawler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = MockGitHubServer(repositories=25, per_page=10)
+        await self.server.start()
         self.data = {
+            "base_url": self.server.url,
             "keywords": ["openstack", "nova", "css"],
-            "proxies": ["http://194.126.37.94:8080", "http://13.78.125.167:8080"],
+            "proxies": [self.server.proxy_url],
             "type": "repositories"
         }
         self.crawler = GitHubCrawler(self.data)
 
-    @patch('crawler.ProxyManager.get_next_proxy')
-    async def test_construct_github_search(self, mock_get_next_proxy):
-        mock_get_next_proxy.return_value = "http://mock_proxy:8080"
+    async def asyncTearDown(self):
+        await self.crawler.close()
+        await self.server.stop()
+
+    async def test_construct_github_search(self):
         params = await self.crawler.construct_github_search_params()
         self.assertIsNotNone(params)
         self.assertEqual(params['q'], 'openstack+nova+css')
@@ -24,45 +33,275 @@ class TestGitHubCrawler(unittest.TestCase):
     async def test_get_search_result(self, mock_fetch_search_page):
         mock_fetch_search_page.return_value = '<html>Mock Search Page</html>'
         results = await self.crawler.get_search_result()
-        self.assertIsNotNone(results)
+        self.assertEqual(results, [])
 
-    @patch('crawler.GitHubCrawler.fetch_search_page')
-    async def test_get_repo_info(self, mock_fetch_search_page):
-        mock_fetch_search_page.return_value = '<html>Mock Repo Info Page</html>'
-        repo_url = 'https://github.com/atuldjadhav/DropBox-Cloud-Storage'
-        repo_info = await self.crawler.get_repo_info(repo_url)
-        self.assertIsNotNone(repo_info)
-
-    @patch('crawler.ProxyManager.get_next_proxy')
-    async def test_fetch_search_page(self, mock_get_next_proxy):
-        mock_get_next_proxy.return_value = "http://mock_proxy:8080"
-        session_mock = MagicMock()
-        response_mock = MagicMock()
-        response_mock.status = 200
-        response_mock.text.return_value = '<html>Mock Search Page</html>'
-        session_mock.get.return_value.__aenter__.return_value = response_mock
-        html = await self.crawler.fetch_search_page('http://mock_url', {})
-        self.assertIsNotNone(html)
-
-    @patch('crawler.ProxyManager.get_next_proxy')
-    async def test_fetch_search_page_connection_error(self, mock_get_next_proxy):
-        mock_get_next_proxy.return_value = "http://mock_proxy:8080"
+    async def test_get_repo_info(self):
+        await self.crawler.create_session()
+        repo_info = await self.crawler.get_repo_info('/owner3/repo3')
+        self.assertEqual(repo_info["owner"], "owner3")
+        self.assertEqual(len(repo_info["language_stats"]), 6)
+
+    async def test_fetch_search_page(self):
+        await self.crawler.create_session()
+        html = await self.crawler.fetch_search_page('/search', {"q": "css", "type": "repositories"})
+        self.assertIn('/owner0/repo0', html)
+
+    async def test_fetch_search_page_connection_error(self):
         session_mock = MagicMock()
         session_mock.get.side_effect = asyncio.TimeoutError
-        html = await self.crawler.fetch_search_page('http://mock_url', {})
+        with patch.object(self.crawler, 'get_session', return_value=session_mock):
+            html = await self.crawler.fetch_search_page('/search', {})
         self.assertIsNone(html)
 
-    @patch('crawler.ProxyManager.get_next_proxy')
-    async def test_fetch_search_page_proxy_error(self, mock_get_next_proxy):
-        mock_get_next_proxy.return_value = "http://mock_proxy:8080"
-        session_mock = MagicMock()
-        session_mock.get.side_effect = aiohttp.ClientProxyConnectionError
-        html = await self.crawler.fetch_search_page('http://mock_url', {})
+    async def test_fetch_search_page_proxy_error(self):
+        crawler = GitHubCrawler({**self.data, "proxies": [self.server.dead_proxy_url]})
+        await crawler.create_session()
+        try:
+            with self.assertRaises(ProxiesExhausted):
+                await crawler.fetch_search_page('/search', {})
+        finally:
+            await crawler.close()
+        self.assertEqual(self.server.stats["search"], 0)
+
+    async def test_fetch_search_page_unreadable_page(self):
+        with patch.object(self.crawler, 'fetch_page', side_effect=UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid")):
+            html = await self.crawler.fetch_search_page('/search', {})
         self.assertIsNone(html)
 
+    async def test_fetch_search_page_skips_dead_proxy(self):
+        crawler = GitHubCrawler({**self.data, "proxies": [self.server.dead_proxy_url, self.server.proxy_url]})
+        await crawler.create_session()
+        try:
+            for _ in range(3):
+                self.assertIsNotNone(await crawler.fetch_search_page('/search', {}))
+        finally:
+            await crawler.close()
+
+    async def test_stream_cleans_up_when_startup_fails(self):
+        crawler = GitHubCrawler({**self.data, "proxies": [self.server.proxy_url], "proxy_health_interval": 60})
+        exporter = MagicMock(start=AsyncMock(side_effect=OSError("Address already in use")), stop=AsyncMock())
+        crawler.metrics_exporters = [exporter]
+        with self.assertRaises(OSError):
+            await crawler.run()
+        self.assertTrue(crawler.session.closed)
+        self.assertIsNone(crawler.proxy_manager.health_check_task)
+        exporter.stop.assert_awaited_once()
+
     async def test_run(self):
         results = await self.crawler.run()
-        self.assertIsNotNone(results)
+        self.assertEqual(len(results), 25)
+        self.assertEqual(self.server.stats, {"search": 3, "repo": 25, "rate_limited": 0, "failed": 0})
+        self.assertTrue(all(result["url"].startswith(self.server.url) for result in results))
+
+    async def test_direct_requests_back_off_after_rate_limit(self):
+        await self.server.stop()
+        self.server = MockGitHubServer(repositories=5, rate_limit_rate=0.5, retry_after=0, seed=3)
+        await self.server.start()
+        crawler = GitHubCrawler({**self.data, "base_url": self.server.url, "proxies": [], "proxy_retries": 10})
+        results = await crawler.run()
+        self.assertGreater(self.server.stats["rate_limited"], 0)
+        self.assertEqual(len(results), 5)
+
+    async def test_run_recovers_from_rate_limits(self):
+        await self.server.stop()
+        self.server = MockGitHubServer(repositories=25, rate_limit_rate=0.2, retry_after=0, seed=1)
+        await self.server.start()
+        crawler = GitHubCrawler({**self.data, "base_url": self.server.url, "proxies": [self.server.proxy_url],
+                                 "proxy_retries": 5})
+        results = await crawler.run()
+        self.assertGreater(self.server.stats["rate_limited"], 0)
+        self.assertGreater(len(results), 0)
+
+    async def test_proxies_get_their_own_pools(self):
+        second_proxy = self.server.proxy_url.replace("127.0.0.1", "localhost")
+        crawler = GitHubCrawler({**self.data, "proxies": [self.server.proxy_url, second_proxy]})
+        results = await crawler.run()
+        self.assertEqual(len(results), 25)
+        self.assertEqual(crawler.proxy_sessions, {})
+        pools = {dict(key)["pool"] for key in crawler.metrics.connections.values}
+        self.assertEqual(pools, {proxy_label(self.server.proxy_url), proxy_label(second_proxy)})
+
+    async def test_connections_are_kept_alive(self):
+        crawler = GitHubCrawler({**self.data, "proxies": [], "connection_limit": 4, "dns_cache_ttl": 60})
+        results = await crawler.run()
+        self.assertEqual(len(results), 25)
+        connections = crawler.metrics.connections
+        self.assertLessEqual(connections.get(pool="direct", result="new"), 4)
+        self.assertEqual(connections.total(), 3 + 25)
+
+    async def test_shared_pool_without_proxy_pools(self):
+        await self.crawler.create_session()
+        self.crawler.proxy_pools = False
+        self.assertIs(self.crawler.get_session(self.server.proxy_url), self.crawler.session)
+        self.crawler.proxy_pools = True
+        session = self.crawler.get_session(self.server.proxy_url)
+        self.assertIsNot(session, self.crawler.session)
+        self.assertIs(self.crawler.get_session(self.server.proxy_url), session)
+
+class TestGitHubCrawlerPipeline(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories", "concurrency": 2})
+
+    async def test_stream_enriches_all_results(self):
+        pages = [
+            '<div data-testid="results-list"><div class="search-title"><a href="/a/one">1</a></div></div>'
+            '<nav aria-label="Pagination"><a rel="next" href="/search?p=2">Next</a></nav>',
+            '<div data-testid="results-list"><div class="search-title"><a href="/b/two">2</a></div></div>',
+        ]
+
+        async def fetch_search_page(search_url, params):
+            return pages[params.get('p', 1) - 1]
+
+        async def get_repo_info(repo_url):
+            return {"owner": repo_url.split('/')[1], "language_stats": {}}
+
+        with patch.object(self.crawler, 'fetch_search_page', side_effect=fetch_search_page), \
+                patch.object(self.crawler, 'get_repo_info', side_effect=get_repo_info):
+            results = await self.crawler.run()
+
+        self.assertEqual(sorted(result["url"] for result in results),
+                         ["https://github.com/a/one", "https://github.com/b/two"])
+        self.assertEqual({result["extra"]["owner"] for result in results}, {"a", "b"})
+
+    async def test_stream_respects_concurrency_limit(self):
+        html = '<div data-testid="results-list">' + ''.join(
+            f'<div class="search-title"><a href="/r/{i}">{i}</a></div>' for i in range(10)) + '</div>'
+        in_flight = 0
+        peak = 0
+
+        async def get_repo_info(repo_url):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"owner": "r", "language_stats": {}}
+
+        with patch.object(self.crawler, 'fetch_search_page', return_value=html), \
+                patch.object(self.crawler, 'get_repo_info', side_effect=get_repo_info):
+            results = await self.crawler.run()
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(peak, 2)
+
+    async def test_stream_raises_pagination_error(self):
+        with patch.object(self.crawler, 'fetch_search_page', side_effect=ProxiesExhausted("There are no more available proxies.")):
+            with self.assertRaises(ProxiesExhausted):
+                await self.crawler.run()
+
+class TestGitHubCrawlerParallelPages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.crawler = GitHubCrawler({"keywords": ["python"], "type": "issues",
+                                      "parallel_pages": True, "page_concurrency": 3})
+
+    @staticmethod
+    def search_page(page, page_count, with_count=True):
+        nav = '<nav aria-label="Pagination">'
+        if with_count:
+            nav += ''.join(f'<a href="/search?p={p}">{p}</a>' for p in range(1, page_count + 1))
+        if page < page_count:
+            nav += f'<a rel="next" href="/search?p={page + 1}">Next</a>'
+        nav += '</nav>'
+        return (f'<div data-testid="results-list"><div class="search-title"><a href="/issue/{page}">{page}</a>'
+                f'</div></div>{nav}')
+
+    async def test_pages_fetched_concurrently_in_order(self):
+        in_flight = 0
+        peak = 0
+
+        async def fetch_search_page(search_url, params):
+            nonlocal in_flight, peak
+            page = params.get('p', 1)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Later pages answer first to make sure the output order does not depend on timing
+            await asyncio.sleep(0.001 * (10 - page))
+            in_flight -= 1
+            return self.search_page(page, 8)
+
+        with patch.object(self.crawler, 'fetch_search_page', side_effect=fetch_search_page):
+            results = await self.crawler.get_search_result()
+
+        self.assertEqual([result["url"] for result in results], [f"/issue/{p}" for p in range(1, 9)])
+        self.assertEqual(peak, 3)
+
+    async def test_falls_back_to_sequential_paging(self):
+        requested = []
+
+        async def fetch_search_page(search_url, params):
+            page = params.get('p', 1)
+            requested.append(page)
+            return self.search_page(page, 3, with_count=False)
+
+        with patch.object(self.crawler, 'fetch_search_page', side_effect=fetch_search_page):
+            results = await self.crawler.get_search_result()
+
+        self.assertEqual(requested, [1, 2, 3])
+        self.assertEqual([result["url"] for result in results], ["/issue/1", "/issue/2", "/issue/3"])
+
+class TestGitHubCrawlerProxyLeases(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories",
+                                      "proxies": ["proxy1:8080", "proxy2:8080", "proxy3:8080"]})
+
+    async def test_concurrent_requests_fan_out_over_proxies(self):
+        used = []
+
+        async def fetch_page(url, params=None, proxy=None, timeout=None):
+            used.append(proxy)
+            await asyncio.sleep(0.01)
+            return 200, "<html></html>"
+
+        with patch.object(self.crawler, 'fetch_page', side_effect=fetch_page):
+            await asyncio.gather(*(self.crawler.fetch_with_proxy(f"/owner/repo{i}") for i in range(3)))
+
+        self.assertEqual(sorted(used), ["http://proxy1:8080", "http://proxy2:8080", "http://proxy3:8080"])
+        self.assertTrue(all(stats.in_flight == 0 for stats in self.crawler.proxy_manager.stats.values()))
+
+    async def test_rate_limit_retries_on_another_proxy_only(self):
+        attempts = {}
+
+        async def fetch_page(url, params=None, proxy=None, timeout=None):
+            attempts.setdefault(url, []).append(proxy)
+            if url == "/limited" and len(attempts[url]) == 1:
+                return 429, None
+            return 200, url
+
+        with patch.object(self.crawler, 'fetch_page', side_effect=fetch_page):
+            self.assertEqual(await self.crawler.fetch_with_proxy("/limited"), (200, "/limited"))
+            self.assertEqual(await self.crawler.fetch_with_proxy("/other"), (200, "/other"))
+
+        self.assertEqual(len(attempts["/limited"]), 2)
+        self.assertNotEqual(attempts["/limited"][0], attempts["/limited"][1])
+
+    async def test_rate_limits_exhaust_retries(self):
+        self.crawler.proxy_retries = 1
+        calls = []
+
+        async def fetch_page(url, params=None, proxy=None, timeout=None):
+            calls.append(proxy)
+            return 429, None
+
+        with patch.object(self.crawler, 'fetch_page', side_effect=fetch_page):
+            self.assertEqual(await self.crawler.fetch_with_proxy("/limited"), (429, None))
+        self.assertEqual(len(calls), 2)
+
+    def test_rate_limit_without_retry_after_uses_proxy_cooldown(self):
+        crawler = GitHubCrawler({"proxies": ["proxy1:8080", "proxy2:8080"], "proxy_cooldown": 120,
+                                 "adaptive_rate_limit": True})
+        stats = crawler.proxy_manager.stats
+        for proxy, retry_after in [("http://proxy1:8080", None), ("http://proxy2:8080", "5")]:
+            response = MagicMock(status=429, headers={"Retry-After": retry_after} if retry_after else {})
+            crawler.report_outcome((proxy, "search"), proxy, response, 0.1)
+        now = time.monotonic()
+        self.assertAlmostEqual(stats["http://proxy1:8080"].cooldown_until - now, 120, delta=1)
+        self.assertAlmostEqual(stats["http://proxy2:8080"].cooldown_until - now, 5, delta=1)
+
+    async def test_without_proxies_fetches_directly(self):
+        crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories"})
+        with patch.object(crawler, 'fetch_page', return_value=(200, "ok")) as fetch_page:
+            self.assertEqual(await crawler.fetch_with_proxy("/owner/repo"), (200, "ok"))
+        self.assertIsNone(fetch_page.call_args.kwargs.get("proxy"))
 
 if __name__ == '__main__':
     unittest.main()
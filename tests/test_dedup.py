@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from crawler import GitHubCrawler
+from misc.dedup import RequestDeduplicator, normalize_url
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    def test_spellings_of_the_same_page(self):
+        base = "https://github.com"
+        expected = normalize_url("/owner/repo", base_url=base)
+        for url in ("https://GitHub.com/owner/repo", "https://github.com:443/owner/repo/", "/owner/repo#readme"):
+            self.assertEqual(normalize_url(url, base_url=base), expected)
+        self.assertNotEqual(normalize_url("/owner/other", base_url=base), expected)
+
+    def test_params_are_merged_and_sorted(self):
+        self.assertEqual(normalize_url("/search?type=repositories", {"q": "python", "p": 2}, "http://localhost:8080"),
+                         "http://localhost:8080/search?p=2&q=python&type=repositories")
+        self.assertNotEqual(normalize_url("/search", {"p": 2}), normalize_url("/search", {"p": 3}))
+
+
+class TestRequestDeduplicator(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_requests_are_coalesced(self):
+        deduplicator = RequestDeduplicator()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 200, "page"
+
+        outcomes = await asyncio.gather(*(deduplicator.fetch("a", fetch) for _ in range(3)))
+        self.assertEqual(outcomes, [((200, "page"), "fetched"), ((200, "page"), "coalesced"),
+                                    ((200, "page"), "coalesced")])
+        self.assertEqual(await deduplicator.fetch("a", fetch), ((200, "page"), "recent"))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(deduplicator.in_flight, {})
+
+    async def test_failures_are_shared_but_not_kept(self):
+        deduplicator = RequestDeduplicator()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("There are no more available proxies.")
+
+        outcomes = await asyncio.gather(deduplicator.fetch("a", fail), deduplicator.fetch("a", fail),
+                                        return_exceptions=True)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+
+        async def rate_limited():
+            return 429, None
+
+        await deduplicator.fetch("a", rate_limited)
+        self.assertIsNone(deduplicator.get("a"))
+
+    async def test_lru_is_bounded_by_size(self):
+        deduplicator = RequestDeduplicator(max_size=10)
+        for key in "abc":
+            async def fetch(key=key):
+                return 200, key * 4
+            await deduplicator.fetch(key, fetch)
+        self.assertEqual(list(deduplicator.responses), ["b", "c"])
+        self.assertEqual(deduplicator.size, 8)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        deduplicator = RequestDeduplicator()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return 200, "page"
+
+        first = asyncio.create_task(deduplicator.fetch("a", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(deduplicator.fetch("a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, ((200, "page"), "coalesced"))
+        self.assertEqual(deduplicator.get("a"), (200, "page"))
+
+
+class TestCrawlerDeduplication(unittest.IsolatedAsyncioTestCase):
+    async def fetch_twice(self, config):
+        crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories",
+                                 "proxies": ["proxy1:8080", "proxy2:8080"], **config})
+
+        async def fetch_page(url, params=None, proxy=None, timeout=None):
+            await asyncio.sleep(0.01)
+            return 200, url
+
+        with patch.object(crawler, 'fetch_page', side_effect=fetch_page) as fetch, \
+                patch.object(crawler.proxy_manager, 'acquire', wraps=crawler.proxy_manager.acquire) as acquire:
+            responses = await asyncio.gather(crawler.fetch_with_proxy("/owner/repo"),
+                                             crawler.fetch_with_proxy("/owner/repo/"))
+            responses.append(await crawler.fetch_with_proxy(crawler.GITHUB_BASE_URL + "/owner/repo"))
+        self.assertEqual(acquire.call_count, fetch.call_count)
+        return crawler, responses, fetch.call_count
+
+    async def test_duplicates_never_reach_the_network(self):
+        crawler, responses, calls = await self.fetch_twice({})
+        self.assertEqual(responses, [(200, "/owner/repo")] * 3)
+        self.assertEqual(calls, 1)
+        self.assertEqual(crawler.metrics.deduplicated.get(reason="coalesced"), 1)
+        self.assertEqual(crawler.metrics.deduplicated.get(reason="recent"), 1)
+
+    async def test_disabled(self):
+        _, _, calls = await self.fetch_twice({"dedupe_requests": False})
+        self.assertEqual(calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from benchmarks.mock_github import MockGitHubServer
+from distributed import Coordinator, DistributedWorker, export_with_workers, worker_config
+from misc.work_queue import SqliteWorkQueue
+
+
+class TestDistributedCrawl(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue.sqlite")
+        self.server = MockGitHubServer(repositories=25, per_page=10)
+        await self.server.start()
+        self.data = {"base_url": self.server.url, "concurrency": 3, "poll_interval": 0.01,
+                     "worker_idle_timeout": 0.1}
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.tmp.cleanup()
+
+    async def crawl(self, queries, workers):
+        coordinator_queue = SqliteWorkQueue(self.path)
+        coordinator = Coordinator(coordinator_queue, queries, poll_interval=0.01)
+        coordinator.seed()
+        queues = [SqliteWorkQueue(self.path) for _ in workers]
+        try:
+            jobs_done = await asyncio.gather(*(worker(queue).work() for worker, queue in zip(workers, queues)))
+            results = [result async for result in coordinator.stream()]
+        finally:
+            for queue in [coordinator_queue, *queues]:
+                queue.close()
+        return results, jobs_done
+
+    async def test_workers_share_the_jobs(self):
+        queries = [{"keywords": ["python"], "type": "repositories"}, {"id": "go", "keywords": ["go"], "type": "issues"}]
+        workers = [lambda queue, i=i: DistributedWorker(self.data, queue, f"worker{i}") for i in range(2)]
+        results, jobs_done = await self.crawl(queries, workers)
+
+        self.assertEqual(len(results), 50)
+        self.assertEqual({result["query"] for result in results}, {"python", "go"})
+        self.assertEqual(sum(1 for result in results if "extra" in result), 25)
+        self.assertEqual(sum(jobs_done), 3 + 3 + 50)
+        self.assertTrue(all(done > 0 for done in jobs_done))
+        self.assertEqual(self.server.stats["search"], 6)
+        self.assertEqual(self.server.stats["repo"], 25)
+
+    async def test_failed_job_is_retried_by_another_worker(self):
+        class FlakyWorker(DistributedWorker):
+            async def run_hit_job(self, payload):
+                raise RuntimeError("proxy banned")
+
+        queries = [{"keywords": ["python"], "type": "repositories"}]
+        workers = [lambda queue: FlakyWorker(self.data, queue, "flaky"),
+                   lambda queue: DistributedWorker(self.data, queue, "healthy")]
+        results, _ = await self.crawl(queries, workers)
+        self.assertEqual(len(results), 25)
+
+    async def test_coordinator_waits_for_unfinished_jobs(self):
+        queue = SqliteWorkQueue(self.path)
+        coordinator = Coordinator(queue, [{"keywords": ["python"], "type": "issues"}], poll_interval=0.01)
+        collected = asyncio.create_task(self.collect(coordinator))
+        await asyncio.sleep(0.05)
+        self.assertFalse(collected.done())
+
+        worker_queue = SqliteWorkQueue(self.path)
+        await DistributedWorker(self.data, worker_queue, "late").work()
+        self.assertEqual(len(await collected), 25)
+        worker_queue.close()
+        queue.close()
+
+    @staticmethod
+    async def collect(coordinator):
+        return [result async for result in coordinator.stream()]
+
+    async def test_export_with_worker_processes(self):
+        class ListSink:
+            def __init__(self):
+                self.results = []
+
+            def write(self, result):
+                self.results.append(result)
+
+        sink = ListSink()
+        queries = [{"keywords": ["python"], "type": "repositories"}, {"keywords": ["go"], "type": "repositories"}]
+        count = await export_with_workers({**self.data, "worker_idle_timeout": 0.2}, queries, 2, sink)
+        self.assertEqual(count, 50)
+        self.assertEqual(len({(result["query"], result["url"]) for result in sink.results}), 50)
+        # Both queries find the same repositories: a worker fetches each of them at most once
+        self.assertGreaterEqual(self.server.stats["repo"], 25)
+        self.assertLessEqual(self.server.stats["repo"], 50)
+
+
+class TestWorkerConfig(unittest.TestCase):
+    def test_proxies_are_split(self):
+        config = {"proxies": ["p1", "p2", "p3", "p4", "p5"], "metrics_port": 9100, "metrics_file": "metrics.json"}
+        configs = [worker_config(config, i, 2) for i in range(2)]
+        self.assertEqual([c["proxies"] for c in configs], [["p1", "p3", "p5"], ["p2", "p4"]])
+        self.assertEqual([c["metrics_port"] for c in configs], [9100, 9101])
+        self.assertEqual([c["metrics_file"] for c in configs], ["metrics.0.json", "metrics.1.json"])
+        self.assertEqual(config["proxies"], ["p1", "p2", "p3", "p4", "p5"])
+
+    def test_fewer_proxies_than_workers(self):
+        self.assertEqual([worker_config({"proxies": ["p1", "p2"]}, i, 3)["proxies"] for i in range(3)],
+                         [["p1"], ["p2"], ["p1"]])
+        self.assertNotIn("proxies", worker_config({}, 0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from parsers.engines import LxmlParser, SelectolaxParser, TemplateParser, get_parser, lxml_html, SelectolaxHTMLParser
+from parsers.github import GitHubParser, SearchPage
+
+SEARCH_HTML = """
+<div data-testid="results-list">
+    <div class="search-title">
+        <a href="/login?return_to=%2Frepo1">Sign in</a>
+        <a href="/repo1">Repository 1</a>
+    </div>
+    <div class="f4 search-title">
+        <a href="/repo2">Repository 2</a>
+    </div>
+    <div class="search-title"></div>
+</div>
+<nav aria-label="Pagination">
+    <em class="current">1</em>
+    <a href="/search?p=2">2</a>
+    <span class="gap">…</span>
+    <a href="/search?p=7">7</a>
+    <a rel="next" href="/search?p=2">Next</a>
+</nav>
+"""
+
+REPO_HTML = """
+<span class="author flex-self-stretch"> Owner </span>
+<span class="Progress-item color-bg" aria-label="Python 50%">Python 50%</span>
+<span class="Progress-item" aria-label="JavaScript 30%">JavaScript 30%</span>
+<span class="Progress-item"></span>
+"""
+
+
+class EngineParityMixin:
+    parser = None
+
+    def test_parse_search_page(self):
+        expected = SearchPage([{"url": "/repo1"}, {"url": "/repo2"}], "/search?p=2", 7)
+        self.assertEqual(self.parser.parse_search_page(SEARCH_HTML, "repositories"), expected)
+        self.assertEqual(self.parser.parse_search_page(SEARCH_HTML, "repositories"),
+                         GitHubParser.parse_search_page(SEARCH_HTML, "repositories"))
+
+    def test_parse_search_page_unknown_type(self):
+        self.assertEqual(self.parser.parse_search_page(SEARCH_HTML, "users").results, [])
+
+    def test_parse_search_page_empty(self):
+        self.assertEqual(self.parser.parse_search_page("", "repositories"), SearchPage([], None, None))
+
+    def test_compatibility_methods(self):
+        self.assertEqual(self.parser.parse_search_results(SEARCH_HTML, "repositories"),
+                         GitHubParser.parse_search_results(SEARCH_HTML, "repositories"))
+        self.assertEqual(self.parser.parse_pagination(SEARCH_HTML), "/search?p=2")
+        self.assertEqual(self.parser.parse_page_count(SEARCH_HTML), 7)
+
+    def test_parse_repo_info(self):
+        self.assertEqual(self.parser.parse_repo_info(REPO_HTML), GitHubParser.parse_repo_info(REPO_HTML))
+
+    def test_parse_repo_info_without_owner(self):
+        with self.assertRaises(ValueError):
+            self.parser.parse_repo_info("<div>Not a repository</div>")
+
+
+@unittest.skipUnless(lxml_html, "lxml is not installed")
+class TestLxmlParser(EngineParityMixin, unittest.TestCase):
+    parser = LxmlParser
+
+
+@unittest.skipUnless(SelectolaxHTMLParser, "selectolax is not installed")
+class TestSelectolaxParser(EngineParityMixin, unittest.TestCase):
+    parser = SelectolaxParser
+
+
+class TestTemplateParser(EngineParityMixin, unittest.TestCase):
+    parser = TemplateParser
+
+
+class TestGetParser(unittest.TestCase):
+    def test_bs4(self):
+        self.assertIs(get_parser("bs4"), GitHubParser)
+
+    def test_auto_picks_an_engine(self):
+        self.assertIs(get_parser("auto"), TemplateParser)
+        self.assertIn(TemplateParser.dom.name, ["selectolax", "lxml", "bs4"])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            get_parser("regex")
+
+
+if __name__ == '__main__':
+    unittest.main()
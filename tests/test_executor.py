@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from crawler import GitHubCrawler
+from parsers.executor import ParseExecutor
+from parsers.github import GitHubParser
+
+REPO_HTML = """
+<span class="author">Owner</span>
+<span class="Progress-item" aria-label="Python 50%">Python 50%</span>
+"""
+EXPECTED_INFO = {"owner": "Owner", "language_stats": {"Python": 50.0}}
+
+
+class TestParseExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_inline(self):
+        executor = ParseExecutor()
+        self.assertEqual(await executor.run(GitHubParser.parse_repo_info, REPO_HTML), EXPECTED_INFO)
+        self.assertIsNone(executor.pool)
+
+    async def test_thread_pool(self):
+        executor = ParseExecutor(workers=2, kind="thread")
+        try:
+            self.assertEqual(await executor.run(GitHubParser.parse_repo_info, REPO_HTML), EXPECTED_INFO)
+            self.assertIsNotNone(executor.pool)
+        finally:
+            executor.shutdown()
+        self.assertIsNone(executor.pool)
+
+    async def test_process_pool(self):
+        executor = ParseExecutor(workers=1, kind="process")
+        try:
+            search_page = await executor.run(GitHubParser.parse_search_page,
+                                             '<div data-testid="results-list"><div class="search-title">'
+                                             '<a href="/repo1">1</a></div></div>', "repositories")
+            self.assertEqual(search_page.results, [{"url": "/repo1"}])
+        finally:
+            executor.shutdown()
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            ParseExecutor(workers=1, kind="fiber")
+
+
+class TestCrawlerParseOffload(unittest.IsolatedAsyncioTestCase):
+    async def test_run_with_process_pool(self):
+        crawler = GitHubCrawler({"keywords": ["python"], "type": "repositories", "parser": "bs4",
+                                 "parse_workers": 2, "parse_executor": "process"})
+        search_html = ('<div data-testid="results-list">' + ''.join(
+            f'<div class="search-title"><a href="/owner/repo{i}">{i}</a></div>' for i in range(4)) + '</div>')
+
+        class Response:
+            status = 200
+            content = SimpleNamespace(total_bytes=len(REPO_HTML.encode()))
+
+            async def text(self):
+                return REPO_HTML
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                return False
+
+        with patch.object(crawler, 'fetch_search_page', return_value=search_html), \
+                patch('aiohttp.ClientSession.get', return_value=Response()):
+            results = await crawler.run()
+
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result["extra"] == EXPECTED_INFO for result in results))
+        self.assertIsNone(crawler.parse_executor.pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
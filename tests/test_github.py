@@ -1,5 +1,5 @@
 import unittest
-from parsers.github import GitHubParser
+from parsers.github import GitHubParser, SearchPage
 
 class TestGitHubParser(unittest.TestCase):
     def test_parse_search_results(self):
@@ -17,6 +17,22 @@ class TestGitHubParser(unittest.TestCase):
         expected_results = [{"url": "/repo1"}, {"url": "/repo2"}]
         self.assertEqual(search_results, expected_results)
 
+    def test_parse_search_page(self):
+        html = """
+        <div data-testid="results-list">
+            <div class="search-title">
+                <a href="/repo1">Repository 1</a>
+            </div>
+        </div>
+        <nav aria-label="Pagination">
+            <em class="current">1</em>
+            <a href="/search?p=2">2</a>
+            <a rel="next" href="/search?p=2">Next</a>
+        </nav>
+        """
+        search_page = GitHubParser.parse_search_page(html, 'repositories')
+        self.assertEqual(search_page, SearchPage([{"url": "/repo1"}], "/search?p=2", 2))
+
     def test_parse_pagination(self):
         html = """
         <nav aria-label="Pagination">
@@ -36,6 +52,25 @@ class TestGitHubParser(unittest.TestCase):
         next_page_url = GitHubParser.parse_pagination(html)
         self.assertIsNone(next_page_url)
 
+    def test_parse_page_count(self):
+        html = """
+        <nav aria-label="Pagination">
+            <em class="current">1</em>
+            <a href="/search?p=2">2</a>
+            <span class="gap">…</span>
+            <a href="/search?p=100">100</a>
+            <a rel="next" href="/search?p=2">Next</a>
+        </nav>
+        """
+        self.assertEqual(GitHubParser.parse_page_count(html), 100)
+
+    def test_parse_page_count_total_pages_attribute(self):
+        html = '<nav aria-label="Pagination"><em class="current" data-total-pages="42">1</em></nav>'
+        self.assertEqual(GitHubParser.parse_page_count(html), 42)
+
+    def test_parse_page_count_no_pagination(self):
+        self.assertIsNone(GitHubParser.parse_page_count('<div>No pagination</div>'))
+
     def test_parse_repo_info(self):
         html = """
         <span class="author">Owner</span>
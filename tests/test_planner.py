@@ -0,0 +1,162 @@
+import datetime
+import unittest
+from unittest.mock import patch
+from benchmarks.mock_github import MockGitHubServer
+from crawler import GitHubCrawler
+from planner import (CreatedDimension, LanguageDimension, PartitionedCrawler, QueryPlanner, StarsDimension,
+                     get_dimensions)
+
+
+class TestDimensions(unittest.TestCase):
+    def test_created_halves_until_one_day(self):
+        dimension = CreatedDimension(datetime.date(2020, 1, 1), datetime.date(2020, 1, 4))
+        first, second = dimension.split(dimension.root)
+        self.assertEqual(first, (datetime.date(2020, 1, 1), datetime.date(2020, 1, 2)))
+        self.assertEqual(second, (datetime.date(2020, 1, 3), datetime.date(2020, 1, 4)))
+        self.assertIsNone(dimension.split((datetime.date(2020, 1, 3), datetime.date(2020, 1, 3))))
+        self.assertEqual(dimension.qualifiers(dimension.root), [])
+        self.assertEqual(dimension.qualifiers(second), ["created:2020-01-03..2020-01-04"])
+
+    def test_stars_split_off_popular_repositories(self):
+        dimension = StarsDimension(max_stars=10)
+        self.assertEqual(dimension.split(dimension.root), [(0, 10), (11, None)])
+        self.assertEqual(dimension.split((0, 10)), [(0, 5), (6, 10)])
+        self.assertIsNone(dimension.split((11, None)))
+        self.assertIsNone(dimension.split((4, 4)))
+        self.assertEqual(dimension.qualifiers((11, None)), ["stars:>=11"])
+        self.assertEqual(dimension.qualifiers((0, 5)), ["stars:0..5"])
+
+    def test_language_slices_cover_the_other_languages(self):
+        dimension = LanguageDimension(["Go", "C"])
+        parts = dimension.split(dimension.root)
+        self.assertEqual([dimension.qualifiers(part) for part in parts],
+                         [["language:Go"], ["language:C"], ["-language:Go", "-language:C"]])
+        self.assertIsNone(dimension.split(parts[0]))
+
+    def test_unknown_dimension(self):
+        with self.assertRaises(ValueError):
+            get_dimensions({"partition_by": ["forks"]})
+
+
+class TestQueryPlanner(unittest.TestCase):
+    def test_splits_along_the_next_dimension(self):
+        created = CreatedDimension(datetime.date(2020, 1, 1), datetime.date(2020, 1, 1))
+        planner = QueryPlanner(None, [created, LanguageDimension(["Go"])])
+        parts = planner.split((created.root, (None, None)))
+        self.assertEqual([planner.slice_query({"keywords": ["python"]}, part)["keywords"] for part in parts],
+                         [["python", "language:Go"], ["python", "-language:Go"]])
+        self.assertIsNone(planner.split(parts[0]))
+
+
+class TestPartitionedCrawler(unittest.IsolatedAsyncioTestCase):
+    CONFIG = {"keywords": ["python"], "type": "repositories", "max_search_pages": 5,
+              "partition_created_since": "2015-01-01"}
+
+    async def test_plain_crawl_is_truncated(self):
+        async with MockGitHubServer(repositories=120, result_cap=50) as server:
+            results = await GitHubCrawler({**self.CONFIG, "base_url": server.url}).run()
+        self.assertEqual(len(results), 50)
+
+    async def test_slices_cover_all_results(self):
+        for partition_by in (["created"], ["stars"], ["language", "created"]):
+            async with MockGitHubServer(repositories=120, result_cap=50) as server:
+                config = {**self.CONFIG, "base_url": server.url, "partition_by": partition_by,
+                          "partition_max_stars": 999, "partition_languages": ["Python", "Go"]}
+                crawler = PartitionedCrawler(config, [{"keywords": ["python"], "type": "repositories"}])
+                results = await crawler.run()
+            urls = {result["url"] for result in results}
+            self.assertEqual(len(results), 120, partition_by)
+            self.assertEqual(urls, {f"{server.url}/owner{i}/repo{i}" for i in range(120)})
+            self.assertEqual({result["query"] for result in results}, {"python"})
+            self.assertEqual(server.stats["repo"], 120)
+
+    async def test_first_pages_are_fetched_once(self):
+        async with MockGitHubServer(repositories=120, result_cap=50) as server:
+            crawler = PartitionedCrawler({**self.CONFIG, "base_url": server.url}, [{"keywords": ["python"]}])
+            fetched = []
+            fetch_search_page = crawler.fetch_search_page
+
+            async def count_fetches(search_url, params):
+                fetched.append((params["q"], params.get("p", 1)))
+                return await fetch_search_page(search_url, params)
+
+            with patch.object(crawler, "fetch_search_page", side_effect=count_fetches):
+                results = await crawler.run()
+        self.assertEqual(len(results), 120)
+        self.assertEqual(len(fetched), len(set(fetched)))
+        self.assertEqual(crawler.planner.first_pages, {})
+
+    async def test_failed_probe_is_split(self):
+        async with MockGitHubServer(repositories=120, result_cap=50) as server:
+            crawler = PartitionedCrawler({**self.CONFIG, "base_url": server.url, "probe_retries": 1},
+                                         [{"keywords": ["python"], "type": "repositories"}])
+            get_search_page = crawler.get_search_page
+            root_probes = 0
+
+            async def fail_root_probe(search_url, params):
+                nonlocal root_probes
+                if params["q"] == "python":
+                    root_probes += 1
+                    return None
+                return await get_search_page(search_url, params)
+
+            with patch.object(crawler, "get_search_page", side_effect=fail_root_probe), \
+                    self.assertLogs("planner", "WARNING") as logs:
+                slices = [query async for query in crawler.planner.plan(crawler.queries[0])]
+            await crawler.close()
+        self.assertEqual(root_probes, 2)
+        self.assertGreater(len(slices), 1)
+        self.assertTrue(any("could not be probed, splitting it" in line for line in logs.output))
+
+    async def test_failing_probes_stop_splitting(self):
+        crawler = PartitionedCrawler({**self.CONFIG, "probe_retries": 0, "max_probe_failures": 6},
+                                     [{"keywords": ["python"], "type": "repositories"}])
+        probes = 0
+
+        async def fail(search_url, params):
+            nonlocal probes
+            probes += 1
+            return None
+
+        with patch.object(crawler, "get_search_page", side_effect=fail), \
+                self.assertLogs("planner", "WARNING") as logs:
+            slices = [query async for query in crawler.planner.plan(crawler.queries[0])]
+        await crawler.close()
+        # Six failed probes are split into twelve slices, the seven that fail after them are crawled as is
+        self.assertEqual(probes, 13)
+        self.assertEqual(len(slices), 7)
+        self.assertTrue(any("could not be probed, crawling it as is" in line for line in logs.output))
+
+    async def test_probes_are_bounded(self):
+        async with MockGitHubServer(repositories=400, result_cap=50, latency=0.01) as server:
+            crawler = PartitionedCrawler({**self.CONFIG, "base_url": server.url, "probe_concurrency": 2},
+                                         [{"keywords": ["python"], "type": "repositories"}])
+            get_search_page = crawler.get_search_page
+            in_flight = peak = 0
+
+            async def track_probes(search_url, params):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    return await get_search_page(search_url, params)
+                finally:
+                    in_flight -= 1
+
+            with patch.object(crawler, "get_search_page", side_effect=track_probes):
+                slices = [query async for query in crawler.planner.plan(crawler.queries[0])]
+            await crawler.close()
+        self.assertGreater(len(slices), 4)
+        self.assertEqual(peak, 2)
+
+    async def test_query_under_the_cap_is_not_split(self):
+        async with MockGitHubServer(repositories=30, result_cap=50) as server:
+            crawler = PartitionedCrawler({**self.CONFIG, "base_url": server.url},
+                                         [{"id": "py", "keywords": ["python"], "type": "repositories"}])
+            slices = [query async for query in crawler.planner.plan(crawler.queries[0])]
+            await crawler.close()
+        self.assertEqual(slices, [{"id": "py", "keywords": ["python"], "type": "repositories"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
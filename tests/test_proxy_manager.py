@@ -1,6 +1,9 @@
+import asyncio
+import time
 import unittest
 from unittest.mock import patch
-from misc.utils import ProxyManager
+from email.utils import formatdate
+from misc.utils import ProxyManager, RateLimiter, parse_retry_after
 
 class TestProxyManager(unittest.TestCase):
     def setUp(self):
@@ -11,11 +14,9 @@ class TestProxyManager(unittest.TestCase):
         self.assertEqual(len(self.proxy_manager.proxies), 3)
         self.assertEqual(self.proxy_manager.max_usage, 2)
         self.assertEqual(len(self.proxy_manager.usage_count), 3)
-        self.assertEqual(next(self.proxy_manager.proxy_pool), "proxy1:8080")
+        self.assertEqual(list(self.proxy_manager.stats), ["http://proxy1:8080", "http://proxy2:8080", "http://proxy3:8080"])
 
-    @patch('misc.utils.itertools.cycle')
-    def test_get_next_proxy(self, mock_cycle):
-        mock_cycle.return_value = iter(self.proxies)
+    def test_get_next_proxy(self):
         # Test if proxies are cycled properly
         self.assertEqual(self.proxy_manager.get_next_proxy(), "http://proxy1:8080")
         self.assertEqual(self.proxy_manager.get_next_proxy(), "http://proxy2:8080")
@@ -26,13 +27,158 @@ class TestProxyManager(unittest.TestCase):
         # All proxies exhausted, should return None
         self.assertEqual(self.proxy_manager.get_next_proxy(), None)
 
-    def test_ping_proxy(self):
-        pass
+    def test_no_usage_limit_by_default(self):
+        proxy_manager = ProxyManager(["proxy1:8080"])
+        for _ in range(20):
+            self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy1:8080")
+
+    def test_prefers_fastest_healthy_proxy(self):
+        proxy_manager = ProxyManager(self.proxies)
+        proxy_manager.report_success("http://proxy1:8080", 0.9)
+        proxy_manager.report_success("http://proxy2:8080", 0.1)
+        proxy_manager.report_success("http://proxy3:8080", 0.5)
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy2:8080")
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy2:8080")
+
+    def test_untried_proxies_come_first(self):
+        proxy_manager = ProxyManager(self.proxies)
+        proxy_manager.report_success("http://proxy1:8080", 0.1)
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy2:8080")
+
+    def test_rate_limited_proxy_cools_down(self):
+        proxy_manager = ProxyManager(["proxy1:8080", "proxy2:8080"], cooldown=60)
+        proxy_manager.report_failure("http://proxy1:8080", rate_limited=True)
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy2:8080")
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy2:8080")
+        proxy_manager.stats["http://proxy1:8080"].cooldown_until = 0
+        self.assertEqual(proxy_manager.get_next_proxy(), "http://proxy1:8080")
+
+    def test_failing_proxy_is_marked_dead(self):
+        proxy_manager = ProxyManager(["proxy1:8080"], max_failures=2)
+        proxy_manager.report_failure("http://proxy1:8080")
+        self.assertIsNotNone(proxy_manager.get_next_proxy())
+        proxy_manager.report_failure("http://proxy1:8080")
+        self.assertIsNone(proxy_manager.get_next_proxy())
+
 
     def test_get_next_proxy_prefix(self):
         # Test if returned proxies have correct prefix
         proxy = self.proxy_manager.get_next_proxy()
         self.assertTrue(proxy.startswith("http://") or proxy.startswith("https://"))
 
+class TestProxyManagerAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_waits_for_cooldown(self):
+        proxy_manager = ProxyManager(["proxy1:8080"])
+        proxy_manager.report_failure("http://proxy1:8080", rate_limited=True, retry_after=0.05)
+        start = time.monotonic()
+        self.assertEqual(await proxy_manager.acquire(), "http://proxy1:8080")
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    async def test_acquire_returns_none_when_all_dead(self):
+        proxy_manager = ProxyManager(["proxy1:8080"], max_failures=1)
+        proxy_manager.report_failure("http://proxy1:8080")
+        self.assertIsNone(await proxy_manager.acquire())
+
+    async def test_concurrent_acquire_spreads_over_proxies(self):
+        proxy_manager = ProxyManager(["proxy1:8080", "proxy2:8080"])
+        proxies = await asyncio.gather(*(proxy_manager.acquire() for _ in range(4)))
+        self.assertEqual(sorted(proxies), ["http://proxy1:8080"] * 2 + ["http://proxy2:8080"] * 2)
+
+    async def test_check_health_revives_dead_proxy(self):
+        proxy_manager = ProxyManager(["proxy1:8080", "proxy2:8080"], max_failures=1)
+        proxy_manager.report_failure("http://proxy1:8080")
+
+        async def ping_proxy(proxy):
+            return proxy == "http://proxy1:8080", 0.2
+
+        with patch.object(proxy_manager, 'ping_proxy', side_effect=ping_proxy):
+            await proxy_manager.check_health()
+
+        self.assertFalse(proxy_manager.stats["http://proxy1:8080"].dead)
+        self.assertEqual(proxy_manager.stats["http://proxy1:8080"].latency, 0.2)
+        self.assertTrue(proxy_manager.stats["http://proxy2:8080"].dead)
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_spaces_requests_per_host(self):
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire("github.com")
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+
+    async def test_hosts_are_independent(self):
+        limiter = RateLimiter(rate=1)
+        start = time.monotonic()
+        await limiter.acquire("github.com")
+        await limiter.acquire("api.github.com")
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    async def test_no_rate_means_no_limit(self):
+        limiter = RateLimiter()
+        await limiter.acquire("github.com")
+        self.assertEqual(limiter.next_slot, {})
+
+    async def test_retry_after_blocks_key(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.report_rate_limited(("proxy1", "search"), retry_after=0.05), 0.05)
+        start = time.monotonic()
+        await limiter.acquire(("proxy1", "repo"))
+        self.assertLess(time.monotonic() - start, 0.03)
+        await limiter.acquire(("proxy1", "search"))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_jittered_exponential_backoff(self):
+        limiter = RateLimiter(backoff=1.0, max_backoff=8.0)
+        delays = []
+        for _ in range(6):
+            delays.append(limiter.report_rate_limited("search"))
+            # The backoff is over before the next 429
+            limiter.blocked_until.clear()
+        for attempt, delay in enumerate(delays):
+            expected = min(8.0, 2 ** attempt)
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+        limiter.report_success("search")
+        self.assertLessEqual(limiter.report_rate_limited("search"), 1.0)
+
+    def test_adaptive_rate_follows_aimd(self):
+        limiter = RateLimiter(rate=4, adaptive=True, min_rate=1, max_rate=5, increase=0.5)
+        limiter.report_success("search")
+        self.assertEqual(limiter.current_rate("search"), 4.5)
+        limiter.report_success("search")
+        limiter.report_success("search")
+        self.assertEqual(limiter.current_rate("search"), 5)
+        limiter.report_rate_limited("search", retry_after=0)
+        self.assertEqual(limiter.current_rate("search"), 2.5)
+        limiter.report_rate_limited("search", retry_after=0)
+        limiter.report_rate_limited("search", retry_after=0)
+        self.assertEqual(limiter.current_rate("search"), 1)
+        self.assertEqual(limiter.current_rate("repo"), 4)
+
+    def test_in_flight_429s_back_off_once(self):
+        limiter = RateLimiter(rate=4, adaptive=True, min_rate=0.1)
+        first = limiter.report_rate_limited("search")
+        for _ in range(5):
+            self.assertLessEqual(limiter.report_rate_limited("search"), first)
+        self.assertEqual(limiter.current_rate("search"), 2)
+        self.assertEqual(limiter.backoffs["search"], 1)
+
+    def test_retry_after_is_capped(self):
+        limiter = RateLimiter(max_retry_after=30)
+        self.assertEqual(limiter.report_rate_limited("search", retry_after=86400), 30)
+        self.assertLessEqual(limiter.blocked_until["search"] - time.monotonic(), 30)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+
+    def test_http_date(self):
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
 if __name__ == '__main__':
     unittest.main()
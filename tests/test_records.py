@@ -0,0 +1,119 @@
+import random
+import sys
+import tracemalloc
+import unittest
+from benchmarks.mock_github import MockGitHubServer
+from crawler import GitHubCrawler
+from misc.records import ResultRecord, ResultTable, intern_language_stats, pyarrow
+from misc.sinks import ParquetSink
+from parsers.github import parse_language_label
+
+RESULTS = [
+    {"url": "/a/one", "query": "python", "extra": {"owner": "a", "language_stats": {"Python": 90.5, "Shell": 9.5}}},
+    {"url": "/b/two/issues/1", "query": "python"},
+    {"url": "/c/three", "extra": {"owner": "c", "language_stats": {}}, "change": "new"},
+    {"url": "/d/four", "extra": {"owner": "d", "language_stats": {"Shell": 100.0}}},
+]
+
+
+class TestInterning(unittest.TestCase):
+    def test_language_labels_are_interned(self):
+        first, _ = parse_language_label("".join(["Pyth", "on 50%"]))
+        second, _ = parse_language_label("".join(["Py", "thon 40%"]))
+        self.assertIs(first, second)
+
+    def test_language_stats_are_interned(self):
+        stats = intern_language_stats({"".join(["G", "o"]): 100.0})
+        self.assertIs(next(iter(stats)), sys.intern("Go"))
+
+
+class TestResultRecord(unittest.TestCase):
+    def test_round_trip(self):
+        for result in RESULTS:
+            record = ResultRecord.from_dict(result)
+            self.assertEqual(record.to_dict(), result)
+            self.assertEqual(record, result)
+
+    def test_reads_like_a_dict(self):
+        record = ResultRecord.from_dict(RESULTS[0])
+        self.assertEqual(record["url"], "/a/one")
+        self.assertEqual(record["extra"]["language_stats"], {"Python": 90.5, "Shell": 9.5})
+        self.assertNotIn("change", record)
+        self.assertIsNone(record.get("change"))
+        self.assertIsNone(ResultRecord.from_dict(RESULTS[1]).get("extra"))
+        with self.assertRaises(KeyError):
+            record["change"]
+
+    def test_has_no_dict(self):
+        self.assertFalse(hasattr(ResultRecord("/a"), "__dict__"))
+
+
+class TestResultTable(unittest.TestCase):
+    def setUp(self):
+        self.table = ResultTable()
+        for result in RESULTS:
+            self.table.append(result)
+
+    def test_gives_back_the_results(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual([record.to_dict() for record in self.table], RESULTS)
+        self.assertEqual(self.table[-1], RESULTS[-1])
+        with self.assertRaises(IndexError):
+            self.table[4]
+
+    def test_languages_are_stored_once(self):
+        self.assertEqual(self.table.languages, ["Python", "Shell"])
+        self.assertEqual(list(self.table.language_ids), [0, 1, 1])
+
+    def test_language_summary(self):
+        self.assertEqual(self.table.language_summary(), {"Shell": (2, 54.75), "Python": (1, 90.5)})
+
+    def test_appends_records(self):
+        table = ResultTable()
+        for record in self.table:
+            table.append(record)
+        self.assertEqual(list(table), list(self.table))
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_to_arrow(self):
+        rows = self.table.to_arrow(ParquetSink.SCHEMA).to_pylist()
+        self.assertEqual(rows[0], {"url": "/a/one", "query": "python", "owner": "a",
+                                   "language_stats": [("Python", 90.5), ("Shell", 9.5)], "change": None})
+        self.assertEqual(rows[2]["change"], "new")
+        self.assertIsNone(rows[1]["language_stats"])
+        self.assertEqual(rows[2]["language_stats"], [])
+        self.assertEqual(rows[3]["language_stats"], [("Shell", 100.0)])
+
+    def test_smaller_than_dicts(self):
+        languages = ["Python", "Go", "C", "Shell", "JavaScript", "Rust"]
+        results = [{"url": f"/owner{i}/repo{i}", "query": "python",
+                    "extra": {"owner": f"owner{i}",
+                              "language_stats": {"".join(language): random.random() * 100
+                                                 for language in random.sample(languages, 4)}}}
+                   for i in range(2000)]
+
+        def allocated(container):
+            tracemalloc.start()
+            for result in results:
+                container.append({**result, "extra": {**result["extra"],
+                                                      "language_stats": dict(result["extra"]["language_stats"])}})
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return size
+
+        self.assertLess(allocated(ResultTable()) * 3, allocated([]))
+
+
+class TestCrawlIntoTable(unittest.IsolatedAsyncioTestCase):
+    async def test_run_collects_into_table(self):
+        async with MockGitHubServer(repositories=5) as server:
+            config = {"base_url": server.url, "keywords": ["python"], "type": "repositories"}
+            table = await GitHubCrawler(config).run(ResultTable())
+            results = await GitHubCrawler(config).run()
+        self.assertIsInstance(table, ResultTable)
+        key = lambda result: result["url"]
+        self.assertEqual(sorted((record.to_dict() for record in table), key=key), sorted(results, key=key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from benchmarks.mock_github import MockGitHubServer
+from crawler import GitHubCrawler
+from misc.repo_index import RepoIndex
+
+
+class TestRepoIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index.sqlite")
+        self.index = RepoIndex(self.path, ttl=60)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_record_reports_changes(self):
+        info = {"owner": "a", "language_stats": {"Python": 90.0, "C": 10.0}}
+        self.assertEqual(self.index.record("/a/one", info), "new")
+        self.assertEqual(self.index.record("/a/one", {"language_stats": {"C": 10.0, "Python": 90.0}, "owner": "a"}),
+                         "unchanged")
+        self.assertEqual(self.index.record("/a/one", {"owner": "a", "language_stats": {"Python": 100.0}}), "changed")
+        self.assertEqual(self.index.get("/a/one")["repo_info"], {"owner": "a", "language_stats": {"Python": 100.0}})
+
+    def test_freshness(self):
+        self.assertIsNone(self.index.get("/a/one"))
+        self.index.record("/a/one", {"owner": "a", "language_stats": {}})
+        entry = self.index.get("/a/one")
+        self.assertTrue(self.index.is_fresh(entry))
+        with patch("misc.repo_index.time.time", return_value=time.time() + 61):
+            self.assertFalse(self.index.is_fresh(entry))
+
+    def test_touch_updates_last_seen_only(self):
+        self.index.record("/a/one", {"owner": "a", "language_stats": {}})
+        before = self.index.get("/a/one")
+        with patch("misc.repo_index.time.time", return_value=before["last_seen"] + 10):
+            self.index.touch("/a/one")
+        after = self.index.get("/a/one")
+        self.assertEqual(after["last_seen"], before["last_seen"] + 10)
+        self.assertEqual(after["fetched_at"], before["fetched_at"])
+
+    def test_persists_across_instances(self):
+        self.index.record("/a/one", {"owner": "a", "language_stats": {"Go": 100.0}})
+        other = RepoIndex(self.path)
+        self.assertEqual(other.get("/a/one")["repo_info"]["language_stats"], {"Go": 100.0})
+        other.close()
+
+
+class TestIncrementalCrawl(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = MockGitHubServer(repositories=12, per_page=10)
+        await self.server.start()
+        self.data = {"base_url": self.server.url, "keywords": ["python"], "type": "repositories",
+                     "repo_index": os.path.join(self.tmp.name, "index.sqlite"), "incremental": True}
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.tmp.cleanup()
+
+    async def test_second_run_skips_indexed_repositories(self):
+        crawler = GitHubCrawler(self.data)
+        first = await crawler.run()
+        self.assertIsNone(crawler.repo_index._connection)
+        self.assertEqual(len(first), 12)
+        self.assertEqual({result["change"] for result in first}, {"new"})
+
+        second = await crawler.run()
+        self.assertEqual(second, [])
+        self.assertEqual(self.server.stats["repo"], 12)
+
+    async def test_stale_repositories_are_refetched_and_diffed(self):
+        await GitHubCrawler(self.data).run()
+        crawler = GitHubCrawler({**self.data, "repo_index_ttl": 0})
+        crawler.repo_index.record("/owner3/repo3", {"owner": "someone-else", "language_stats": {}})
+        results = await crawler.run()
+        self.assertEqual([(result["url"], result["change"]) for result in results],
+                         [(self.server.url + "/owner3/repo3", "changed")])
+        self.assertEqual(self.server.stats["repo"], 24)
+
+    async def test_full_output_without_incremental(self):
+        await GitHubCrawler(self.data).run()
+        results = await GitHubCrawler({**self.data, "incremental": False}).run()
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all("change" not in result for result in results))
+        self.assertEqual(self.server.stats["repo"], 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
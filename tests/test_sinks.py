@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from crawler import GitHubCrawler
+from misc.sinks import JsonlSink, ParquetSink, get_sink, pyarrow
+
+RESULTS = [
+    {"url": "https://github.com/a/one", "query": "python",
+     "extra": {"owner": "a", "language_stats": {"Python": 90.0, "Shell": 10.0}}, "change": "changed"},
+    {"url": "https://github.com/b/two"},
+]
+
+
+class TestJsonlSink(unittest.TestCase):
+    def test_writes_one_line_per_result(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.jsonl")
+            with JsonlSink(path) as sink:
+                for result in RESULTS:
+                    sink.write(result)
+            with open(path) as f:
+                self.assertEqual([json.loads(line) for line in f], RESULTS)
+            self.assertEqual(sink.count, 2)
+
+    def test_stdout(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            with JsonlSink("-") as sink:
+                sink.write(RESULTS[1])
+            self.assertEqual(stdout.getvalue(), json.dumps(RESULTS[1]) + "\n")
+            self.assertFalse(stdout.closed)
+
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestParquetSink(unittest.TestCase):
+    def test_writes_row_groups(self):
+        import pyarrow.parquet
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.parquet")
+            with ParquetSink(path, batch_size=1) as sink:
+                for result in RESULTS:
+                    sink.write(result)
+            parquet_file = pyarrow.parquet.ParquetFile(path)
+            self.assertEqual(parquet_file.num_row_groups, 2)
+            rows = parquet_file.read().to_pylist()
+        self.assertEqual(rows[0]["owner"], "a")
+        self.assertEqual(dict(rows[0]["language_stats"]), {"Python": 90.0, "Shell": 10.0})
+        self.assertIsNone(rows[1]["owner"])
+        self.assertEqual([row["change"] for row in rows], ["changed", None])
+
+
+class TestGetSink(unittest.TestCase):
+    def test_format_from_extension(self):
+        self.assertIsInstance(get_sink("-"), JsonlSink)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            get_sink("results.csv", "csv")
+
+    def test_parquet_to_stdout(self):
+        with self.assertRaises(ValueError):
+            get_sink("-", "parquet")
+
+
+class TestCrawlerExport(unittest.IsolatedAsyncioTestCase):
+    async def test_export_streams_results(self):
+        crawler = GitHubCrawler({"keywords": ["python"], "type": "issues"})
+        html = ('<div data-testid="results-list"><div class="search-title"><a href="/a/one/issues/1">1</a></div>'
+                '<div class="search-title"><a href="/b/two/issues/2">2</a></div></div>')
+        written = []
+
+        class ListSink:
+            def write(self, result):
+                written.append(result)
+
+        with patch.object(crawler, 'fetch_search_page', return_value=html):
+            count = await crawler.export(ListSink())
+
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(result["url"] for result in written),
+                         ["https://github.com/a/one/issues/1", "https://github.com/b/two/issues/2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
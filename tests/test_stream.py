@@ -0,0 +1,124 @@
+import os
+import unittest
+from unittest.mock import patch
+from benchmarks.mock_github import NOISE, MockGitHubServer, make_repo_page
+from crawler import GitHubCrawler
+from parsers.github import GitHubParser
+from parsers.stream import RepoPageScanner
+
+
+class TestRepoPageScanner(unittest.TestCase):
+    def test_stops_after_language_bar(self):
+        html = make_repo_page("octocat", languages=3)
+        scanner = RepoPageScanner()
+        self.assertTrue(scanner.feed(html))
+        prefix = scanner.html()
+        self.assertTrue(prefix.endswith("</span></span>"))
+        self.assertLess(len(prefix), len(html))
+        self.assertEqual(GitHubParser.parse_repo_info(prefix), GitHubParser.parse_repo_info(html))
+
+    def test_sections_split_across_chunks(self):
+        html = make_repo_page("octocat", languages=2)
+        for size in (1, 7, 100, 4096):
+            scanner = RepoPageScanner()
+            for i in range(0, len(html), size):
+                if scanner.feed(html[i:i + size]):
+                    break
+            self.assertTrue(scanner.done, size)
+            self.assertEqual(GitHubParser.parse_repo_info(scanner.html()), GitHubParser.parse_repo_info(html))
+
+    def test_window_drops_scanned_text(self):
+        html = make_repo_page("octocat", languages=2) + NOISE * 20
+        html = html.replace('<span class="Progress', NOISE * 20 + '<span class="Progress')
+        scanner = RepoPageScanner()
+        longest = 0
+        for i in range(0, len(html), 512):
+            done = scanner.feed(html[i:i + 512])
+            longest = max(longest, len(scanner.window))
+            if done:
+                break
+        self.assertTrue(scanner.done)
+        self.assertLess(longest, 4096)
+        self.assertEqual(GitHubParser.parse_repo_info(scanner.html()), GitHubParser.parse_repo_info(html))
+
+    def test_language_bar_before_author(self):
+        html = ('<span class="Progress"><span class="Progress-item" aria-label="Go 100%"></span></span>'
+                '<span class="author"><a href="/a">a</a></span>' + NOISE)
+        scanner = RepoPageScanner()
+        scanner.feed(html)
+        self.assertTrue(scanner.done)
+        self.assertEqual(GitHubParser.parse_repo_info(scanner.html()), {"owner": "a", "language_stats": {"Go": 100.0}})
+
+    def test_progress_item_is_not_the_language_bar(self):
+        scanner = RepoPageScanner()
+        scanner.feed('<span class="author">a</span><span class="Progress-item" aria-label="Go 100%"></span>')
+        self.assertFalse(scanner.done)
+
+    def test_page_without_language_bar_is_kept_whole(self):
+        html = '<span class="author"><a href="/a">a</a></span>' + NOISE
+        scanner = RepoPageScanner()
+        scanner.feed(html)
+        self.assertFalse(scanner.done)
+        self.assertEqual(scanner.html(), html)
+
+
+class TestStreamedRepoPages(unittest.IsolatedAsyncioTestCase):
+    async def crawl(self, server, stream_repo_pages):
+        crawler = GitHubCrawler({"base_url": server.url, "keywords": ["python"], "type": "repositories",
+                                 "stream_repo_pages": stream_repo_pages})
+        results = await crawler.run()
+        return sorted(results, key=lambda result: result["url"]), crawler.metrics.downloaded_bytes.get(page_type="repo")
+
+    async def test_same_results(self):
+        async with MockGitHubServer(repositories=5) as server:
+            full, full_bytes = await self.crawl(server, False)
+            streamed, streamed_bytes = await self.crawl(server, True)
+        self.assertEqual(streamed, full)
+        self.assertEqual(len(streamed), 5)
+        self.assertLessEqual(streamed_bytes, full_bytes)
+
+    async def test_stops_reading_early(self):
+        async with MockGitHubServer(repositories=1) as server:
+            crawler = GitHubCrawler({"base_url": server.url})
+            await crawler.create_session()
+            try:
+                async with crawler.session.get("/owner0/repo0") as response:
+                    html, size = await crawler.read_repo_page(response, chunk_size=1024, drain_limit=0)
+                    self.assertLessEqual(size, response.content_length)
+                    self.assertTrue(response.closed)
+            finally:
+                await crawler.close()
+        self.assertEqual(GitHubParser.parse_repo_info(html)["owner"], "owner0")
+
+    async def test_drains_small_remainder(self):
+        async with MockGitHubServer(repositories=1) as server:
+            crawler = GitHubCrawler({"base_url": server.url})
+            await crawler.create_session()
+            try:
+                async with crawler.session.get("/owner0/repo0") as response:
+                    html, size = await crawler.read_repo_page(response, chunk_size=1024, drain_limit=10 ** 6)
+                    self.assertEqual(size, response.content_length)
+            finally:
+                await crawler.close()
+        self.assertLess(len(html), size)
+
+    async def test_compressed_pages_keep_the_connection(self):
+        # Chunked, gzip-compressed pages have no Content-Length, and a remainder too big to arrive at once
+        page = make_repo_page("owner0") + os.urandom(256 * 1024).hex()
+        async with MockGitHubServer(repositories=1, compress=True) as server:
+            crawler = GitHubCrawler({"base_url": server.url})
+            await crawler.create_session()
+            try:
+                with patch("benchmarks.mock_github.make_repo_page", return_value=page):
+                    for _ in range(2):
+                        async with crawler.session.get("/owner0/repo0") as response:
+                            self.assertIsNone(response.content_length)
+                            html, size = await crawler.read_repo_page(response, drain_limit=10 ** 6)
+                        self.assertEqual(size, len(page))
+                        self.assertEqual(GitHubParser.parse_repo_info(html)["owner"], "owner0")
+            finally:
+                await crawler.close()
+        self.assertEqual(crawler.metrics.connections.get(pool="direct", result="reused"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+from benchmarks.mock_github import make_repo_page, make_search_page
+from parsers.engines import TemplateParser
+from parsers.github import GitHubParser
+from parsers.templates import RepoPageRules, SearchPageRules, Selector
+
+
+class TestSelector(unittest.TestCase):
+    def test_class_selector(self):
+        selector = Selector("div.search-title")
+        html = '<p>search-title</p><div class="f4 search-titles"></div><div id="x" class="f4 search-title">'
+        self.assertEqual([match.start() for match in selector.find(html)], [html.rindex("<div")])
+
+    def test_attribute_capture(self):
+        selector = Selector("a[rel~=next]", capture="href")
+        html = '<a href="/p1">1</a><a class="next" rel="nofollow next" href="/search?p=2&amp;q=x">Next</a>'
+        self.assertEqual(selector.first(html).group(1), "/search?p=2&amp;q=x")
+
+    def test_attribute_value(self):
+        selector = Selector('nav[aria-label="Pagination"]')
+        self.assertIsNone(selector.first('<nav aria-label="Pages">'))
+        self.assertIsNotNone(selector.first('<nav class="x" aria-label="Pagination">'))
+
+    def test_unsupported_selector(self):
+        with self.assertRaises(ValueError):
+            Selector("div > a")
+
+
+class TestTemplateRules(unittest.TestCase):
+    def setUp(self):
+        self.search_page = make_search_page([f"/owner{i}/repo{i}" for i in range(5)], page=2, page_count=9)
+
+    def test_known_layout_skips_the_dom(self):
+        rules = SearchPageRules()
+        dom = TemplateParser.dom.parse_search_page
+        with patch.object(TemplateParser.dom, "parse_search_page", wraps=dom) as dom_parse:
+            first = rules.parse(self.search_page, dom_parse, "repositories")
+            second = rules.parse(self.search_page, dom_parse, "repositories")
+        self.assertEqual(first, second)
+        self.assertEqual(second.page_count, 9)
+        self.assertEqual(dom_parse.call_count, 1)
+
+    def test_known_layout_is_checked_again(self):
+        rules = RepoPageRules(verify_every=2)
+        with patch.object(TemplateParser.dom, "parse_repo_info", wraps=TemplateParser.dom.parse_repo_info) as dom_parse:
+            for _ in range(4):
+                rules.parse(make_repo_page("octocat", languages=2), dom_parse)
+        self.assertEqual(dom_parse.call_count, 2)
+
+    def test_template_drift_falls_back_to_the_dom(self):
+        rules = RepoPageRules()
+        rules.parse(make_repo_page("octocat"), TemplateParser.dom.parse_repo_info)
+        # The owner moves into a nested span the rules do not expect
+        drifted = ('<span class="author" data-hovercard="1"><span>octo</span>cat</span>'
+                   '<span class="Progress-item" aria-label="Go 100%"></span>')
+        with self.assertLogs("parsers.templates", level="WARNING") as logs:
+            info = rules.parse(drifted, TemplateParser.dom.parse_repo_info)
+        self.assertEqual(info, TemplateParser.dom.parse_repo_info(drifted))
+        self.assertIn("Template drift", logs.output[0])
+        self.assertIn("do not match", logs.output[1])
+        self.assertIn(False, rules.layouts.values())
+
+        with patch.object(RepoPageRules, "extract") as extract:
+            self.assertEqual(rules.parse(drifted, TemplateParser.dom.parse_repo_info), info)
+        extract.assert_not_called()
+
+    def test_page_without_owner(self):
+        with self.assertRaises(ValueError):
+            RepoPageRules().parse("<div>Not a repository</div>", TemplateParser.dom.parse_repo_info)
+
+    def test_pages_without_owner_are_parsed_with_the_dom(self):
+        rules = RepoPageRules()
+        rules.parse(make_repo_page("octocat"), TemplateParser.dom.parse_repo_info)
+        with patch.object(TemplateParser.dom, "parse_repo_info", wraps=TemplateParser.dom.parse_repo_info) as dom_parse, \
+                self.assertNoLogs("parsers.templates", level="WARNING"):
+            for reason in ("DMCA takedown", "Repository unavailable", "Access blocked"):
+                with self.assertRaises(ValueError):
+                    rules.parse(f"<div class='blankslate'><h3>{reason}</h3></div>", dom_parse)
+        self.assertEqual(dom_parse.call_count, 3)
+        self.assertEqual(len(rules.layouts), 1)
+
+    def test_error_page_does_not_hide_unreadable_repo_pages(self):
+        rules = RepoPageRules()
+        dom_parse = TemplateParser.dom.parse_repo_info
+        with self.assertRaises(ValueError):
+            rules.parse("<div class='blankslate'><h3>DMCA takedown</h3></div>", dom_parse)
+        single_quoted = make_repo_page("octo").replace('"', "'")
+        self.assertEqual(rules.parse(single_quoted, dom_parse)["owner"], "octo")
+
+    def test_empty_search_page_does_not_hide_unreadable_pages(self):
+        rules = SearchPageRules()
+        dom_parse = TemplateParser.dom.parse_search_page
+        rules.parse("<div class='blankslate'><h3>No results</h3></div>", dom_parse, "repositories")
+        single_quoted = make_search_page(["/a/b"], page=1, page_count=2).replace('"', "'")
+        search_page = rules.parse(single_quoted, dom_parse, "repositories")
+        self.assertEqual(search_page.results, [{"url": "/a/b"}])
+        self.assertEqual(search_page.next_page, "/search?p=2")
+        self.assertEqual(search_page.page_count, 2)
+
+    def test_dom_errors_become_value_errors(self):
+        for dom_parse in (GitHubParser.parse_repo_info, TemplateParser.dom.parse_repo_info):
+            rules = RepoPageRules()
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    rules.parse("<div>Not a repository</div>", dom_parse)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from misc.work_queue import SqliteWorkQueue, ThreadedWorkQueue
+
+
+class TestSqliteWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue.sqlite")
+        self.queue = SqliteWorkQueue(self.path, visibility_timeout=30, max_attempts=2)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_put_deduplicates_by_key(self):
+        self.assertTrue(self.queue.put("search", "search|python|1", {"page": 1}))
+        self.assertFalse(self.queue.put("search", "search|python|1", {"page": 1}))
+        self.assertEqual(self.queue.unfinished(), 1)
+
+    def test_put_many_in_one_transaction(self):
+        self.queue.put("search", "search|python|1", {"page": 1})
+        jobs = [("search", f"search|python|{page}", {"page": page}) for page in range(1, 4)]
+        self.assertEqual(self.queue.put_many(jobs), 2)
+        self.assertEqual(self.queue.put_many([]), 0)
+        self.assertEqual(self.queue.unfinished(), 3)
+
+    def test_jobs_are_leased_once(self):
+        for page in range(3):
+            self.queue.put("search", f"search|python|{page}", {"page": page})
+        other = SqliteWorkQueue(self.path)
+        first = self.queue.lease("a", limit=2)
+        second = other.lease("b", limit=2)
+        other.close()
+        self.assertEqual([job.payload["page"] for job in first], [0, 1])
+        self.assertEqual([job.payload["page"] for job in second], [2])
+        self.assertEqual(self.queue.lease("c"), [])
+
+    def test_expired_lease_is_handed_out_again(self):
+        self.queue.put("hit", "hit|a", {})
+        job, = self.queue.lease("a")
+        with patch("misc.work_queue.time.time", return_value=time.time() + 31):
+            retried, = self.queue.lease("b")
+        self.assertEqual(retried.id, job.id)
+        self.assertEqual(retried.attempts, 1)
+        self.assertFalse(self.queue.complete(job, "a", {"url": "stale"}))
+        self.assertTrue(self.queue.complete(retried, "b", {"url": "fresh"}))
+        self.assertEqual(self.queue.results(), [(1, {"url": "fresh"})])
+
+    def test_expired_leases_are_given_up_after_max_attempts(self):
+        self.queue.put("hit", "hit|a", {})
+        now = time.time()
+        for worker in ("a", "b"):
+            with patch("misc.work_queue.time.time", return_value=now):
+                self.assertEqual(len(self.queue.lease(worker)), 1)
+            now += 31
+        with patch("misc.work_queue.time.time", return_value=now):
+            self.assertEqual(self.queue.lease("c"), [])
+        self.assertEqual(self.queue.unfinished(), 0)
+
+    def test_results_in_completion_order(self):
+        self.queue.put("hit", "hit|a", {})
+        self.queue.put("hit", "hit|b", {})
+        a, b = self.queue.lease("w", limit=2)
+        self.queue.complete(b, "w", {"url": "b"})
+        self.queue.complete(a, "w")
+        self.assertEqual(self.queue.results(), [(1, {"url": "b"}), (2, None)])
+        self.assertEqual(self.queue.results(after=1), [(2, None)])
+        self.assertEqual(self.queue.unfinished(), 0)
+
+    def test_failed_jobs_are_retried_then_given_up(self):
+        self.queue.put("hit", "hit|a", {})
+        job, = self.queue.lease("w")
+        self.queue.fail(job, "w")
+        self.assertEqual(self.queue.lease("w"), [])
+        job, = self.queue.lease("other")
+        self.assertEqual(job.attempts, 1)
+        self.queue.fail(job, "other")
+        self.assertEqual(self.queue.lease("w"), [])
+        self.assertEqual(self.queue.unfinished(), 0)
+
+    def test_failed_job_retried_by_same_worker_after_delay(self):
+        self.queue.put("hit", "hit|a", {})
+        job, = self.queue.lease("w")
+        self.queue.fail(job, "w")
+        with patch("misc.work_queue.time.time", return_value=time.time() + self.queue.retry_delay + 1):
+            self.assertEqual(len(self.queue.lease("w")), 1)
+
+
+class TestThreadedWorkQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_locked_database_does_not_block_the_loop(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "queue.sqlite")
+            queue = SqliteWorkQueue(path)
+            threaded = ThreadedWorkQueue(queue)
+            await threaded.put_many([("hit", "hit|a", {})])
+            # Another process holds the write lock
+            other = sqlite3.connect(path, isolation_level=None)
+            other.execute("BEGIN IMMEDIATE")
+            lease = asyncio.create_task(threaded.lease("w"))
+            # The loop keeps running while the lease waits for the lock
+            await asyncio.sleep(0.05)
+            self.assertFalse(lease.done())
+            other.execute("COMMIT")
+            other.close()
+            self.assertEqual(len(await lease), 1)
+            threaded.shutdown()
+            queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()